@@ -0,0 +1,78 @@
+"""
+Copyright 2017-2018 Government of Canada - Public Services and Procurement Canada - buyandsell.gc.ca
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+"""
+Per-request overhead of fetching the agent: LocMemCache get/set round trip versus agent registry lookup.
+
+Run from service_wrapper_project directory:
+
+    python -m bench.agent_registry [iterations]
+
+Agent, wallet and pool objects are real von_agent objects, constructed but not opened, so no indy pool is necessary.
+"""
+
+from django.conf import settings
+from os.path import abspath, dirname, join as pjoin
+from timeit import timeit
+
+import sys
+
+
+def main(iterations):
+    settings.configure(
+        CACHES={
+            'default': {
+                'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+                'TIMEOUT': None
+            }
+        })
+
+    from django.core.cache import cache
+    from von_agent.demo_agents import SRIAgent
+    from von_agent.nodepool import NodePool
+    from von_agent.wallet import Wallet
+    from wrapper_api.registry import AgentRegistry
+
+    genesis = pjoin(dirname(dirname(abspath(__file__))), 'wrapper_api', 'config', 'bootstrap', 'genesis.txn')
+    pool = NodePool('pool.bench', genesis)
+    ag = SRIAgent(
+        Wallet(pool, 'SRI-Agent-0000000000000000000000', 'bench'),
+        {'endpoint': 'http://127.0.0.1:8001/api/v0', 'proxy-relay': True})
+
+    cache.set('agent', ag)
+    registry = AgentRegistry()
+    registry.register('agent', ag)
+
+    def before():
+        a = cache.get('agent')  # as views did: unpickle on entry ...
+        cache.set('agent', a)  # ... and pickle on the way out
+
+    def after():
+        registry.agent
+
+    t_before = timeit(before, number=iterations)
+    t_after = timeit(after, number=iterations)
+
+    print('Iterations: {}'.format(iterations))
+    print('LocMemCache get/set: {:10.3f} us/request'.format(t_before * 1e6 / iterations))
+    print('Agent registry:      {:10.3f} us/request'.format(t_after * 1e6 / iterations))
+    print('Saved:               {:10.3f} us/request ({:.0f}x)'.format(
+        (t_before - t_after) * 1e6 / iterations,
+        t_before / t_after if t_after else float('inf')))
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 100000)
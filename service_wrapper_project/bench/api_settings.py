@@ -0,0 +1,122 @@
+"""
+Copyright 2017-2018 Government of Canada - Public Services and Procurement Canada - buyandsell.gc.ca
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+"""
+Per-request overhead of the django stack around ServiceWrapper: full settings (config.settings) versus
+lean API-only settings (config.settings_api).
+
+Run from service_wrapper_project directory:
+
+    python -m bench.api_settings [iterations]
+
+Each settings module runs in its own process, since django configures settings once per process. Requests go
+through the WSGI handler, as a server would call it, to a stand-in agent that answers at once: what remains is
+the overhead of middleware, authentication and the rest of the stack.
+"""
+
+from bench.standin import StandInAgent
+from io import BytesIO
+from os import environ
+from subprocess import check_output
+from timeit import timeit
+
+import json
+import sys
+
+
+PROFILES = ('config.settings', 'config.settings_api')
+
+
+def _environ(method, path, body=b''):
+    return {
+        'REQUEST_METHOD': method,
+        'PATH_INFO': path,
+        'SCRIPT_NAME': '',
+        'QUERY_STRING': '',
+        'SERVER_NAME': '127.0.0.1',
+        'SERVER_PORT': '8000',
+        'SERVER_PROTOCOL': 'HTTP/1.1',
+        'CONTENT_TYPE': 'application/json',
+        'CONTENT_LENGTH': str(len(body)),
+        'HTTP_ACCEPT': 'application/json',
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': 'http',
+        'wsgi.input': BytesIO(body),
+        'wsgi.errors': sys.stderr,
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': False,
+        'wsgi.run_once': False
+    }
+
+
+def run(iterations):
+    """
+    Time GET and POST requests under settings module in DJANGO_SETTINGS_MODULE; print results as json.
+
+    :param iterations: number of requests of each kind to time
+    """
+
+    from wrapper_api.eventloop import start
+    from wrapper_api.registry import REGISTRY
+
+    start()
+    REGISTRY.register('agent', StandInAgent())  # WrapperApiConfig.ready() bootstraps no agent, pool
+
+    from django.core.wsgi import get_wsgi_application
+    application = get_wsgi_application()
+
+    from django.core.cache import cache
+    base = '/{}/'.format(cache.get('config')['VON Connector']['api.base.url.path'].strip('/'))
+    body = json.dumps({'type': 'claims-reset', 'data': {}}).encode('utf-8')
+
+    def _start_response(status, headers):
+        assert status.startswith('200'), status
+
+    def get():
+        b''.join(application(_environ('GET', '{}did'.format(base)), _start_response))
+
+    def post():
+        b''.join(application(_environ('POST', '{}claims-reset'.format(base), body), _start_response))
+
+    get()  # warm up: first request loads url configuration, templates, etc.
+    post()
+    print(json.dumps({
+        'get': timeit(get, number=iterations) * 1e6 / iterations,
+        'post': timeit(post, number=iterations) * 1e6 / iterations
+    }))
+
+
+def main(iterations):
+    results = {}
+    for profile in PROFILES:
+        out = check_output(
+            [sys.executable, '-m', 'bench.api_settings', '--run', str(iterations)],
+            env=dict(environ, DJANGO_SETTINGS_MODULE=profile))
+        results[profile] = json.loads(out.decode('utf-8').strip().split('\n')[-1])
+
+    (full, lean) = (results[p] for p in PROFILES)
+    print('Iterations: {}'.format(iterations))
+    print('{:24s} {:>14s} {:>14s}'.format('Settings', 'GET us/req', 'POST us/req'))
+    for profile in PROFILES:
+        print('{:24s} {:14.1f} {:14.1f}'.format(profile, results[profile]['get'], results[profile]['post']))
+    print('{:24s} {:14.1f} {:14.1f}'.format('Saved', full['get'] - lean['get'], full['post'] - lean['post']))
+
+
+if __name__ == '__main__':
+    if len(sys.argv) > 1 and sys.argv[1] == '--run':
+        run(int(sys.argv[2]))
+    else:
+        main(int(sys.argv[1]) if len(sys.argv) > 1 else 5000)
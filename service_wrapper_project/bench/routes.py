@@ -0,0 +1,292 @@
+"""
+Copyright 2017-2018 Government of Canada - Public Services and Procurement Canada - buyandsell.gc.ca
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+"""
+Connector overhead per route: every message type, plus batch, metrics, profiling and readiness routes, against a
+stand-in agent, offline, with no wallet, ledger or indy pool.
+
+Run from service_wrapper_project directory:
+
+    python -m bench.routes [--http] [--iterations N] [--concurrency N] [--latency MS] [--agent MODULE:CLASS] [--json]
+
+Requests go through the django test client, or with --http over real HTTP to a threaded WSGI server in this
+process. The stand-in agent answers every form after --latency milliseconds; --agent substitutes another
+class, constructed with keyword argument latency (seconds). Lookup arguments and txn sequence numbers vary
+per request, so that connector caches and coalescing do not answer in the agent's stead.
+
+For each route, report p50 and p99 latency and throughput over --iterations requests from --concurrency
+threads, then peak memory allocated per request (tracemalloc, all threads) over a few sequential requests.
+Settings come from DJANGO_SETTINGS_MODULE as usual, e.g., config.settings_api for the lean stack.
+"""
+
+from argparse import ArgumentParser
+from bench.standin import StandInAgent
+from concurrent.futures import ThreadPoolExecutor
+from http.client import HTTPConnection
+from importlib import import_module
+from os import environ
+from socketserver import ThreadingMixIn
+from statistics import median
+from threading import local, Thread
+from time import perf_counter
+from wsgiref.simple_server import make_server, WSGIRequestHandler, WSGIServer
+
+import json
+import sys
+import tracemalloc
+
+
+ALLOC_ITERATIONS = 20
+
+
+def _forms():
+    """
+    Return builders of protocol forms by message type, each taking a request number to vary arguments by.
+
+    :return: dict mapping message type to callable(int) returning form
+    """
+
+    from wrapper_api import proto
+
+    did = StandInAgent.did
+    schema = {'origin-did': did, 'name': 'bench', 'version': '1.0'}
+    schemata = [schema]
+    claim_req = {'blinded_ms': {'prover_did': did}, 'issuer_did': did, 'schema_key': schema}
+    attrs = {'id': 1, 'name': 'bench'}
+
+    return {
+        'agent-nym-lookup': lambda i: proto.agent_nym_lookup('{}{}'.format(did[:-6], i)),
+        'agent-nym-send': lambda i: proto.agent_nym_send('{}{}'.format(did[:-6], i), '~{}'.format(i)),
+        'agent-endpoint-lookup': lambda i: proto.agent_endpoint_lookup('{}{}'.format(did[:-6], i)),
+        'agent-endpoint-send': lambda i: proto.agent_endpoint_send(),
+        'schema-lookup': lambda i: proto.schema_lookup(did, 'bench', '1.{}'.format(i)),
+        'schema-send': lambda i: proto.schema_send(did, 'bench', '1.{}'.format(i), ['id', 'name']),
+        'claim-def-send': lambda i: proto.claim_def_send(did, 'bench', '1.{}'.format(i)),
+        'master-secret-set': lambda i: proto.master_secret_set('bench-{}'.format(i)),
+        'claim-offer-create': lambda i: proto.claim_offer_create(did, 'bench', '1.{}'.format(i), did),
+        'claim-offer-store': lambda i: proto.claim_offer_store({'issuer_did': did, 'schema_key': schema, 'nonce': i}),
+        'claim-create': lambda i: proto.claim_create(claim_req, attrs),
+        'claim-store': lambda i: proto.claim_store({'values': attrs, 'issuer_did': did, 'schema_key': schema}),
+        'claim-request': lambda i: proto.claim_request(schemata, [], [], []),
+        'proof-request': lambda i: proto.proof_request(schemata, [], [], []),
+        'proof-request-by-referent': lambda i: proto.proof_request_by_referent(schemata, [], []),
+        'verification-request': lambda i: proto.verification_request({'nonce': str(i)}, {'proofs': {}}),
+        'claims-reset': lambda i: proto.claims_reset()
+    }
+
+
+def _requests(base):
+    """
+    Return benchmark requests by route name, covering every route that wrapper_api/urls.py serves.
+
+    :param base: API base URL path, e.g., '/api/v0/'
+    :return: dict mapping route name to callable(int) returning (method, path, body bytes or None)
+    """
+
+    from wrapper_api.router import ROUTES
+
+    name2request = {}
+    for (msg_type, build) in _forms().items():
+        name2request[msg_type] = lambda i, m=msg_type, b=build: (
+            'POST',
+            '{}{}'.format(base, m),
+            json.dumps(b(i)).encode('utf-8'))
+    name2request['txn'] = lambda i: ('GET', '{}txn/{}'.format(base, i + 1), None)
+    name2request['did'] = lambda i: ('GET', '{}did'.format(base), None)
+    assert set(name2request) == set(ROUTES), 'Benchmark misses routes {}'.format(set(ROUTES) - set(name2request))
+
+    batch_forms = _forms()
+    name2request['batch'] = lambda i: (
+        'POST',
+        '{}batch'.format(base),
+        json.dumps([batch_forms[t](i) for t in ('agent-nym-lookup', 'schema-lookup', 'claims-reset')]).encode('utf-8'))
+    name2request['metrics'] = lambda i: ('GET', '{}metrics'.format(base), None)
+    name2request['profiling'] = lambda i: ('GET', '{}profiling'.format(base), None)
+    name2request['ready'] = lambda i: ('GET', '{}ready'.format(base), None)
+    return name2request
+
+
+class _ClientTransport:
+    """
+    Send requests through the django test client, one client per thread.
+    """
+
+    def __init__(self):
+        self._local = local()
+
+    def send(self, method, path, body):
+        from django.test import Client
+
+        client = getattr(self._local, 'client', None)
+        if client is None:
+            client = self._local.client = Client(HTTP_ACCEPT='application/json')
+        if method == 'POST':
+            return client.post(path, data=body, content_type='application/json').status_code
+        return client.get(path).status_code
+
+    def close(self):
+        pass
+
+
+class _ThreadingWSGIServer(ThreadingMixIn, WSGIServer):
+    daemon_threads = True
+
+
+class _QuietHandler(WSGIRequestHandler):
+    def log_message(self, *args):
+        pass
+
+
+class _HTTPTransport:
+    """
+    Send requests over real HTTP to a threaded WSGI server on an ephemeral loopback port.
+    """
+
+    def __init__(self):
+        from django.core.wsgi import get_wsgi_application
+
+        self._server = make_server(
+            '127.0.0.1',
+            0,
+            get_wsgi_application(),
+            server_class=_ThreadingWSGIServer,
+            handler_class=_QuietHandler)
+        self._port = self._server.server_address[1]
+        Thread(target=self._server.serve_forever, name='bench-http', daemon=True).start()
+
+    def send(self, method, path, body):
+        conn = HTTPConnection('127.0.0.1', self._port)  # server speaks HTTP/1.0: one connection per request
+        try:
+            conn.request(method, path, body, {'Content-Type': 'application/json', 'Accept': 'application/json'})
+            rsp = conn.getresponse()
+            rsp.read()
+            return rsp.status
+        finally:
+            conn.close()
+
+    def close(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+
+def _percentile(ordered, fraction):
+    return ordered[int(round(fraction * (len(ordered) - 1)))]
+
+
+def _bench(transport, request, iterations, concurrency):
+    """
+    Time requests for one route.
+
+    :param transport: transport to send requests
+    :param request: callable(int) returning (method, path, body)
+    :param iterations: number of requests to time
+    :param concurrency: number of threads sending requests
+    :return: dict with p50 and p99 latency (ms), throughput (requests/s), errors, peak KiB allocated per request
+    """
+
+    def _one(i):
+        (method, path, body) = request(i)
+        start = perf_counter()
+        status = transport.send(method, path, body)
+        return (perf_counter() - start, status)
+
+    _one(0)  # warm up
+    start = perf_counter()
+    with ThreadPoolExecutor(concurrency) as executor:
+        results = list(executor.map(_one, range(1, iterations + 1)))
+    wall = perf_counter() - start
+    latencies = sorted(r[0] for r in results)
+
+    peaks = []
+    tracemalloc.start()
+    try:
+        for i in range(iterations + 1, iterations + 1 + min(iterations, ALLOC_ITERATIONS)):
+            tracemalloc.clear_traces()  # resets peak too
+            _one(i)
+            peaks.append(tracemalloc.get_traced_memory()[1])
+    finally:
+        tracemalloc.stop()
+
+    return {
+        'p50': _percentile(latencies, 0.5) * 1000,
+        'p99': _percentile(latencies, 0.99) * 1000,
+        'throughput': iterations / wall,
+        'errors': sum(1 for r in results if r[1] != 200),
+        'alloc': median(peaks) / 1024
+    }
+
+
+def _agent_class(spec):
+    if not spec:
+        return StandInAgent
+    (module_name, class_name) = spec.split(':')
+    return getattr(import_module(module_name), class_name)
+
+
+def main(args):
+    environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
+
+    from wrapper_api.eventloop import start
+    from wrapper_api.registry import REGISTRY
+
+    start()
+    REGISTRY.register('agent', _agent_class(args.agent)(latency=args.latency / 1000))  # ready() bootstraps none
+
+    import django
+    django.setup()
+
+    from django.core.cache import cache
+    base = '/{}/'.format(cache.get('config')['VON Connector']['api.base.url.path'].strip('/'))
+
+    transport = _HTTPTransport() if args.http else _ClientTransport()
+    try:
+        results = {
+            name: _bench(transport, request, args.iterations, args.concurrency)
+                for (name, request) in sorted(_requests(base).items())
+        }
+    finally:
+        transport.close()
+
+    if args.json:
+        print(json.dumps(results, indent=4, sort_keys=True))
+        return
+
+    print('Settings: {}, transport: {}, iterations: {}, concurrency: {}, agent latency: {} ms'.format(
+        environ['DJANGO_SETTINGS_MODULE'],
+        'HTTP' if args.http else 'django test client',
+        args.iterations,
+        args.concurrency,
+        args.latency))
+    print('{:28s} {:>10s} {:>10s} {:>10s} {:>10s} {:>7s}'.format('Route', 'p50 ms', 'p99 ms', 'req/s', 'alloc KiB', 'errors'))
+    for (name, result) in results.items():
+        print('{:28s} {:10.3f} {:10.3f} {:10.1f} {:10.1f} {:7d}'.format(
+            name,
+            result['p50'],
+            result['p99'],
+            result['throughput'],
+            result['alloc'],
+            result['errors']))
+
+
+if __name__ == '__main__':
+    parser = ArgumentParser(description='Benchmark connector overhead per route against a stand-in agent')
+    parser.add_argument('--http', action='store_true', help='send requests over HTTP, not via django test client')
+    parser.add_argument('--iterations', type=int, default=1000, help='requests to time per route')
+    parser.add_argument('--concurrency', type=int, default=1, help='threads sending requests')
+    parser.add_argument('--latency', type=float, default=0.0, help='stand-in agent latency per request, ms')
+    parser.add_argument('--agent', help='stand-in agent class as MODULE:CLASS, taking keyword argument latency')
+    parser.add_argument('--json', action='store_true', help='print results as json')
+    main(parser.parse_args(sys.argv[1:]))
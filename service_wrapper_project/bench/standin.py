@@ -0,0 +1,57 @@
+"""
+Copyright 2017-2018 Government of Canada - Public Services and Procurement Canada - buyandsell.gc.ca
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+"""
+Stand-in agent for benchmarks: answers protocol forms and helper requests offline, with no wallet, ledger
+or indy pool, so that what a benchmark times is the connector around it.
+"""
+
+import asyncio
+import json
+
+
+class StandInAgent:
+    """
+    Agent answering every request after a fixed latency, without touching wallet or ledger.
+    """
+
+    did = 'Q4zqM7aXqm7gDQkUVLng9h'
+    cfg = {}
+
+    def __init__(self, latency=0.0):
+        """
+        Initialize stand-in agent.
+
+        :param latency: seconds to take over every request
+        """
+
+        self._latency = latency
+
+    async def _wait(self):
+        if self._latency:
+            await asyncio.sleep(self._latency)
+
+    async def process_post(self, form):
+        await self._wait()
+        return json.dumps({'type': form['type']})
+
+    async def process_get_txn(self, seq_no):
+        await self._wait()
+        return json.dumps({'seqNo': seq_no, 'identifier': self.did, 'type': '101'})
+
+    async def process_get_did(self):
+        await self._wait()
+        return json.dumps(self.did)
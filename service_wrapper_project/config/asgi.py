@@ -0,0 +1,157 @@
+"""
+Copyright 2017-2018 Government of Canada - Public Services and Procurement Canada - buyandsell.gc.ca
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+"""
+ASGI config for config project.
+
+It exposes the ASGI callable as a module-level variable named ``application``, e.g.,
+
+    uvicorn config.asgi:application --lifespan on
+
+Django 1.11 predates ASGI, so this module does the wiring itself: on lifespan startup it adopts the
+server's event loop as the connector event loop and sets django up (running WrapperApiConfig.ready())
+off the loop; each HTTP request then resolves against the django URL configuration and awaits the
+async methods of ServiceWrapper directly, with no thread held per request in flight.
+"""
+
+from time import perf_counter
+
+import asyncio
+import django
+import json
+import os
+
+from wrapper_api import eventloop
+
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "config.settings")
+
+
+async def _read_body(receive):
+    body = b''
+    more_body = True
+    while more_body:
+        message = await receive()
+        body += message.get('body', b'')
+        more_body = message.get('more_body', False)
+    return body
+
+
+async def _respond(send, status, rv_json, content_type=b'application/json'):
+    from wrapper_api.startup import RETRY_AFTER
+
+    headers = [(b'content-type', content_type)]
+    if status == 503:
+        headers.append((b'retry-after', str(RETRY_AFTER).encode()))
+    await send({
+        'type': 'http.response.start',
+        'status': status,
+        'headers': headers
+    })
+    await send({
+        'type': 'http.response.body',
+        'body': rv_json.encode('utf-8') if isinstance(rv_json, str) else rv_json
+    })
+
+
+async def _lifespan(receive, send):
+    from wrapper_api.registry import REGISTRY
+
+    while True:
+        message = await receive()
+        loop = asyncio.get_event_loop()
+        if message['type'] == 'lifespan.startup':
+            try:
+                eventloop.start(loop)
+                await loop.run_in_executor(None, django.setup)  # ready() blocks on do(): run it off the loop
+            except Exception as e:
+                await send({'type': 'lifespan.startup.failed', 'message': str(e)})
+                return
+            await send({'type': 'lifespan.startup.complete'})
+        elif message['type'] == 'lifespan.shutdown':
+            await loop.run_in_executor(None, REGISTRY.close)  # closers block on do() too
+            eventloop.stop()
+            await send({'type': 'lifespan.shutdown.complete'})
+            return
+
+
+async def _http(scope, receive, send):
+    from django.urls import resolve, Resolver404
+    from wrapper_api.metrics import error_code_of, exposition, METRICS
+    from wrapper_api.profiling import HEADER as PROFILING_HEADER
+    from wrapper_api.views import metrics, profiler, profiling, profiling_settings, readiness, readiness_status
+    from wrapper_api.views import ServiceWrapper, timeout
+
+    start = perf_counter()
+    body = await _read_body(receive)
+    try:
+        match = resolve(scope['path'])
+    except Resolver404:
+        match = None
+    if match and match.func is metrics:
+        await _respond(send, 200, exposition(METRICS.collect()), b'text/plain; version=0.0.4; charset=utf-8')
+        return
+    if match and match.func is readiness:
+        await _respond(send, *readiness_status())
+        return
+    if match and match.func is profiling:
+        await _respond(send, *profiling_settings(scope['method'], body, (scope.get('client') or ('',))[0]))
+        return
+    view_class = getattr(match.func, 'view_class', None) if match else None
+    if view_class is None or not issubclass(view_class, ServiceWrapper):
+        await _respond(send, 404, json.dumps({'error-code': 404, 'message': 'Error 404, page not found'}))
+        return
+
+    view = view_class()
+    msg_type = match.kwargs.get('msg_type') or 'batch'
+    header = dict(scope.get('headers', [])).get(PROFILING_HEADER.lower().encode())
+    if scope['method'] not in ('GET', 'POST'):
+        (status, rv_json) = (
+            405,
+            json.dumps({'error-code': 405, 'message': 'Method {} not allowed'.format(scope['method'])}))
+    else:
+        if scope['method'] == 'POST':
+            coro = view.apost(scope['path'], body, match.kwargs.get('profile'))
+        else:
+            coro = view.aget(scope['path'], **match.kwargs)
+        try:
+            if profiler.wants(msg_type, header.decode('latin-1') if header else None):
+                # profiler runs coroutine on a private event loop: on an executor thread, off this one
+                (status, rv_json) = await asyncio.get_event_loop().run_in_executor(
+                    None,
+                    profiler.run,
+                    coro,
+                    msg_type,
+                    timeout)
+            else:
+                (status, rv_json) = await asyncio.wait_for(coro, timeout)
+        except (asyncio.TimeoutError, TimeoutError):
+            (status, rv_json) = (
+                504,
+                json.dumps({'error-code': 504, 'message': 'Operation timed out after {} seconds'.format(timeout)}))
+    await _respond(send, status, rv_json)
+
+    elapsed = perf_counter() - start
+    profiler.note(msg_type, elapsed)
+    METRICS.observe_request(msg_type, status, error_code_of(status, rv_json), elapsed, view.agent_seconds)
+
+
+async def application(scope, receive, send):
+    if scope['type'] == 'lifespan':
+        await _lifespan(receive, send)
+    elif scope['type'] == 'http':
+        await _http(scope, receive, send)
+    else:
+        raise NotImplementedError('Unsupported ASGI scope type {}'.format(scope['type']))
@@ -0,0 +1,71 @@
+"""
+Copyright 2017-2018 Government of Canada - Public Services and Procurement Canada - buyandsell.gc.ca
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+"""
+Gunicorn configuration for pre-fork, multi-worker serving, e.g.,
+
+    AGENT_PROFILE=sri DJANGO_SETTINGS_MODULE=config.settings_api \
+        gunicorn -c config/gunicorn.py config.wsgi:application --bind 0.0.0.0:8001
+
+The master process loads django and the service wrapper once (preload_app), for workers to share copy-on-write,
+but opens nothing indy: pool and wallet handles, like the connector event loop thread, do not survive a fork.
+Each worker starts after forking: it starts its own event loop, opens the pool and wallet(s) and registers its
+agent(s). Workers of one server bootstrap one at a time, so only the first writes to wallets and ledger.
+
+Workers of an org book (holder-prover) share its wallet and one master secret, labelled by the master's pid:
+any worker can create a proof on claims that any other stored.
+
+Each worker keeps its own metrics and spills them to a file for the metrics route to sum across workers.
+
+Environment variables WEB_CONCURRENCY and GUNICORN_THREADS set workers and threads per worker (default one
+worker per core, four threads each).
+"""
+
+from multiprocessing import cpu_count
+
+import os
+
+
+os.environ['VON_CONNECTOR_PREFORK'] = str(os.getpid())  # workers inherit: see wrapper_api.config.prefork_server_pid
+
+preload_app = True
+workers = int(os.environ.get('WEB_CONCURRENCY', cpu_count()))
+worker_class = 'gthread'  # request threads in a worker share its connector event loop
+threads = int(os.environ.get('GUNICORN_THREADS', 4))
+timeout = 300  # first worker may spend a while originating schemata on bootstrap; others wait on it
+accesslog = '-'
+
+
+def post_fork(server, worker):
+    from wrapper_api.apps import WrapperApiConfig
+
+    WrapperApiConfig.start()
+
+
+def worker_exit(server, worker):
+    from wrapper_api.apps import _cleanup
+    from wrapper_api.metrics import METRICS
+
+    METRICS.spill()  # last word on what this worker served
+    _cleanup()
+
+
+def on_exit(server):
+    from os.path import join as pjoin
+    from wrapper_api.metrics import remove_spills
+    from wrapper_api.store import DIR_STATE
+
+    remove_spills(pjoin(DIR_STATE, 'metrics.{}'.format(os.getpid())))
@@ -0,0 +1,80 @@
+"""
+Copyright 2017-2018 Government of Canada - Public Services and Procurement Canada - buyandsell.gc.ca
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+"""
+Django settings for the service wrapper API alone, for production.
+
+The service wrapper serves json to other agents: it has no use for sessions, CSRF tokens, users,
+messages, the admin site, static files or a database. Start from config.settings and keep only
+what the API endpoints need, so that each request crosses as little of the django stack as possible:
+
+    DJANGO_SETTINGS_MODULE=config.settings_api
+
+The browsable API still renders, for anyone pointing a browser at an endpoint.
+"""
+
+from config.settings import *  # noqa: F401,F403
+
+
+DJANGO_APPS = ()
+
+THIRD_PARTY_APPS = (
+    'rest_framework',
+)
+
+LOCAL_APPS = (
+    'wrapper_api',
+)
+
+INSTALLED_APPS = DJANGO_APPS + THIRD_PARTY_APPS + LOCAL_APPS
+
+MIDDLEWARE = [
+    'wrapper_api.metrics.MetricsMiddleware',  # first: times requests through the whole stack
+    'django.middleware.security.SecurityMiddleware',
+]
+
+ROOT_URLCONF = 'config.urls_api'
+
+TEMPLATES = [
+    {
+        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        'DIRS': [],
+        'APP_DIRS': True,
+        'OPTIONS': {
+            'context_processors': [
+                'django.template.context_processors.request',
+            ],
+            'libraries': {
+                'staticfiles': 'django.templatetags.static',  # for browsable API templates, sans staticfiles app
+            },
+        },
+    },
+]
+
+# no database: django falls back to its dummy backend, which raises on any attempt to use it
+DATABASES = {}
+
+AUTH_PASSWORD_VALIDATORS = []
+
+USE_I18N = False
+
+USE_L10N = False
+
+REST_FRAMEWORK = {
+    'DEFAULT_AUTHENTICATION_CLASSES': [],
+    'DEFAULT_PERMISSION_CLASSES': [],
+    'UNAUTHENTICATED_USER': None,
+}
@@ -0,0 +1,204 @@
+"""
+Copyright 2017-2018 Government of Canada - Public Services and Procurement Canada - buyandsell.gc.ca
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+"""
+Admission control per message type: at most so many requests of a type in process at once, and at most
+so many more waiting for a turn, first come first served. A request arriving to a full queue fails at once,
+for the service wrapper to respond 503 with Retry-After: under overload (e.g., a slow node pool) latency
+stays bounded by the queue, and clients back off, rather than requests piling up until they time out.
+
+Configuration [Admission] section sets limits for all types, and overrides per message type, e.g.,
+
+    [Admission]
+    concurrency=16
+    queue=64
+    proof-request.concurrency=4
+
+Limits are per process: under pre-fork serving, per worker.
+"""
+
+from collections import deque
+from threading import Lock
+
+import asyncio
+
+
+class Overloaded(Exception):
+    """
+    Request finds its message type's admission queue full.
+    """
+
+    pass
+
+
+class _Gate:
+    """
+    Admission state for one message type.
+    """
+
+    def __init__(self, concurrency, queue):
+        self.concurrency = concurrency
+        self.queue = queue
+        self.active = 0
+        self.waiters = deque()  # (loop, future) pairs, in order of arrival
+        self.admitted = 0
+        self.rejected = 0
+
+
+class Admission:
+    """
+    Admission control by message type. Safe across threads; requests on any event loop (e.g., a profiled
+    request's private loop) take turns together.
+    """
+
+    def __init__(self, concurrency=0, queue=0, overrides=None):
+        """
+        Initialize admission control.
+
+        :param concurrency: most requests of any one type in process at once; 0 for no limit
+        :param queue: most requests of any one type to wait for a turn beyond them
+        :param overrides: dict mapping message type to (concurrency, queue) pair
+        """
+
+        self._concurrency = concurrency
+        self._queue = queue
+        self._overrides = overrides or {}
+        self._lock = Lock()
+        self._gates = {}
+
+    def _gate(self, msg_type):
+        gate = self._gates.get(msg_type)
+        if gate is None:
+            (concurrency, queue) = self._overrides.get(msg_type, (self._concurrency, self._queue))
+            gate = self._gates[msg_type] = _Gate(concurrency, queue)
+        return gate
+
+    async def acquire(self, msg_type):
+        """
+        Wait for a turn for a request of message type; raise Overloaded if too many wait already.
+
+        :param msg_type: message type
+        """
+
+        with self._lock:
+            gate = self._gate(msg_type)
+            if not gate.concurrency or gate.active < gate.concurrency:
+                gate.active += 1
+                gate.admitted += 1
+                return
+            if len(gate.waiters) >= gate.queue:
+                gate.rejected += 1
+                raise Overloaded('Too many {} requests in process; retry later'.format(msg_type))
+            loop = asyncio.get_event_loop()
+            future = loop.create_future()
+            gate.waiters.append((loop, future))
+
+        try:
+            await future
+        except BaseException:
+            with self._lock:
+                if (loop, future) in gate.waiters:
+                    gate.waiters.remove((loop, future))
+                    raise
+            if future.done() and not future.cancelled():
+                self.release(msg_type)  # got a turn, but caller went away (e.g., request timeout): pass it on
+            raise  # else _grant() sees the cancelled future and passes the turn on
+        with self._lock:
+            gate.admitted += 1
+
+    def release(self, msg_type):
+        """
+        End a turn for a request of message type: hand it to the next waiter, if any.
+
+        :param msg_type: message type
+        """
+
+        with self._lock:
+            gate = self._gate(msg_type)
+            if not gate.waiters:
+                gate.active -= 1
+                return
+            (loop, future) = gate.waiters.popleft()
+        if loop.is_closed():
+            self.release(msg_type)
+        else:
+            loop.call_soon_threadsafe(self._grant, msg_type, future)
+
+    def _grant(self, msg_type, future):
+        if future.done():  # cancelled meanwhile
+            self.release(msg_type)
+        else:
+            future.set_result(None)
+
+    def admit(self, msg_type):
+        """
+        Return async context manager holding a turn for a request of message type.
+
+        :param msg_type: message type
+        :return: async context manager
+        """
+
+        return _Turn(self, msg_type)
+
+    def stats(self):
+        """
+        Return admission statistics by message type.
+
+        :return: dict mapping message type to dict with active, waiting, admitted, rejected
+        """
+
+        with self._lock:
+            return {
+                msg_type: {
+                    'active': gate.active,
+                    'waiting': len(gate.waiters),
+                    'admitted': gate.admitted,
+                    'rejected': gate.rejected
+                } for (msg_type, gate) in self._gates.items()
+            }
+
+
+class _Turn:
+    def __init__(self, admission, msg_type):
+        self._admission = admission
+        self._msg_type = msg_type
+
+    async def __aenter__(self):
+        await self._admission.acquire(self._msg_type)
+
+    async def __aexit__(self, exc_type, exc, traceback):
+        self._admission.release(self._msg_type)
+        return False
+
+
+def admission_for(cfg):
+    """
+    Return admission control per configuration [Admission] section.
+
+    :param cfg: configuration dict
+    :return: Admission
+    """
+
+    cfg_admission = cfg.get('Admission', {})
+    (concurrency, queue) = (int(cfg_admission.get('concurrency', 0)), int(cfg_admission.get('queue', 0)))
+    overrides = {}
+    for key in cfg_admission:
+        if key.endswith('.concurrency') or key.endswith('.queue'):
+            msg_type = key.rsplit('.', 1)[0]
+            overrides[msg_type] = (
+                int(cfg_admission.get('{}.concurrency'.format(msg_type), concurrency)),
+                int(cfg_admission.get('{}.queue'.format(msg_type), queue)))
+    return Admission(concurrency, queue, overrides)
@@ -15,202 +15,537 @@ limitations under the License.
 """
 
 from django.apps.config import AppConfig
-from django.core.cache import cache
-from os.path import abspath, dirname, join as pjoin
-from os import environ
+from fcntl import flock, LOCK_EX
+from os import getpid, makedirs
+from os.path import join as pjoin
+from threading import Thread
 from rest_framework.exceptions import NotFound
+from time import time
 from von_agent.agents import Issuer
 from von_agent.demo_agents import TrustAnchorAgent, SRIAgent, BCRegistrarAgent, OrgBookAgent
 from von_agent.nodepool import NodePool
 from von_agent.wallet import Wallet
-from wrapper_api.config import init_config
-from wrapper_api.eventloop import do
+from wrapper_api import proto
+from wrapper_api.client import client_for
+from wrapper_api.config import hosted_profiles, init_config, multi_profile, prefork_server_pid, profile_config
+from wrapper_api.eventloop import do, start as start_event_loop, stop as stop_event_loop, submit
+from wrapper_api.memledger import MemoryLedger, MemoryNodePool
+from wrapper_api.metrics import METRICS
+from wrapper_api.registry import REGISTRY
+from wrapper_api.snapshot import StartupSnapshot
+from wrapper_api.startup import STARTUP
+from wrapper_api.store import DIR_STATE, LedgerStore
 
 import asyncio
 import atexit
 import json
 import logging
-import requests
+
+def _close(obj):
+    do(obj.close())
+
 
 def _cleanup():
-    ag = cache.get('agent')
-    if ag is not None:
-        do(ag.close())
+    REGISTRY.close()  # agent first, then pool: reverse order of registration
+    stop_event_loop()
+
+
+def _invalidate_lookups(msg_type, did):
+    from wrapper_api.views import invalidate_lookups  # views read configuration on import: import late
 
-    pool = cache.get('pool')
-    if pool is not None:
-        do(pool.close())
+    invalidate_lookups(msg_type, did)
 
 class WrapperApiConfig(AppConfig):
     name = 'wrapper_api'
 
+    async def _originate(ag, schema_name, schema_version):
+        """
+        Send schema if not yet on ledger, and send claim definition on it if agent is an Issuer.
+
+        :param ag: agent object
+        :param schema_name: schema name
+        :param schema_version: schema version
+        :return: dict with schema name, version, seq-no, and claim-def (whether ensured), for startup snapshot
+        """
+
+        logger = logging.getLogger(__name__)
+        logger.info('Agent {} processing: schema {} version {}'.format(
+            ag.wallet.name,
+            schema_name,
+            schema_version))
+        start = time()
+
+        schema_json = await ag.process_post(proto.schema_lookup(ag.did, schema_name, schema_version))
+
+        if json.loads(schema_json):
+            logger.info('Using existing schema {} version {} from ledger'.format(schema_name, schema_version))
+        else:
+            schema_json = await ag.process_post(proto.schema_send(
+                ag.did,
+                schema_name,
+                schema_version,
+                proto.attr_names(schema_name, schema_version)))
+            logger.info('Originated schema {} version {}'.format(schema_name, schema_version))
+
+        schema = json.loads(schema_json)
+        assert schema
+
+        if isinstance(ag, Issuer):
+            await ag.send_claim_def(schema_json)  # calls get-claim-def to create or reuse in wallet, ledger
+            logger.info('Ensured claim def on ledger and wallet {} for schema {} version {}'.format(
+                ag.wallet.name,
+                schema_name,
+                schema_version))
+
+        logger.info('Agent {} completed schema {} version {} in {:.3f} seconds'.format(
+            ag.wallet.name,
+            schema_name,
+            schema_version,
+            time() - start))
+        return {
+            'name': schema_name,
+            'version': schema_version,
+            'seq-no': schema['seqNo'],
+            'claim-def': isinstance(ag, Issuer)
+        }
+
+    def origin_schemata(cfg):
+        """
+        Return schema name/version pairs that configuration [Origin] section identifies agent as originating.
+
+        :param cfg: configuration dict
+        :return: list of (name, version) pairs
+        """
+
+        return [
+            (schema_name, schema_version)
+            for schema_name in cfg.get('Origin', {})
+                for schema_version in (v.strip() for v in cfg['Origin'][schema_name].split(','))]
+
     def originate(ag, cfg):
         """
         Send schemata that configuration identifies agent as originating, send claim definition if agent is an Issuer.
+        Process schema name/version pairs concurrently, at most [VON Connector] origin.concurrency at a time.
 
         :param ag: agent object
         :param cfg_agent: configuration dict
+        :return: list of schema dicts as _originate() returns, for startup snapshot
         """
         # note that for our demo, all issuers originate exactly the schemata on which they make claim definitions
 
         logger = logging.getLogger(__name__)
 
         if 'Origin' not in cfg:
+            return []
+
+        schema_name_versions = WrapperApiConfig.origin_schemata(cfg)
+        concurrency = int(cfg['VON Connector'].get('origin.concurrency', 4))
+
+        async def _originate_all():
+            semaphore = asyncio.Semaphore(concurrency)  # create on the loop that uses it
+
+            async def _bounded(schema_name, schema_version):
+                async with semaphore:
+                    return await WrapperApiConfig._originate(ag, schema_name, schema_version)
+
+            return await asyncio.gather(*(_bounded(n, v) for (n, v) in schema_name_versions))
+
+        start = time()
+        rv = do(_originate_all())
+        logger.info('Agent {} originated {} schema(ta) in {:.3f} seconds'.format(
+            ag.wallet.name,
+            len(schema_name_versions),
+            time() - start))
+        return rv
+
+    def warm(ag, cfg, profile):
+        """
+        Warm agent and connector caches from on-disk ledger store for profile, if configuration enables it;
+        register the store for views to fill, and spill it periodically and on close.
+
+        :param ag: agent object, open
+        :param cfg: configuration dict
+        :param profile: agent profile
+        """
+
+        if cfg.get('Cache', {}).get('ledger.store', 'false').lower() not in ('true', 'yes', '1'):
             return
-        for schema_name in cfg['Origin']:
-            for schema_version in (v.strip() for v in cfg['Origin'][schema_name].split(',')):
-                logger.info('Agent {} processing: schema {} version {}'.format(
-                    ag.wallet.name,
-                    schema_name,
-                    schema_version))
-
-                j = None
-                attrs_json = None
-                with open(pjoin(dirname(abspath(__file__)), 'protocol', 'schema-lookup.json'), 'r') as proto_f:
-                    j = proto_f.read()
-
-                schema_json = do(ag.process_post(json.loads(j % (ag.did, schema_name, schema_version))))
-
-                if json.loads(schema_json):
-                    logger.info('Using existing schema {} version {} from ledger'.format(schema_name, schema_version))
-                else:
-                    with open(pjoin(dirname(abspath(__file__)), 'protocol', 'schema-send.json'), 'r') as proto_f:
-                        j = proto_f.read()
-                    with open(pjoin(
-                            dirname(abspath(__file__)),
-                            'protocol',
-                            'schema-send',
-                            schema_name,
-                            schema_version,
-                            'attr-names.json'), 'r') as attr_names_f:
-                        attrs_json = attr_names_f.read()
-                    schema_json = do(ag.process_post(json.loads(j % (
-                        ag.did,
-                        schema_name,
-                        schema_version,
-                        json.dumps(json.loads(attrs_json))))))
-                    logger.info('Originated schema {} version {}'.format(schema_name, schema_version))
-
-                schema = json.loads(schema_json)
-                assert schema
-
-                if isinstance(ag, Issuer):
-                    do(ag.send_claim_def(schema_json))  # calls get-claim-def to create or reuse in wallet, ledger
-                    logger.info('Ensured claim def on ledger and wallet {} for schema {} version {}'.format(
-                        ag.wallet.name,
-                        schema_name,
-                        schema_version))
-
-    def agent_config_for(cfg):
+        if 'ledger-store' in REGISTRY:
+            return  # von_agent caches are process-wide: so is the store, across co-hosted agents
+
+        store = LedgerStore(pjoin(DIR_STATE, '{}.ledger.json'.format('hosted' if multi_profile() else profile)))
+        do(store.warm(ag))
+        REGISTRY.register('ledger-store', store, lambda s: s.spill())
+        submit(store.spill_periodically(float(cfg['Cache'].get('ledger.store.interval', 10))))
+
+    def node_pool(cfg, name):
+        """
+        Return node pool per [Pool] backend: indy (default) for the indy node pool that genesis.txn.path
+        identifies, memory for an in-memory stand-in (wrapper_api/memledger.py) sharing a journal on this box.
+
+        :param cfg: configuration dict
+        :param name: pool name
+        :return: node pool, not open
+        """
+
+        cfg_pool = cfg['Pool']
+        backend = cfg_pool.get('backend', 'indy').lower()
+        if backend == 'indy':
+            return NodePool(name, cfg_pool['genesis.txn.path'])
+        if backend == 'memory':
+            return MemoryNodePool(
+                name,
+                cfg_pool.get('genesis.txn.path'),
+                MemoryLedger(
+                    cfg_pool.get('memory.journal.path') or pjoin(DIR_STATE, 'memory-ledger.jsonl'),
+                    float(cfg_pool.get('memory.read.latency', 0)),
+                    float(cfg_pool.get('memory.write.latency', 0))))
+        raise ValueError('Unsupported [Pool] backend {}'.format(backend))
+
+    def agent_config_for(cfg, profile=None, listen=None):
+        """
+        Return agent configuration (von_agent) for profile configuration.
+
+        :param cfg: configuration dict for profile
+        :param profile: agent profile to prefix endpoint path, None for the one agent that the process hosts
+        :param listen: [Agent] section of the profile whose host and port the process listens on; None for own
+        :return: agent configuration dict
+        """
+
+        listen = listen or cfg['Agent']
         return {
-            'endpoint': 'http://{}:{}/{}'.format(
-                cfg['Agent']['host'],
-                int(cfg['Agent']['port']),
+            'endpoint': 'http://{}:{}/{}{}'.format(
+                listen['host'],
+                int(listen['port']),
+                '{}/'.format(profile) if profile else '',
                 cfg['VON Connector']['api.base.url.path'].strip('/')),
             'proxy-relay': True
         }
 
-    def ready(self):
-        logger = logging.getLogger(__name__)
-
-        cfg = init_config()
-        base_api_url_path = cfg['VON Connector']['api.base.url.path'].strip('/')
+    def open_agent(cfg, profile, pool, prefix=None, listen=None):
+        """
+        Create and open agent for profile, and warm its caches; touch the ledger for nothing else.
+
+        :param cfg: configuration dict for profile
+        :param profile: agent profile
+        :param pool: node pool, open
+        :param prefix: agent profile to prefix endpoint path, None for the one agent that the process hosts
+        :param listen: [Agent] section of the profile whose host and port the process listens on; None for own
+        :return: agent, open
+        """
 
         role = (cfg['Agent']['role'] or '').lower().replace(' ', '')  # will be a dir as a pool name: spaces are evil
-        profile = environ.get('AGENT_PROFILE', 'trust-anchor').lower().replace(' ', '') # profiles -n:1-> role
         logging.debug('Starting agent; profile={}, role={}'.format(profile, role))
 
-        pool = NodePool('pool.{}'.format(profile), cfg['Pool']['genesis.txn.path'])
-        do(pool.open())
-        assert pool.handle
-        cache.set('pool', pool)
-
-        ag = None
-        if role == 'trust-anchor':
-            bootstrap_json = cfg['Agent']
-            ag = TrustAnchorAgent(
-                do(Wallet(pool, cfg['Agent']['seed'], profile).create()),
-                WrapperApiConfig.agent_config_for(cfg))
-            do(ag.open())
-            assert ag.did
-            tag_did = ag.did
-            
-            # register trust anchor if need be
-            if not json.loads(do(ag.get_nym(ag.did))):
+        role2class = {
+            'trust-anchor': TrustAnchorAgent,
+            'sri': SRIAgent,
+            'org-book': OrgBookAgent,
+            'bc-registrar': BCRegistrarAgent
+        }
+        if role not in role2class:
+            raise ValueError('Agent profile {} configured for unsupported role {}'.format(profile, role))
+
+        ag = role2class[role](
+            do(Wallet(pool, cfg['Agent']['seed'], profile).create()),
+            WrapperApiConfig.agent_config_for(cfg, prefix, listen))
+        do(ag.open())
+        assert ag.did
+        WrapperApiConfig.warm(ag, cfg, profile)
+        logging.debug('profile {}; ag class {}'.format(profile, ag.__class__.__name__))
+        return ag
+
+    def register(ag, cfg, profile, tag=None):
+        """
+        Ensure open agent's nym and endpoint on the ledger.
+
+        :param ag: agent, open
+        :param cfg: configuration dict for profile
+        :param profile: agent profile
+        :param tag: trust anchor agent hosted in this process, None to reach it over HTTP per [Trust Anchor]
+        """
+
+        # get nym: if not registered, send it (trust anchor) or have trust anchor send it
+        if not json.loads(do(ag.get_nym(ag.did))):
+            if isinstance(ag, TrustAnchorAgent):
                 do(ag.send_nym(ag.did, ag.verkey, ag.wallet.profile))
-            if not json.loads(do(ag.get_endpoint(ag.did))):
-                do(ag.send_endpoint())
-
-            # originate schemata if need be
-            WrapperApiConfig.originate(ag, cfg)
-
-        elif role in ('sri', 'org-book', 'bc-registrar'):
-            # create agent via factory by role
-            if role == 'sri':
-                ag = SRIAgent(
-                    do(Wallet(pool, cfg['Agent']['seed'], profile).create()),
-                    WrapperApiConfig.agent_config_for(cfg))
-            elif role == 'org-book':
-                ag = OrgBookAgent(
-                    do(Wallet(pool, cfg['Agent']['seed'], profile).create()),
-                    WrapperApiConfig.agent_config_for(cfg))
-            elif role == 'bc-registrar':
-                ag = BCRegistrarAgent(
-                    do(Wallet(pool, cfg['Agent']['seed'], profile).create()),
-                    WrapperApiConfig.agent_config_for(cfg))
-
-            do(ag.open())
-            logging.debug('profile {}; ag class {}'.format(profile, ag.__class__.__name__))
-
-            trust_anchor_base_url = 'http://{}:{}/{}'.format(
-                cfg['Trust Anchor']['host'],
-                cfg['Trust Anchor']['port'],
-                cfg['VON Connector']['api.base.url.path'].strip('/'))
-
-            # get nym: if not registered; get trust-anchor host & port, post an agent-nym-send form
-            if not json.loads(do(ag.get_nym(ag.did))):
-                # trust anchor DID is necessary
-                try:
-                    r = requests.get('{}/did'.format(trust_anchor_base_url))
-                    if not r.ok:
-                        logging.error(
-                            'Agent {} nym is not on the ledger, but trust anchor is not responding'.format(profile))
-                        r.raise_for_status()
-                    tag_did = r.json()
-                    logging.debug('{}; tag_did {}'.format(profile, tag_did))
-                    assert tag_did
-
-                    with open(pjoin(dirname(abspath(__file__)), 'protocol', 'agent-nym-send.json'), 'r') as proto:
-                        j = proto.read()
-                    logging.debug('{}; sending {}'.format(profile, j % (ag.did, ag.verkey)))
-                    r = requests.post(
-                        '{}/agent-nym-send'.format(trust_anchor_base_url),
-                        json=json.loads(j % (ag.did, ag.verkey)))
-                    r.raise_for_status()
-                except Exception:
-                    raise NotFound(
-                        detail='Agent {} requires Trust Anchor agent, but it is not responding'.format(profile),
-                        code=500)
-
-            # get endpoint: if not present, send it
-            if not json.loads(do(ag.get_endpoint(ag.did))):
-                do(ag.send_endpoint())
-
-            if role in ('bc-registrar', 'sri'):
-                # originate schemata if need be
-                WrapperApiConfig.originate(ag, cfg)
-
-            if role in ('org-book'):
-                # set master secret
-                from os import getpid
-                # append pid to avoid re-using a master secret on restart of HolderProver agent; indy-sdk library 
-                # is shared, so it remembers and forbids it unless we shut down all processes
-                do(ag.create_master_secret(cfg['Agent']['master.secret'] + '.' + str(getpid())))
+            elif tag is not None:
+                do(tag.process_post(proto.agent_nym_send(ag.did, ag.verkey)))  # co-hosted: no HTTP
+            else:
+                WrapperApiConfig.register_via_trust_anchor(ag, cfg, profile)
+            _invalidate_lookups('agent-nym-lookup', ag.did)  # interactive lookups serve during startup
+
+        # get endpoint: if not present (or moved), send it
+        WrapperApiConfig.ensure_endpoint(ag)
+
+    def snapshot_for(ag, cfg, profile):
+        """
+        Return startup snapshot (wrapper_api/snapshot.py) for profile on agent's ledger, loaded, if configuration
+        enables it.
+
+        :param ag: agent, open
+        :param cfg: configuration dict for profile
+        :param profile: agent profile
+        :return: startup snapshot, None if disabled
+        """
+
+        if cfg['VON Connector'].get('startup.snapshot', 'true').lower() not in ('true', 'yes', '1'):
+            return None
+        snapshot = StartupSnapshot(DIR_STATE, profile, ag.pool)
+        snapshot.load()
+        return snapshot
 
+    def bootstrap(ag, cfg, profile, tag=None):
+        """
+        Ensure open agent's nym, endpoint and schemata on the ledger, and its master secret if a holder-prover.
+        Trust a startup snapshot matching the agent and its configuration in place of the ledger.
+
+        :param ag: agent, open
+        :param cfg: configuration dict for profile
+        :param profile: agent profile
+        :param tag: trust anchor agent hosted in this process, None to reach it over HTTP per [Trust Anchor]
+        :return: snapshot to revalidate once startup is complete, None for none
+        """
+
+        role = (cfg['Agent']['role'] or '').lower().replace(' ', '')
+        originates = role in ('trust-anchor', 'bc-registrar', 'sri')
+
+        snapshot = WrapperApiConfig.snapshot_for(ag, cfg, profile)
+        if snapshot and snapshot.trusts(
+                ag,
+                WrapperApiConfig.origin_schemata(cfg) if originates else [],
+                isinstance(ag, Issuer)):
+            with STARTUP.phase('snapshot', profile):
+                logging.getLogger(__name__).info('Agent {} trusting startup snapshot {}'.format(profile, snapshot.path))
         else:
-            raise ValueError('Agent profile {} configured for unsupported role {}'.format(profile, role))
+            with STARTUP.phase('registration', profile):
+                WrapperApiConfig.register(ag, cfg, profile, tag)
+
+            schemata = []
+            if originates:
+                with STARTUP.phase('origination', profile):
+                    schemata = WrapperApiConfig.originate(ag, cfg)
+
+            if snapshot:
+                snapshot.save(ag, schemata)
+            snapshot = None  # fresh from the ledger: nothing to revalidate
+
+        if role in ('org-book'):
+            with STARTUP.phase('master-secret', profile):
+                # append pid to avoid re-using a master secret on restart of HolderProver agent; indy-sdk library
+                # is shared, so it remembers and forbids it unless we shut down all processes. Pre-fork workers
+                # append their server's pid instead: they share the wallet, so must share one holder identity
+                do(ag.create_master_secret(
+                    cfg['Agent']['master.secret'] + '.' + str(prefork_server_pid() or getpid())))
+
+        return snapshot if snapshot and snapshot.stale else None
+
+    def revalidate(ag, cfg, profile, snapshot, tag=None):
+        """
+        Check trusted startup snapshot against the ledger, bootstrapping anew (nym, endpoint, origination)
+        where it differs; save the result, or discard the snapshot on failure. Take turns with other
+        processes, so that pre-fork workers of one server revalidate once between them.
+
+        :param ag: agent, open
+        :param cfg: configuration dict for profile
+        :param profile: agent profile
+        :param snapshot: startup snapshot that bootstrap trusted
+        :param tag: trust anchor agent hosted in this process, None to reach it over HTTP per [Trust Anchor]
+        """
+
+        logger = logging.getLogger(__name__)
+
+        role = (cfg['Agent']['role'] or '').lower().replace(' ', '')
+        start = time()
+        try:
+            with open('{}.lock'.format(snapshot.path), 'w') as lock_f:
+                flock(lock_f, LOCK_EX)  # released on close
+                snapshot.load()
+                if not snapshot.stale:
+                    return  # another worker of this server revalidated it meanwhile
+
+                WrapperApiConfig.register(ag, cfg, profile, tag)
+                snapshot.save(
+                    ag,
+                    WrapperApiConfig.originate(ag, cfg) if role in ('trust-anchor', 'bc-registrar', 'sri') else [])
+            logger.info('Agent {} revalidated startup snapshot {} in {:.3f} seconds'.format(
+                profile,
+                snapshot.path,
+                time() - start))
+        except Exception as e:
+            logger.exception('Agent {} could not revalidate startup snapshot {}, discarding it: {}'.format(
+                profile,
+                snapshot.path,
+                e))
+            snapshot.discard()
+
+    def register_via_trust_anchor(ag, cfg, profile):
+        """
+        Have trust anchor at [Trust Anchor] host and port send agent nym to the ledger, over HTTP
+        via the shared client: pooled, with timeouts, retrying with backoff while the trust anchor starts.
+
+        :param ag: agent, open
+        :param cfg: configuration dict for profile
+        :param profile: agent profile
+        """
+
+        trust_anchor_base_url = 'http://{}:{}/{}'.format(
+            cfg['Trust Anchor']['host'],
+            cfg['Trust Anchor']['port'],
+            cfg['VON Connector']['api.base.url.path'].strip('/'))
+
+        http = REGISTRY.get('http')
+
+        # trust anchor DID is necessary
+        try:
+            r = http.get('{}/did'.format(trust_anchor_base_url))
+            if not r.ok:
+                logging.error(
+                    'Agent {} nym is not on the ledger, but trust anchor is not responding'.format(profile))
+                r.raise_for_status()
+            tag_did = r.json()
+            logging.debug('{}; tag_did {}'.format(profile, tag_did))
+            assert tag_did
+
+            form = proto.agent_nym_send(ag.did, ag.verkey)
+            logging.debug('{}; sending {}'.format(profile, form))
+            r = http.post(
+                '{}/agent-nym-send'.format(trust_anchor_base_url),
+                json=form,
+                idempotent=True)  # sending the same nym again changes nothing on the ledger
+            r.raise_for_status()
+        except Exception as e:
+            logging.error('Agent {} could not register via trust anchor at {}: {}'.format(
+                profile,
+                trust_anchor_base_url,
+                e))
+            raise NotFound(
+                detail='Agent {} requires Trust Anchor agent, but it is not responding'.format(profile),
+                code=500)
+
+    def ensure_endpoint(ag):
+        """
+        Send agent endpoint to the ledger unless it is there already as configured.
 
-        assert ag is not None
+        :param ag: agent, open
+        """
+
+        if json.loads(do(ag.get_endpoint(ag.did))).get('endpoint') != ag.cfg['endpoint']:
+            do(ag.send_endpoint())
+            _invalidate_lookups('agent-endpoint-lookup', ag.did)
+
+    def ready(self):
+        init_config()
+        if prefork_server_pid() == getpid():
+            return  # pre-fork server master: each worker starts after forking (config/gunicorn.py post_fork)
+        WrapperApiConfig.start()
+
+    def start():
+        """
+        Start event loop, open node pool and hosted agents, unless done already; register them, and return.
+        Finish startup (registration, origination) in the background: see wrapper_api/startup.py.
+
+        Pre-fork workers of one server take turns, holding a file lock: the first to bootstrap writes
+        wallets and ledger, the rest find everything in place.
+        """
+
+        cfg = init_config()
+        if 'pool' in REGISTRY:
+            return  # started already
+        if REGISTRY.agent is not None:
+            STARTUP.finish()  # agent in place (e.g., a stand-in for benchmarks): nothing to bootstrap
+            return
+
+        makedirs(DIR_STATE, exist_ok=True)
+        path_lock = pjoin(DIR_STATE, '{}.bootstrap.lock'.format('hosted' if multi_profile() else hosted_profiles()[0]))
+        with open(path_lock, 'w') as lock_f:
+            flock(lock_f, LOCK_EX)  # released on close
+            agents = WrapperApiConfig._start(cfg)
+
+        if prefork_server_pid():  # spill metrics for whichever worker takes a scrape to sum
+            METRICS.enable_spill(pjoin(DIR_STATE, 'metrics.{}'.format(prefork_server_pid())))
+            submit(METRICS.spill_periodically(float(cfg.get('Metrics', {}).get('snapshot.interval', 5))))
 
-        cache.set('agent', ag)
         atexit.register(_cleanup)
+
+        Thread(
+            target=WrapperApiConfig._finish,
+            args=(cfg, agents, path_lock),
+            name='von-connector-startup',
+            daemon=True).start()
+
+    def _start(cfg):
+        """
+        Open node pool and hosted agents; register them.
+
+        :param cfg: configuration dict
+        :return: list of (profile, agent) pairs, trust anchors first
+        """
+
+        logger = logging.getLogger(__name__)
+
+        profiles = hosted_profiles()
+        multi = multi_profile()
+        listen = profile_config(profiles[0])['Agent'] if multi else None  # hosted profiles share its host, port
+        logger.info('Hosting agent profile(s) {}'.format(', '.join(profiles)))
+
+        start_event_loop()  # all indy work, startup and requests alike, runs on this one loop
+
+        # one HTTP client for all outbound calls: registration via trust anchor, and proxy relay (views._post),
+        # both off the event loop
+        REGISTRY.register('http', client_for(cfg), lambda c: c.close())
+
+        with STARTUP.phase('pool'):
+            pool = WrapperApiConfig.node_pool(cfg, 'pool.{}'.format('hosted' if multi else profiles[0]))
+            do(pool.open())  # one pool for all hosted agents
+            assert pool.handle
+            REGISTRY.register('pool', pool, _close)
+
+        # trust anchors first, so that co-hosted agents can have them send their nyms in-process
+        agents = []
+        for profile in sorted(
+                profiles,
+                key=lambda p: (profile_config(p)['Agent']['role'] or '').lower().replace(' ', '') != 'trust-anchor'):
+            with STARTUP.phase('wallet', profile):
+                ag = WrapperApiConfig.open_agent(
+                    profile_config(profile) if multi else cfg,
+                    profile,
+                    pool,
+                    profile if multi else None,
+                    listen)
+            REGISTRY.register_agent(ag, profile if multi else None, _close)
+            agents.append((profile, ag))
+        return agents
+
+    def _finish(cfg, agents, path_lock):
+        """
+        Bootstrap open agents in turn: registration, origination, master secret. Run in the background,
+        holding the bootstrap file lock, so that pre-fork workers serve while they take turns at it.
+        Then revalidate any startup snapshots that bootstrap trusted.
+
+        :param cfg: configuration dict
+        :param agents: list of (profile, agent) pairs, trust anchors first
+        :param path_lock: path to bootstrap lock file
+        """
+
+        multi = multi_profile()
+        revalidations = []
+        try:
+            with open(path_lock, 'w') as lock_f:
+                flock(lock_f, LOCK_EX)  # released on close
+                tag = None
+                for (profile, ag) in agents:
+                    cfg_profile = profile_config(profile) if multi else cfg
+                    snapshot = WrapperApiConfig.bootstrap(ag, cfg_profile, profile, tag)
+                    if snapshot:
+                        revalidations.append((ag, cfg_profile, profile, snapshot, tag))
+                    if isinstance(ag, TrustAnchorAgent):
+                        tag = tag or ag
+        except Exception as e:
+            logging.getLogger(__name__).exception('Startup failed: {}'.format(e))
+            STARTUP.fail(e)
+            return
+        STARTUP.finish()
+
+        for revalidation in revalidations:  # lazily, now that the process serves every route
+            WrapperApiConfig.revalidate(*revalidation)
@@ -0,0 +1,202 @@
+"""
+Copyright 2017-2018 Government of Canada - Public Services and Procurement Canada - buyandsell.gc.ca
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+from collections import OrderedDict
+from threading import RLock
+from time import monotonic
+
+
+class LRUCache:
+    """
+    Retain json responses by key, evicting least recently used entries past a bound on entry count
+    or on total bytes (utf-8 encoded json). Suits responses that never go stale, such as committed
+    ledger transactions; keep hit, miss and eviction counts.
+    """
+
+    def __init__(self, max_entries, max_bytes):
+        """
+        Initialize empty cache.
+
+        :param max_entries: most entries to retain
+        :param max_bytes: most bytes of json to retain across all entries
+        """
+
+        self._lock = RLock()
+        self._key2value = OrderedDict()  # key: (json, size in bytes), least recently used first
+        self._max_entries = max_entries
+        self._max_bytes = max_bytes
+        self._bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key):
+        """
+        Return json for key and mark it most recently used, or None for cache miss.
+
+        :param key: cache key
+        :return: json or None
+        """
+
+        with self._lock:
+            entry = self._key2value.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._key2value.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key, value):
+        """
+        Retain json for key, evicting least recently used entries as necessary to respect bounds.
+        Do not retain json exceeding the byte bound on its own.
+
+        :param key: cache key
+        :param value: json
+        :return: input json
+        """
+
+        size = len(value.encode('utf-8'))
+        if size > self._max_bytes or self._max_entries < 1:
+            return value
+
+        with self._lock:
+            old = self._key2value.pop(key, None)
+            if old is not None:
+                self._bytes -= old[1]
+            self._key2value[key] = (value, size)
+            self._bytes += size
+            while len(self._key2value) > self._max_entries or self._bytes > self._max_bytes:
+                (_, (_, evicted_size)) = self._key2value.popitem(last=False)
+                self._bytes -= evicted_size
+                self.evictions += 1
+        return value
+
+    def clear(self):
+        """
+        Remove all entries; retain counts.
+        """
+
+        with self._lock:
+            self._key2value.clear()
+            self._bytes = 0
+
+    def __len__(self):
+        return len(self._key2value)
+
+    def stats(self):
+        """
+        Return cache statistics.
+
+        :return: dict with entries, bytes, hits, misses, evictions
+        """
+
+        with self._lock:
+            return {
+                'entries': len(self._key2value),
+                'bytes': self._bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions
+            }
+
+
+class TTLCache:
+    """
+    Retain json responses by key for a time to live per entry, evicting oldest entries past a bound
+    on entry count. Suits ledger reads that a write may supersede, such as nym and
+    endpoint lookups; relying code invalidates entries that it knows a write to supersede.
+    """
+
+    def __init__(self, max_entries):
+        """
+        Initialize empty cache.
+
+        :param max_entries: most entries to retain
+        """
+
+        self._lock = RLock()
+        self._key2value = OrderedDict()  # key: (json, expiry on monotonic clock), in order of insertion
+        self._max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        """
+        Return json for key, or None for cache miss or expired entry.
+
+        :param key: cache key
+        :return: json or None
+        """
+
+        with self._lock:
+            entry = self._key2value.get(key)
+            if entry is not None and entry[1] > monotonic():
+                self.hits += 1
+                return entry[0]
+            if entry is not None:
+                del self._key2value[key]
+            self.misses += 1
+            return None
+
+    def put(self, key, value, ttl):
+        """
+        Retain json for key for ttl seconds.
+
+        :param key: cache key
+        :param value: json
+        :param ttl: time to live in seconds; non-positive to retain nothing
+        :return: input json
+        """
+
+        if ttl <= 0 or self._max_entries < 1:
+            return value
+
+        with self._lock:
+            self._key2value.pop(key, None)
+            self._key2value[key] = (value, monotonic() + ttl)
+            while len(self._key2value) > self._max_entries:
+                self._key2value.popitem(last=False)
+        return value
+
+    def invalidate(self, predicate):
+        """
+        Remove entries with keys satisfying predicate.
+
+        :param predicate: callable taking key, returning whether to remove its entry
+        """
+
+        with self._lock:
+            for key in [k for k in self._key2value if predicate(k)]:
+                del self._key2value[key]
+
+    def __len__(self):
+        return len(self._key2value)
+
+    def stats(self):
+        """
+        Return cache statistics.
+
+        :return: dict with entries, hits, misses
+        """
+
+        with self._lock:
+            return {
+                'entries': len(self._key2value),
+                'hits': self.hits,
+                'misses': self.misses
+            }
@@ -0,0 +1,198 @@
+"""
+Copyright 2017-2018 Government of Canada - Public Services and Procurement Canada - buyandsell.gc.ca
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+"""
+Shared HTTP client for every outbound call from the connector: trust anchor registration at startup and
+agent-to-agent proxy relay (wrapper_api/views.py posts to the proxy target's endpoint on an executor
+thread). Calls block while they retry: keep them off the connector event loop.
+
+One requests.Session per process keeps connections alive per host. Every call has connect and read timeouts.
+Transient failures retry after jittered exponential backoff ("full jitter": a uniformly random wait up to the
+exponential bound), so that a fleet of agents starting against one trust anchor spreads out rather than
+retrying in lockstep. A 503 response's Retry-After header, if any, sets the least wait.
+
+What is transient:
+    - failure to connect, and a 503 response: the server did not process the request;
+    - for idempotent requests only, also a read timeout, a dropped connection, or a 502 or 504 response.
+"""
+
+from random import uniform
+from requests.adapters import HTTPAdapter
+from requests.exceptions import ConnectionError, ConnectTimeout, ReadTimeout
+from time import sleep
+from urllib3.exceptions import NewConnectionError
+
+import logging
+import requests
+
+
+IDEMPOTENT_METHODS = ('GET', 'HEAD', 'OPTIONS', 'PUT', 'DELETE')
+
+
+class HTTPClient:
+    """
+    Pooled, retrying HTTP client. Safe across threads.
+    """
+
+    def __init__(
+            self,
+            connect_timeout=3.05,
+            read_timeout=30.0,
+            retries=5,
+            backoff_base=0.5,
+            backoff_max=30.0,
+            pool_size=10):
+        """
+        Initialize client.
+
+        :param connect_timeout: seconds to allow to connect
+        :param read_timeout: seconds to allow between bytes of response
+        :param retries: most retries after first attempt on transient failure
+        :param backoff_base: bound on wait before first retry, in seconds; bound doubles per retry
+        :param backoff_max: greatest bound on wait before any retry, in seconds
+        :param pool_size: keep-alive connections to retain per host
+        """
+
+        self._timeout = (connect_timeout, read_timeout)
+        self._retries = retries
+        self._backoff_base = backoff_base
+        self._backoff_max = backoff_max
+        self._session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)  # no urllib3 retries: ours
+        self._session.mount('http://', adapter)
+        self._session.mount('https://', adapter)
+
+    def _backoff(self, attempt, retry_after=None):
+        """
+        Return seconds to wait before retry.
+
+        :param attempt: number of attempts so far
+        :param retry_after: value of Retry-After response header, None for none
+        :return: seconds
+        """
+
+        wait = uniform(0, min(self._backoff_max, self._backoff_base * 2 ** (attempt - 1)))
+        try:
+            return max(wait, min(self._backoff_max, float(retry_after))) if retry_after else wait
+        except ValueError:  # HTTP-date: not worth parsing here
+            return wait
+
+    def request(self, method, url, idempotent=None, retries=None, **kwargs):
+        """
+        Send request, retrying on transient failure; return response, or raise the last failure
+        (requests.exceptions.RequestException) once out of retries. Return any non-transient error
+        response as is, for caller to check.
+
+        :param method: HTTP method
+        :param url: URL
+        :param idempotent: whether request is safe to repeat once the server may have processed it;
+            None to go by method
+        :param retries: most retries after first attempt, None for client default
+        :param kwargs: keyword arguments for requests (e.g., json), timeout overriding client default
+        :return: requests.Response
+        """
+
+        logger = logging.getLogger(__name__)
+
+        method = method.upper()
+        idempotent = method in IDEMPOTENT_METHODS if idempotent is None else idempotent
+        retries = self._retries if retries is None else retries
+        kwargs.setdefault('timeout', self._timeout)
+
+        attempt = 0
+        while True:
+            attempt += 1
+            try:
+                rsp = self._session.request(method, url, **kwargs)
+            except (ConnectionError, ReadTimeout) as e:
+                if attempt > retries or not (idempotent or _unsent(e)):
+                    raise
+                (failure, retry_after) = (e, None)
+            else:
+                transient = rsp.status_code == 503 or (idempotent and rsp.status_code in (502, 504))
+                if attempt > retries or not transient:
+                    return rsp  # including any error response: caller checks
+                (failure, retry_after) = ('HTTP {}'.format(rsp.status_code), rsp.headers.get('Retry-After'))
+
+            wait = self._backoff(attempt, retry_after)
+            logger.warning('{} {} failed ({}); retry {} of {} in {:.2f}s'.format(
+                method,
+                url,
+                failure,
+                attempt,
+                retries,
+                wait))
+            sleep(wait)
+
+    def get(self, url, **kwargs):
+        """
+        Send GET request; see request().
+
+        :param url: URL
+        :param kwargs: keyword arguments for request()
+        :return: requests.Response
+        """
+
+        return self.request('GET', url, **kwargs)
+
+    def post(self, url, **kwargs):
+        """
+        Send POST request; see request(). POST is not idempotent unless caller says so.
+
+        :param url: URL
+        :param kwargs: keyword arguments for request()
+        :return: requests.Response
+        """
+
+        return self.request('POST', url, **kwargs)
+
+    def close(self):
+        """
+        Close pooled connections.
+        """
+
+        self._session.close()
+
+
+def _unsent(e):
+    """
+    Return whether connection error arose before sending request (connect timeout, connection refused),
+    so that the server cannot have processed it.
+
+    :param e: requests.exceptions.ConnectionError or ReadTimeout
+    :return: whether request went unsent
+    """
+
+    reason = getattr(e.args[0], 'reason', None) if e.args else None  # urllib3 MaxRetryError wraps the cause
+    return isinstance(e, ConnectTimeout) or isinstance(reason, NewConnectionError)
+
+
+def client_for(cfg):
+    """
+    Return HTTP client per [HTTP] section of configuration.
+
+    :param cfg: configuration dict
+    :return: HTTPClient
+    """
+
+    cfg_http = cfg.get('HTTP', {})
+    return HTTPClient(
+        connect_timeout=float(cfg_http.get('connect.timeout', 3.05)),
+        read_timeout=float(cfg_http.get('read.timeout', 30)),
+        retries=int(cfg_http.get('retries', 5)),
+        backoff_base=float(cfg_http.get('backoff.base', 0.5)),
+        backoff_max=float(cfg_http.get('backoff.max', 30)),
+        pool_size=int(cfg_http.get('pool.size', 10)))
@@ -0,0 +1,82 @@
+"""
+Copyright 2017-2018 Government of Canada - Public Services and Procurement Canada - buyandsell.gc.ca
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+import asyncio
+
+
+class SingleFlight:
+    """
+    Coalesce concurrent identical operations: the first caller for a key runs the operation, any caller
+    arriving with the same key while it is in flight awaits the same result (or exception) instead of
+    running its own. Nothing outlives the flight, so nothing goes stale.
+
+    Use on the connector event loop, no locking; a profiled request (wrapper_api/profiling.py) running on
+    a private event loop of its own coalesces only with itself.
+    """
+
+    def __init__(self):
+        """
+        Initialize with nothing in flight.
+        """
+
+        self._key2task = {}
+        self.leaders = 0
+        self.followers = 0
+
+    async def run(self, key, coro_factory):
+        """
+        Return result of operation for key, running it only if not already in flight.
+
+        The operation runs as a task of its own: cancelling one caller (e.g., on its request timeout)
+        does not cancel the operation for the rest.
+
+        :param key: hashable key identifying the operation
+        :param coro_factory: callable returning coroutine for the operation, called for the leader only
+        :return: operation result
+        """
+
+        key = (asyncio.get_event_loop(), key)  # a task cannot await a future on another loop
+        task = self._key2task.get(key)
+        if task is None:
+            task = asyncio.ensure_future(coro_factory())
+            self._key2task[key] = task
+            task.add_done_callback(lambda t: self._land(key, t))
+            self.leaders += 1
+        else:
+            self.followers += 1
+        return await asyncio.shield(task)
+
+    def _land(self, key, task):
+        if self._key2task.get(key) is task:
+            del self._key2task[key]
+        if not task.cancelled():
+            task.exception()  # retrieve: if every caller went away, asyncio would log it as never retrieved
+
+    def __len__(self):
+        return len(self._key2task)
+
+    def stats(self):
+        """
+        Return coalescing statistics.
+
+        :return: dict with operations in flight, leaders (operations run) and followers (operations saved)
+        """
+
+        return {
+            'in-flight': len(self._key2task),
+            'leaders': self.leaders,
+            'followers': self.followers
+        }
@@ -15,53 +15,120 @@ limitations under the License.
 """
 
 from configparser import ConfigParser
-from django.conf import settings
 from django.core.cache import cache
 from os.path import abspath, dirname, isfile, join as pjoin
 from os import environ, makedirs
+from wrapper_api import logs
 
 import logging
 
 
-_inis = [
-    pjoin(dirname(abspath(__file__)), 'config', 'config.ini'),
-    pjoin(
-        dirname(abspath(__file__)),
-        'config',
-        'agent-profile',
-        environ.get('AGENT_PROFILE', 'trust-anchor') + '.ini')
-]
+def hosted_profiles():
+    """
+    Return agent profiles that this process hosts: those in comma-separated AGENT_PROFILES environment variable
+    if set, otherwise the one in AGENT_PROFILE (default trust-anchor).
 
+    :return: list of agent profiles
+    """
+
+    if environ.get('AGENT_PROFILES'):
+        profiles = [p for p in environ['AGENT_PROFILES'].split(',') if p.strip()]
+    else:
+        profiles = [environ.get('AGENT_PROFILE', 'trust-anchor')]
+    return [p.lower().replace(' ', '') for p in profiles]  # wallet and pool names become dirs: spaces are evil
+
+
+def multi_profile():
+    """
+    Return whether this process hosts agent profiles from AGENT_PROFILES, each under its own URL prefix.
+
+    :return: whether process hosts several agent profiles
+    """
+
+    return bool(environ.get('AGENT_PROFILES'))
+
+
+def prefork_server_pid():
+    """
+    Return pid of pre-fork server master process, as config/gunicorn.py sets it in VON_CONNECTOR_PREFORK
+    environment variable for workers to inherit; None when not serving pre-fork.
+
+    :return: pid of pre-fork server master process, or None
+    """
+
+    return int(environ['VON_CONNECTOR_PREFORK']) if environ.get('VON_CONNECTOR_PREFORK') else None
+
+
+def _inis_for(profile):
+    return [
+        pjoin(dirname(abspath(__file__)), 'config', 'config.ini'),
+        pjoin(dirname(abspath(__file__)), 'config', 'agent-profile', profile + '.ini')
+    ]
+
+
+_inis = _inis_for(hosted_profiles()[0])
+
+
+def init_logging(cfg=None):
+    """
+    Initialize logging to log file for hosted profile(s), via queue to a writer thread (wrapper_api/logs.py),
+    per configuration [Logging] section.
+
+    :param cfg: configuration dict, None for defaults
+    """
 
-def init_logging():
     dir_log = pjoin(dirname(abspath(__file__)), 'log')
     makedirs(dir_log, exist_ok=True)
-    path_log = pjoin(dir_log, environ.get('AGENT_PROFILE', 'trust-anchor') + '.log')
+    path_log = pjoin(dir_log, ('hosted' if multi_profile() else hosted_profiles()[0]) + '.log')
 
+    cfg_logging = (cfg or {}).get('Logging', {})
     LOG_FORMAT='%(asctime)-15s | %(levelname)-8s | %(name)-12s | %(message)s'
-    logging.basicConfig(filename=path_log, level=logging.INFO, format=LOG_FORMAT, datefmt='%Y-%m-%d %H:%M:%S')
+    logs.start(
+        path_log,
+        LOG_FORMAT,
+        '%Y-%m-%d %H:%M:%S',
+        int(cfg_logging.get('queue.size', 10000)),
+        int(cfg_logging.get('rate.limit.burst', 5)),
+        float(cfg_logging.get('rate.limit.interval', 60)))
+    level = cfg_logging.get('level', 'INFO').upper()
+    logging.getLogger().setLevel(logging.INFO)
     logging.getLogger('asyncio').setLevel(logging.ERROR)
-    logging.getLogger('wrapper_api').setLevel(logging.INFO)
-    logging.getLogger('von_agent').setLevel(logging.INFO)
+    logging.getLogger('wrapper_api').setLevel(level)
+    logging.getLogger('von_agent').setLevel(level)
     logging.getLogger('indy').setLevel(logging.ERROR)
     logging.getLogger('requests').setLevel(logging.ERROR)
     logging.getLogger('urllib3').setLevel(logging.CRITICAL)
 
 
-def init_config():
-    init_logging()
+def _read_config(inis):
+    if all(isfile(ini) for ini in inis):
+        parser = ConfigParser()
+        for ini in inis:
+            parser.read(ini)
+        return {s: dict(parser[s].items()) for s in parser.sections()}
+    else:
+        raise FileNotFoundError('Configuration file(s) missing; check {}'.format(inis))
+
 
+def profile_config(profile):
+    """
+    Return configuration for agent profile: config.ini overlaid with agent-profile/<profile>.ini.
+
+    :param profile: agent profile
+    :return: configuration dict
+    """
+
+    key = 'config.{}'.format(profile)
+    if cache.get(key) == None:
+        cache.set(key, _read_config(_inis_for(profile)))
+    return cache.get(key)
+
+
+def init_config():
     global _inis
     if cache.get('config') == None:
-        if all(isfile(ini) for ini in _inis):
-            parser = ConfigParser()
-            for ini in _inis: 
-                parser.read(ini)
-            cache.set(
-                'config',
-                {s: dict(parser[s].items()) for s in parser.sections()})
-        else:
-            raise FileNotFoundError('Configuration file(s) missing; check {}'.format(_inis))
+        cache.set('config', _read_config(_inis))
+    init_logging(cache.get('config'))
 
     '''
     e.g.,
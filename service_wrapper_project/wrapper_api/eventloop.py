@@ -14,13 +14,131 @@ See the License for the specific language governing permissions and
 limitations under the License.
 """
 
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from threading import Event, Lock, Thread, get_ident
+
 import asyncio
+import logging
+
+
+_lock = Lock()
+_loop = None  # connector event loop, shared by all request threads
+_loop_thread_ident = None
+_loop_owned = False  # False for adopted loop (e.g., ASGI server's): not ours to stop
+
+
+def _run(loop, started):
+    global _loop_thread_ident
+
+    asyncio.set_event_loop(loop)
+    _loop_thread_ident = get_ident()
+    started.set()
+    try:
+        loop.run_forever()
+    finally:
+        loop.close()
+
+
+def start(loop=None):
+    """
+    Start the connector event loop on a long-lived daemon thread, if not yet running, and return it.
+
+    Given a loop running on the calling thread (e.g., an ASGI server's), adopt that loop as the
+    connector event loop instead, so that async views and blocking do() calls share it.
+
+    :param loop: running event loop to adopt, None to start a dedicated one
+    :return: connector event loop
+    """
+
+    global _loop, _loop_thread_ident, _loop_owned
+
+    with _lock:
+        if _loop is None:
+            if loop is None:
+                loop = asyncio.new_event_loop()
+                started = Event()
+                Thread(target=_run, args=(loop, started), name='von-connector-loop', daemon=True).start()
+                started.wait()
+                _loop_owned = True
+                logging.getLogger(__name__).debug('Started connector event loop')
+            else:
+                _loop_thread_ident = get_ident()
+                _loop_owned = False
+                logging.getLogger(__name__).debug('Adopted running event loop as connector event loop')
+            _loop = loop
+    return _loop
+
+
+def stop():
+    """
+    Stop the connector event loop, if running; cancel anything still pending on it.
+    Detach from an adopted loop without stopping it: its owner does that.
+    """
+
+    global _loop
+
+    with _lock:
+        loop = _loop
+        _loop = None
+    if loop is None or not _loop_owned:
+        return
+
+    all_tasks = getattr(asyncio, 'all_tasks', None) or asyncio.Task.all_tasks
+    current_task = getattr(asyncio, 'current_task', None) or asyncio.Task.current_task
+
+    async def _cancel_pending():
+        for task in all_tasks(loop):
+            if task is not current_task(loop):
+                task.cancel()
+
+    asyncio.run_coroutine_threadsafe(_cancel_pending(), loop).result()
+    loop.call_soon_threadsafe(loop.stop)
+
+
+def submit(coro):
+    """
+    Schedule coroutine on the connector event loop from any thread other than the loop's own.
+
+    :param coro: coroutine to run
+    :return: concurrent.futures.Future for its result
+    """
+
+    loop = _loop
+    if loop is None:
+        raise RuntimeError('Connector event loop is not running')
+    if get_ident() == _loop_thread_ident:
+        raise RuntimeError('Cannot block on connector event loop from its own thread')
+    return asyncio.run_coroutine_threadsafe(coro, loop)
+
+
+def do(coro, timeout=None):
+    """
+    Run coroutine to completion and return its result. Run it on the connector event loop if running,
+    so that work from concurrent request threads overlaps there; otherwise (e.g., management commands
+    that never start the loop) run it on the calling thread's own loop.
+
+    Raise TimeoutError, and cancel the coroutine, if it does not complete within timeout.
+
+    :param coro: coroutine to run
+    :param timeout: seconds to wait, None to wait indefinitely
+    :return: coroutine result
+    """
+
+    if _loop is None:
+        event_loop = None
+        try:
+            event_loop = asyncio.get_event_loop()
+        except RuntimeError:
+            event_loop = asyncio.new_event_loop()
+            asyncio.set_event_loop(event_loop)
+        try:
+            return event_loop.run_until_complete(asyncio.wait_for(coro, timeout))
+        except asyncio.TimeoutError:
+            raise TimeoutError('Operation timed out after {} seconds'.format(timeout))
 
-def do(coro):
-    event_loop = None
+    future = submit(coro)
     try:
-        event_loop = asyncio.get_event_loop()
-    except RuntimeError:
-        event_loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(event_loop)
-    return event_loop.run_until_complete(coro)
+        return future.result(timeout)
+    except FutureTimeoutError:
+        future.cancel()  # cancels the task on the loop too
+        raise TimeoutError('Operation timed out after {} seconds'.format(timeout))
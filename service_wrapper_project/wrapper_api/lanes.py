@@ -0,0 +1,212 @@
+"""
+Copyright 2017-2018 Government of Canada - Public Services and Procurement Canada - buyandsell.gc.ca
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+"""
+Lane scheduler: dispatch agent work by route lane (wrapper_api/router.py) -- interactive lookups, issuance,
+proof -- into a fixed number of slots, so that cheap lookups do not queue behind a backlog of heavy proof and
+claim operations on the agent's wallet and libindy, which the event loop would otherwise admit without bound.
+
+When work waits, each slot that comes free goes to a waiting lane by smooth weighted round robin: with
+weights 8, 2, 1, interactive work gets 8 of every 11 slots that free up while all lanes wait. Issuance and
+proof work may never hold the last [Lanes] reserve slots, so that a lookup finds a slot at once even while
+heavy work fills the rest. Configuration [Lanes] section, e.g.,
+
+    [Lanes]
+    slots=8
+    reserve=2
+    interactive.weight=8
+    issuance.weight=2
+    proof.weight=1
+
+Slots are per process: under pre-fork serving, per worker.
+"""
+
+from collections import deque
+from threading import Lock
+from wrapper_api.router import LANES
+
+import asyncio
+
+
+class _Lane:
+    """
+    Scheduling state for one lane.
+    """
+
+    def __init__(self, name, weight):
+        self.name = name
+        self.weight = weight
+        self.current = 0  # smooth weighted round robin credit
+        self.active = 0
+        self.waiters = deque()  # (loop, future) pairs, in order of arrival
+        self.dispatched = 0
+
+
+class LaneScheduler:
+    """
+    Weighted fair dispatch of work by lane into slots. Safe across threads; work on any event loop takes turns.
+    """
+
+    def __init__(self, slots=8, reserve=2, weights=None):
+        """
+        Initialize scheduler.
+
+        :param slots: most units of work in process at once, across lanes; 0 for no limit
+        :param reserve: slots that only interactive work may take
+        :param weights: dict mapping lane to weight (default interactive 8, issuance 2, proof 1)
+        """
+
+        weights = {'interactive': 8, 'issuance': 2, 'proof': 1, **(weights or {})}
+        self._slots = slots
+        self._reserve = min(reserve, max(slots - 1, 0))  # leave heavy lanes a slot at least
+        self._lanes = {lane: _Lane(lane, max(int(weights[lane]), 1)) for lane in LANES}
+        self._lock = Lock()
+
+    def _active(self):
+        return sum(lane.active for lane in self._lanes.values())
+
+    def _open_to(self, lane):
+        """
+        Return whether a slot is free for lane. Call holding lock.
+
+        :param lane: lane
+        :return: whether lane may take a slot
+        """
+
+        limit = self._slots if lane.name == 'interactive' else self._slots - self._reserve
+        return self._active() < limit
+
+    def _next(self):
+        """
+        Return waiting lane to take a free slot by smooth weighted round robin, None for none. Call holding lock.
+
+        :return: lane or None
+        """
+
+        eligible = [lane for lane in self._lanes.values() if lane.waiters and self._open_to(lane)]
+        if not eligible:
+            return None
+        for lane in eligible:
+            lane.current += lane.weight
+        rv = max(eligible, key=lambda lane: lane.current)
+        rv.current -= sum(lane.weight for lane in eligible)
+        return rv
+
+    async def acquire(self, lane_name):
+        """
+        Wait for a slot for work in lane.
+
+        :param lane_name: lane, one of router.LANES
+        """
+
+        with self._lock:
+            lane = self._lanes[lane_name]
+            waiting = any(other.waiters and self._open_to(other) for other in self._lanes.values())
+            if not self._slots or (self._open_to(lane) and not waiting):  # no queue jumping
+                lane.active += 1
+                lane.dispatched += 1
+                return
+            loop = asyncio.get_event_loop()
+            future = loop.create_future()
+            lane.waiters.append((loop, future))
+
+        try:
+            await future
+        except BaseException:
+            with self._lock:
+                if (loop, future) in lane.waiters:
+                    lane.waiters.remove((loop, future))
+                    raise
+            if future.done() and not future.cancelled():
+                self.release(lane_name)  # got a slot, but caller went away (e.g., request timeout): pass it on
+            raise  # else _grant() sees the cancelled future and passes the slot on
+
+    def release(self, lane_name):
+        """
+        Free a slot that work in lane held; dispatch waiting work into any slots free.
+
+        :param lane_name: lane, one of router.LANES
+        """
+
+        with self._lock:
+            self._lanes[lane_name].active -= 1
+            grants = []
+            while True:
+                lane = self._next()
+                if lane is None:
+                    break
+                (loop, future) = lane.waiters.popleft()
+                lane.active += 1  # holds the slot for the waiter until it wakes
+                grants.append((lane.name, loop, future))
+        for (name, loop, future) in grants:
+            if loop.is_closed():
+                self.release(name)
+            else:
+                loop.call_soon_threadsafe(self._grant, name, future)
+
+    def _grant(self, lane_name, future):
+        if future.done():  # cancelled meanwhile
+            self.release(lane_name)
+        else:
+            with self._lock:
+                self._lanes[lane_name].dispatched += 1
+            future.set_result(None)
+
+    async def run(self, lane_name, coro_factory):
+        """
+        Run work in lane once it has a slot; return its result.
+
+        :param lane_name: lane, one of router.LANES
+        :param coro_factory: callable returning coroutine for the work, called once it has a slot
+        :return: work result
+        """
+
+        await self.acquire(lane_name)
+        try:
+            return await coro_factory()
+        finally:
+            self.release(lane_name)
+
+    def stats(self):
+        """
+        Return scheduling statistics by lane.
+
+        :return: dict mapping lane to dict with active, waiting, dispatched
+        """
+
+        with self._lock:
+            return {
+                lane.name: {
+                    'active': lane.active,
+                    'waiting': len(lane.waiters),
+                    'dispatched': lane.dispatched
+                } for lane in self._lanes.values()
+            }
+
+
+def scheduler_for(cfg):
+    """
+    Return lane scheduler per configuration [Lanes] section.
+
+    :param cfg: configuration dict
+    :return: LaneScheduler
+    """
+
+    cfg_lanes = cfg.get('Lanes', {})
+    return LaneScheduler(
+        int(cfg_lanes.get('slots', 8)),
+        int(cfg_lanes.get('reserve', 2)),
+        {lane: int(cfg_lanes['{}.weight'.format(lane)]) for lane in LANES if '{}.weight'.format(lane) in cfg_lanes})
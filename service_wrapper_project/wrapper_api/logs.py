@@ -0,0 +1,194 @@
+"""
+Copyright 2017-2018 Government of Canada - Public Services and Procurement Canada - buyandsell.gc.ca
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+"""
+Queue-backed logging, off the request path. Loggers hand records to a bounded in-memory queue; a listener
+thread formats them (messages, tracebacks) and writes them to the log file. A full queue drops records
+rather than holding up the request, and counts them.
+
+A rate limit filter lets through only so many identical warning or error records (same logger, level
+and message) per interval, and notes how many it suppressed on the next one through: a flood of one bad
+request makes a few lines of log, not one per request.
+
+The listener thread does not survive a fork: a pre-fork worker starts its own (config/gunicorn.py post_fork
+calls WrapperApiConfig.start(), which initializes logging anew).
+"""
+
+from logging.handlers import QueueHandler, QueueListener
+from os import getpid
+from queue import Full, Queue
+from threading import Lock
+from time import monotonic
+
+import atexit
+import logging
+
+
+class RateLimitFilter(logging.Filter):
+    """
+    Filter passing at most burst identical records at or above level per interval seconds.
+    """
+
+    def __init__(self, burst=5, interval=60.0, level=logging.WARNING, max_keys=1024):
+        """
+        Initialize filter.
+
+        :param burst: identical records to pass per interval; 0 to pass all
+        :param interval: seconds per interval
+        :param level: least level to limit; records below pass
+        :param max_keys: most distinct records to track at once
+        """
+
+        super().__init__()
+        self._burst = burst
+        self._interval = interval
+        self._level = level
+        self._max_keys = max_keys
+        self._lock = Lock()
+        self._key2window = {}  # (logger, level, message): [window start, records passed, records suppressed]
+        self.suppressed = 0
+
+    def filter(self, record):
+        if not self._burst or record.levelno < self._level or record.levelno >= logging.CRITICAL:
+            return True
+
+        key = (record.name, record.levelno, record.getMessage())
+        now = monotonic()
+        with self._lock:
+            window = self._key2window.get(key)
+            if window is None or now - window[0] >= self._interval:
+                if window is None and len(self._key2window) >= self._max_keys:
+                    self._purge(now)
+                suppressed = window[2] if window else 0
+                self._key2window[key] = [now, 1, 0]
+            elif window[1] < self._burst:
+                window[1] += 1
+                suppressed = 0
+            else:
+                window[2] += 1
+                self.suppressed += 1
+                return False
+
+        if suppressed:
+            record.msg = '%s [suppressed %d identical records in prior %d seconds]'
+            record.args = (key[2], suppressed, self._interval)
+        return True
+
+    def _purge(self, now):
+        """
+        Forget records whose windows have closed, or all if none has. Call holding lock.
+
+        :param now: monotonic time
+        """
+
+        for key in [k for (k, w) in self._key2window.items() if now - w[0] >= self._interval]:
+            del self._key2window[key]
+        if len(self._key2window) >= self._max_keys:
+            self._key2window.clear()
+
+
+class _QueueHandler(QueueHandler):
+    """
+    Queue handler leaving formatting to the listener thread, and dropping records when the queue is full.
+    """
+
+    dropped = 0
+
+    def prepare(self, record):
+        return record  # same process: the listener formats, off the request path
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except Full:
+            self.dropped += 1
+
+
+_lock = Lock()
+_pid = None
+_listener = None
+_handler = None
+
+
+def start(path_log, fmt, datefmt, queue_size=10000, burst=5, interval=60.0):
+    """
+    Route root logger through a queue to a listener thread writing to log file, unless done already in
+    this process. Like logging.basicConfig(), do nothing if the root logger has handlers of its own.
+
+    :param path_log: path to log file
+    :param fmt: log record format
+    :param datefmt: log record date format
+    :param queue_size: most records to queue for the listener thread
+    :param burst: identical warning and error records to pass per interval; 0 to pass all
+    :param interval: seconds per rate limit interval
+    """
+
+    global _pid, _listener, _handler
+
+    with _lock:
+        if _pid == getpid():
+            return
+        root = logging.getLogger()
+        if _handler is None and root.handlers:
+            return
+
+        file_handler = logging.FileHandler(path_log)  # after a fork, anew: another thread may hold the old lock
+        file_handler.setFormatter(logging.Formatter(fmt, datefmt))
+
+        handler = _QueueHandler(Queue(queue_size))
+        handler.addFilter(RateLimitFilter(burst, interval))
+        if _handler is not None:
+            root.removeHandler(_handler)  # inherited across fork, with no listener thread to drain its queue
+        root.addHandler(handler)
+
+        _listener = QueueListener(handler.queue, file_handler, respect_handler_level=True)
+        _listener.start()
+        _handler = handler
+        _pid = getpid()
+
+
+def stop():
+    """
+    Stop listener thread, once it writes all queued records.
+    """
+
+    global _pid, _listener
+
+    with _lock:
+        if _listener is not None and _pid == getpid():
+            _listener.stop()
+            for handler in _listener.handlers:
+                handler.close()
+            _listener = None
+            _pid = None
+
+
+def stats():
+    """
+    Return logging statistics for this process.
+
+    :return: dict with records dropped on full queue, and records suppressed by rate limit
+    """
+
+    if _handler is None:
+        return {'dropped': 0, 'suppressed': 0}
+    return {
+        'dropped': _handler.dropped,
+        'suppressed': sum(f.suppressed for f in _handler.filters if isinstance(f, RateLimitFilter))
+    }
+
+
+atexit.register(stop)
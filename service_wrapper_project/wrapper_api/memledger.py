@@ -0,0 +1,372 @@
+"""
+Copyright 2017-2018 Government of Canada - Public Services and Procurement Canada - buyandsell.gc.ca
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+"""
+In-memory stand-in for the indy node pool, for offline load testing and capacity planning: [Pool] backend=memory.
+
+Agents still build requests and sign writes with libindy and their wallets, as ever; only submission to the
+pool changes. MemoryNodePool opens no connection to any node: its handle routes submit_request() and
+sign_and_submit_request() (indy.ledger, as von_agent calls them) to a MemoryLedger, which answers nym,
+attrib (endpoint), schema, claim definition and txn reads and writes as the node pool would reply.
+
+The ledger journals its transactions to a file, [Pool] memory.journal.path (default wrapper_api/state/
+memory-ledger.jsonl), so that processes on one box (e.g., one per agent profile, or pre-fork workers) share one
+ledger, and so that it outlives restarts as agent wallets do. Delete journal and wallets together to start over.
+
+It checks no permissions beyond requiring a nym on the ledger for the submitter of any write but a nym, which
+stands in for genesis transactions. [Pool] memory.read.latency and memory.write.latency simulate pool latency.
+"""
+
+from fcntl import flock, LOCK_EX, LOCK_UN
+from itertools import count
+from os import makedirs
+from os.path import dirname, getsize, isfile
+from threading import RLock
+from time import time
+from von_agent.nodepool import NodePool
+
+import asyncio
+import indy.ledger
+import json
+import logging
+
+
+_handles = count(-1, -1)  # negative: never an indy-sdk pool handle
+_handle2ledger = {}
+_indy_submit_request = indy.ledger.submit_request
+_indy_sign_and_submit_request = indy.ledger.sign_and_submit_request
+
+
+class MemoryLedger:
+    """
+    Ledger of nym, attrib, schema and claim definition transactions, indexed in memory and journaled to a file.
+    """
+
+    def __init__(self, path, read_latency=0.0, write_latency=0.0):
+        """
+        Initialize ledger on journal at path; do not load yet.
+
+        :param path: path to journal file (json line per transaction)
+        :param read_latency: seconds to take over every read
+        :param write_latency: seconds to take over every write
+        """
+
+        self._path = path
+        self._read_latency = read_latency
+        self._write_latency = write_latency
+        self._lock = RLock()
+        self._offset = 0  # bytes of journal applied
+        self._txns = []  # by sequence number less 1
+        self._did2nym = {}  # DID: seq no of nym txn
+        self._attrs = {}  # (DID, attribute name): (raw json, seq no)
+        self._schemata = {}  # (origin DID, name, version): seq no
+        self._claim_defs = {}  # (schema seq no, signature type, origin DID): seq no
+
+    @property
+    def path(self):
+        """
+        Accessor for path to journal file.
+
+        :return: path
+        """
+
+        return self._path
+
+    def __len__(self):
+        with self._lock:
+            self._sync()
+            return len(self._txns)
+
+    def _apply(self, txn):
+        self._txns.append(txn)
+        seq_no = txn['seqNo']
+        if txn['type'] == '1':
+            self._did2nym[txn['dest']] = seq_no
+        elif txn['type'] == '100':
+            for (name, value) in json.loads(txn['raw']).items():
+                self._attrs[(txn['dest'], name)] = (json.dumps({name: value}), seq_no)
+        elif txn['type'] == '101':
+            self._schemata[(txn['identifier'], txn['data']['name'], txn['data']['version'])] = seq_no
+        elif txn['type'] == '102':
+            self._claim_defs[(txn['ref'], txn['signature_type'], txn['identifier'])] = seq_no
+
+    def _sync(self, journal_f=None):
+        """
+        Apply transactions that any process has journaled since last sync. Call holding lock.
+
+        :param journal_f: journal file open for reading, None to open it if it has grown
+        """
+
+        if journal_f is None:
+            if not isfile(self._path) or getsize(self._path) <= self._offset:
+                return
+            with open(self._path, 'r') as f:
+                self._sync(f)
+            return
+
+        journal_f.seek(self._offset)
+        for line in journal_f:
+            if not line.endswith('\n'):
+                break  # partial line: writer holds the lock still
+            self._apply(json.loads(line))
+            self._offset += len(line.encode('utf-8'))
+
+    def _write(self, txn):
+        """
+        Journal transaction under file lock, assigning it the next sequence number; apply it.
+
+        :param txn: transaction, less sequence number
+        :return: transaction
+        """
+
+        with self._lock:
+            makedirs(dirname(self._path), exist_ok=True)
+            with open(self._path, 'a+') as journal_f:
+                flock(journal_f, LOCK_EX)
+                try:
+                    self._sync(journal_f)
+                    txn['seqNo'] = len(self._txns) + 1
+                    journal_f.write('{}\n'.format(json.dumps(txn)))
+                    journal_f.flush()
+                    self._sync(journal_f)
+                finally:
+                    flock(journal_f, LOCK_UN)
+        return txn
+
+    def _nym_json(self, did):
+        seq_no = self._did2nym.get(did)
+        if seq_no is None:
+            return None
+        txn = self._txns[seq_no - 1]
+        return json.dumps({
+            'dest': did,
+            'identifier': txn['identifier'],
+            'role': txn.get('role'),
+            'seqNo': seq_no,
+            'txnTime': txn['txnTime'],
+            'verkey': txn.get('verkey')
+        })
+
+    def _read(self, req):
+        """
+        Answer read request.
+
+        :param req: request
+        :return: reply result
+        """
+
+        op = req['operation']
+        rv = {'identifier': req['identifier'], 'reqId': req['reqId'], 'type': op['type']}
+
+        if op['type'] == '105':  # GET_NYM
+            data = self._nym_json(op['dest'])
+            rv.update({'dest': op['dest'], 'data': data, 'seqNo': json.loads(data)['seqNo'] if data else None})
+
+        elif op['type'] == '104':  # GET_ATTR
+            (data, seq_no) = self._attrs.get((op['dest'], op.get('raw')), (None, None))
+            rv.update({'dest': op['dest'], 'raw': op.get('raw'), 'data': data, 'seqNo': seq_no})
+
+        elif op['type'] == '107':  # GET_SCHEMA
+            seq_no = self._schemata.get((op['dest'], op['data']['name'], op['data']['version']))
+            rv.update({
+                'dest': op['dest'],
+                'data': self._txns[seq_no - 1]['data'] if seq_no else {
+                    'name': op['data']['name'],
+                    'version': op['data']['version']
+                },
+                'seqNo': seq_no
+            })
+
+        elif op['type'] == '108':  # GET_CLAIM_DEF
+            seq_no = self._claim_defs.get((op['ref'], op['signature_type'], op['origin']))
+            rv.update({
+                'ref': op['ref'],
+                'signature_type': op['signature_type'],
+                'origin': op['origin'],
+                'data': self._txns[seq_no - 1]['data'] if seq_no else None,
+                'seqNo': seq_no
+            })
+
+        else:  # GET_TXN
+            seq_no = int(op['data'])
+            rv.update({'data': self._txns[seq_no - 1] if 0 < seq_no <= len(self._txns) else None, 'seqNo': seq_no})
+
+        return rv
+
+    def _check_write(self, req):
+        """
+        Return reason to reject write request, None to accept it.
+
+        :param req: request
+        :return: reason or None
+        """
+
+        op = req['operation']
+        if op['type'] != '1' and req['identifier'] not in self._did2nym:
+            return 'client request invalid: could not authenticate, verkey for {} cannot be found'.format(
+                req['identifier'])
+        if op['type'] == '102':
+            ref = int(op['ref'])
+            if not (0 < ref <= len(self._txns) and self._txns[ref - 1]['type'] == '101'):
+                return 'client request invalid: mentioned seqNo ({}) is not a SCHEMA txn'.format(ref)
+        return None
+
+    async def submit(self, req_json):
+        """
+        Take (signed, for a write) request and return reply as the node pool would.
+
+        :param req_json: request json
+        :return: reply json
+        """
+
+        req = json.loads(req_json)
+        op = req['operation']
+        if op['type'] in ('105', '104', '107', '108', '3'):
+            if self._read_latency:
+                await asyncio.sleep(self._read_latency)
+            with self._lock:
+                self._sync()
+                return json.dumps({'op': 'REPLY', 'result': self._read(req)})
+
+        if op['type'] not in ('1', '100', '101', '102'):
+            return json.dumps({
+                'op': 'REQNACK',
+                'identifier': req.get('identifier'),
+                'reqId': req.get('reqId'),
+                'reason': 'client request invalid: unsupported transaction type {}'.format(op['type'])
+            })
+
+        if self._write_latency:
+            await asyncio.sleep(self._write_latency)
+        with self._lock:
+            self._sync()
+            reason = self._check_write(req)
+            if reason is not None:
+                return json.dumps({
+                    'op': 'REJECT',
+                    'identifier': req['identifier'],
+                    'reqId': req['reqId'],
+                    'reason': reason
+                })
+            txn = {
+                **op,
+                'identifier': req['identifier'],
+                'reqId': req['reqId'],
+                'signature': req.get('signature'),
+                'txnTime': int(time())
+            }
+            if isinstance(txn.get('data'), str):  # schema data may arrive double-encoded
+                txn['data'] = json.loads(txn['data'])
+            if op['type'] == '102':
+                txn['ref'] = int(txn['ref'])
+            return json.dumps({'op': 'REPLY', 'result': self._write(txn)})
+
+
+async def _submit_request(pool_handle, request_json):
+    ledger = _handle2ledger.get(pool_handle)
+    if ledger is None:
+        return await _indy_submit_request(pool_handle, request_json)
+    return await ledger.submit(request_json)
+
+
+async def _sign_and_submit_request(pool_handle, wallet_handle, submitter_did, request_json):
+    ledger = _handle2ledger.get(pool_handle)
+    if ledger is None:
+        return await _indy_sign_and_submit_request(pool_handle, wallet_handle, submitter_did, request_json)
+    return await ledger.submit(await indy.ledger.sign_request(wallet_handle, submitter_did, request_json))
+
+
+def install():
+    """
+    Route submit_request() and sign_and_submit_request() (indy.ledger) on memory node pool handles to their
+    memory ledgers, and on any other handle to libindy as ever.
+    """
+
+    indy.ledger.submit_request = _submit_request  # von_agent calls ledger.submit_request() by module attribute
+    indy.ledger.sign_and_submit_request = _sign_and_submit_request
+
+
+def uninstall():
+    """
+    Restore submit_request() and sign_and_submit_request() (indy.ledger) as libindy has them.
+    """
+
+    indy.ledger.submit_request = _indy_submit_request
+    indy.ledger.sign_and_submit_request = _indy_sign_and_submit_request
+
+
+class MemoryNodePool(NodePool):
+    """
+    Node pool standing in for the indy node pool with a MemoryLedger: opening it touches no node and
+    no indy-sdk pool configuration.
+    """
+
+    def __init__(self, name, genesis_txn_path, ledger, cfg=None):
+        """
+        Initializer for node pool. Does not open the pool, only retains input parameters.
+
+        :param name: name of the pool
+        :param genesis_txn_path: path to genesis transaction file, for the record only
+        :param ledger: MemoryLedger to answer requests
+        :param cfg: configuration, as for NodePool
+        """
+
+        super().__init__(name, genesis_txn_path, cfg)
+        self._ledger = ledger
+
+    @property
+    def ledger(self):
+        """
+        Accessor for memory ledger.
+
+        :return: memory ledger
+        """
+
+        return self._ledger
+
+    async def open(self):
+        """
+        Route requests on (new) pool handle to memory ledger.
+
+        :return: current object
+        """
+
+        install()
+        self._handle = next(_handles)
+        _handle2ledger[self._handle] = self._ledger
+        logging.getLogger(__name__).info('Opened memory node pool {} on ledger journal {} ({} txns)'.format(
+            self.name,
+            self._ledger.path,
+            len(self._ledger)))
+        return self
+
+    async def close(self):
+        """
+        Stop routing requests on pool handle, and restore indy.ledger once no memory node pool is open;
+        the ledger journal stays.
+        """
+
+        _handle2ledger.pop(self._handle, None)
+        self._handle = None
+        if not _handle2ledger:
+            uninstall()
+
+    async def remove(self):
+        """
+        Nothing to remove: no indy-sdk pool configuration exists.
+        """
+
+        pass
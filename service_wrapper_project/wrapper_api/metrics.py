@@ -0,0 +1,328 @@
+"""
+Copyright 2017-2018 Government of Canada - Public Services and Procurement Canada - buyandsell.gc.ca
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+"""
+Process-local metrics for the service wrapper, exposed in Prometheus text format on the metrics route.
+
+Per message type (or 'batch'), record:
+    - von_connector_requests_total{type, status}: requests served
+    - von_connector_errors_total{type, code}: error responses by error-code
+    - von_connector_request_seconds{type}: latency histogram, whole request through the django stack
+    - von_connector_agent_seconds{type}: latency histogram, agent processing (connector caches included)
+    - von_connector_overhead_seconds{type}: latency histogram, request less agent processing
+
+Pre-fork workers (config/gunicorn.py) each spill a snapshot of their metrics to a file per worker under
+wrapper_api/state/metrics.<server pid>/ every [Metrics] snapshot.interval seconds; whichever worker takes
+a scrape spills its own and sums them all, so a scrape reflects every worker of the server.
+"""
+
+from bisect import bisect_left
+from os import getpid, listdir, makedirs, replace
+from os.path import isdir, join as pjoin
+from shutil import rmtree
+from threading import Lock
+from time import perf_counter
+
+import asyncio
+import json
+import logging
+
+
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)  # seconds; then +Inf
+
+
+class Metrics:
+    """
+    Collector of counters and latency histograms by metric name and labels. Safe across threads: request
+    threads and the connector event loop thread both record.
+    """
+
+    def __init__(self):
+        """
+        Initialize empty collector.
+        """
+
+        self._lock = Lock()
+        self._counters = {}  # (name, labels): value; labels a tuple of (label, value) pairs
+        self._histograms = {}  # (name, labels): [bucket counts (last for +Inf), sum, count]
+        self._sources = []
+        self._dir_spill = None
+
+    def count(self, name, labels, n=1):
+        """
+        Add to counter.
+
+        :param name: metric name
+        :param labels: tuple of (label, value) pairs
+        :param n: amount to add
+        """
+
+        with self._lock:
+            self._counters[(name, labels)] = self._counters.get((name, labels), 0) + n
+
+    def observe(self, name, labels, seconds):
+        """
+        Record observation in histogram.
+
+        :param name: metric name
+        :param labels: tuple of (label, value) pairs
+        :param seconds: observed latency
+        """
+
+        with self._lock:
+            histogram = self._histograms.get((name, labels))
+            if histogram is None:
+                histogram = self._histograms[(name, labels)] = [[0] * (len(BUCKETS) + 1), 0.0, 0]
+            histogram[0][bisect_left(BUCKETS, seconds)] += 1
+            histogram[1] += seconds
+            histogram[2] += 1
+
+    def observe_agent(self, msg_type, seconds):
+        """
+        Record agent processing time for message type.
+
+        :param msg_type: message type
+        :param seconds: agent processing time
+        """
+
+        self.observe('von_connector_agent_seconds', (('type', msg_type),), seconds)
+
+    def observe_error(self, msg_type, error_code):
+        """
+        Record error response, or error in a batch item, for message type.
+
+        :param msg_type: message type, or 'batch'
+        :param error_code: error-code of error response
+        """
+
+        self.count('von_connector_errors_total', (('type', msg_type), ('code', str(error_code))))
+
+    def observe_request(self, msg_type, status, error_code, seconds, agent_seconds):
+        """
+        Record request served.
+
+        :param msg_type: message type, or 'batch'
+        :param status: HTTP status code
+        :param error_code: error-code of error response, None for success
+        :param seconds: request time, end to end
+        :param agent_seconds: part of request time spent on agent processing
+        """
+
+        self.count('von_connector_requests_total', (('type', msg_type), ('status', str(status))))
+        if error_code is not None:
+            self.observe_error(msg_type, error_code)
+        self.observe('von_connector_request_seconds', (('type', msg_type),), seconds)
+        self.observe('von_connector_overhead_seconds', (('type', msg_type),), max(seconds - agent_seconds, 0.0))
+
+    def add_source(self, source):
+        """
+        Add source of values to sample on snapshot, e.g., cache statistics.
+
+        :param source: callable returning iterable of (metric name, labels, value); names ending _total are
+            counters, others gauges
+        """
+
+        self._sources.append(source)
+
+    def snapshot(self):
+        """
+        Return json-serializable snapshot of metrics, sampling sources.
+
+        :return: snapshot dict
+        """
+
+        with self._lock:
+            counters = [[n, [list(l) for l in labels], v] for ((n, labels), v) in self._counters.items()]
+            histograms = [[n, [list(l) for l in labels], list(h[0]), h[1], h[2]]
+                for ((n, labels), h) in self._histograms.items()]
+        for source in self._sources:
+            counters.extend([n, [list(l) for l in labels], v] for (n, labels, v) in source())
+        return {'counters': counters, 'histograms': histograms}
+
+    def enable_spill(self, dir_spill):
+        """
+        Spill snapshots to file for this process in directory, for aggregation across pre-fork workers.
+
+        :param dir_spill: directory shared by workers of one server
+        """
+
+        makedirs(dir_spill, exist_ok=True)
+        self._dir_spill = dir_spill
+
+    def spill(self):
+        """
+        Write snapshot to file for this process, if spilling; atomically, so readers never see a partial file.
+        """
+
+        if self._dir_spill is None:
+            return
+        path = pjoin(self._dir_spill, '{}.json'.format(getpid()))
+        with open('{}.tmp'.format(path), 'w') as spill_f:
+            json.dump(self.snapshot(), spill_f)
+        replace('{}.tmp'.format(path), path)
+
+    async def spill_periodically(self, interval):
+        """
+        Spill snapshot every interval seconds, until cancelled (as on connector event loop stop).
+
+        :param interval: seconds between snapshots
+        """
+
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                self.spill()
+            except OSError as e:
+                logging.getLogger(__name__).warning('Could not spill metrics: {}'.format(e))
+
+    def collect(self):
+        """
+        Return snapshot for scrape: this process's own, summed with those of all other workers
+        of the same server if spilling.
+
+        :return: snapshot dict
+        """
+
+        if self._dir_spill is None:
+            return self.snapshot()
+
+        self.spill()
+        snapshots = []
+        for name in listdir(self._dir_spill):
+            if name.endswith('.json'):
+                try:
+                    with open(pjoin(self._dir_spill, name), 'r') as spill_f:
+                        snapshots.append(json.load(spill_f))
+                except (OSError, ValueError):
+                    pass  # worker mid-exit: skip
+        return merge(snapshots)
+
+
+def merge(snapshots):
+    """
+    Sum snapshots: counters, histogram buckets, sums and counts by metric name and labels.
+    Sources' gauges sum too, e.g., into cache entries across workers.
+
+    :param snapshots: iterable of snapshot dicts
+    :return: snapshot dict
+    """
+
+    counters = {}
+    histograms = {}
+    for snapshot in snapshots:
+        for (n, labels, v) in snapshot['counters']:
+            key = (n, tuple(tuple(l) for l in labels))
+            counters[key] = counters.get(key, 0) + v
+        for (n, labels, buckets, total, count) in snapshot['histograms']:
+            key = (n, tuple(tuple(l) for l in labels))
+            h = histograms.setdefault(key, [[0] * len(buckets), 0.0, 0])
+            h[0] = [a + b for (a, b) in zip(h[0], buckets)]
+            h[1] += total
+            h[2] += count
+    return {
+        'counters': [[n, [list(l) for l in labels], v] for ((n, labels), v) in counters.items()],
+        'histograms': [[n, [list(l) for l in labels], h[0], h[1], h[2]] for ((n, labels), h) in histograms.items()]
+    }
+
+
+def _labels(labels, extra=()):
+    pairs = [tuple(l) for l in labels] + list(extra)
+    if not pairs:
+        return ''
+    return '{{{}}}'.format(','.join('{}="{}"'.format(k, str(v).replace('\\', '\\\\').replace('"', '\\"'))
+        for (k, v) in pairs))
+
+
+def exposition(snapshot):
+    """
+    Render snapshot in Prometheus text exposition format.
+
+    :param snapshot: snapshot dict
+    :return: text
+    """
+
+    lines = []
+    typed = set()
+    for (n, labels, v) in sorted(snapshot['counters'], key=lambda c: (c[0], c[1])):
+        if n not in typed:
+            lines.append('# TYPE {} {}'.format(n, 'counter' if n.endswith('_total') else 'gauge'))
+            typed.add(n)
+        lines.append('{}{} {}'.format(n, _labels(labels), v))
+    for (n, labels, buckets, total, count) in sorted(snapshot['histograms'], key=lambda h: (h[0], h[1])):
+        if n not in typed:
+            lines.append('# TYPE {} histogram'.format(n))
+            typed.add(n)
+        cumulative = 0
+        for (bound, bucket) in zip([str(b) for b in BUCKETS] + ['+Inf'], buckets):
+            cumulative += bucket
+            lines.append('{}_bucket{} {}'.format(n, _labels(labels, [('le', bound)]), cumulative))
+        lines.append('{}_sum{} {}'.format(n, _labels(labels), total))
+        lines.append('{}_count{} {}'.format(n, _labels(labels), count))
+    return '\n'.join(lines) + '\n'
+
+
+def error_code_of(status, body):
+    """
+    Return error-code of error response, None for success.
+
+    :param status: HTTP status code
+    :param body: response body, json (str or bytes)
+    :return: error-code from body, or else status code; None for success
+    """
+
+    if status == 200:
+        return None
+    try:
+        return json.loads(body.decode('utf-8') if isinstance(body, bytes) else body).get('error-code', status)
+    except (AttributeError, ValueError):
+        return status
+
+
+def remove_spills(dir_spill):
+    """
+    Remove directory of worker snapshots, as pre-fork server exits.
+
+    :param dir_spill: directory shared by workers of one server
+    """
+
+    if isdir(dir_spill):
+        rmtree(dir_spill, ignore_errors=True)
+
+
+class MetricsMiddleware:
+    """
+    Django middleware timing each service wrapper request through the whole stack, on the way in and out:
+    ServiceWrapper marks the request with its message type and agent processing time.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        start = perf_counter()
+        response = self.get_response(request)
+        marks = getattr(request, 'von_metrics', None)
+        if marks is not None:
+            METRICS.observe_request(
+                marks['type'],
+                response.status_code,
+                error_code_of(response.status_code, response.content),
+                perf_counter() - start,
+                marks['agent'])
+        return response
+
+
+METRICS = Metrics()
@@ -0,0 +1,227 @@
+"""
+Copyright 2017-2018 Government of Canada - Public Services and Procurement Canada - buyandsell.gc.ca
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+"""
+On-demand profiling (cProfile) of service wrapper requests, for pstats, snakeviz and the like. Profiles
+land under wrapper_api/log/profiling/ as <msg-type>.<milliseconds>ms.<epoch milliseconds>.<pid>.prof.
+
+A request gets profiled if:
+    - it carries header X-Profiling: 1, and [Profiling] header=true allows it;
+    - the sampler picks it, at [Profiling] sample.rate (the profiling route sets it at runtime); or
+    - a request of its message type took longer than [Profiling] slow.seconds: the next one of that type
+      gets profiled, at most once per [Profiling] slow.interval seconds.
+
+One request at a time: while a profile is in progress, others run unprofiled.
+
+cProfile sees only the thread that enables it, so a profiled request does not run on the connector
+event loop: it runs its coroutine on a private event loop on its own thread, profiler on, to cover the
+connector, von_agent and indy wrapper coroutines together and nothing from concurrent requests. Time
+that libindy spends on its own threads shows up as time waiting in select().
+"""
+
+from os import getpid, makedirs
+from os.path import abspath, dirname, join as pjoin
+from random import random
+from threading import Lock
+from time import monotonic, perf_counter, time as epoch
+from wrapper_api.eventloop import do
+
+import asyncio
+import cProfile
+import logging
+
+
+DIR_PROFILING = pjoin(dirname(abspath(__file__)), 'log', 'profiling')
+HEADER = 'X-Profiling'
+
+
+class Profiler:
+    """
+    Decide which requests to profile, profile them, and write out the profiles. Safe across threads.
+    """
+
+    def __init__(self, dir_out, header=False, sample_rate=0.0, slow_seconds=0.0, slow_interval=60.0):
+        """
+        Initialize profiler.
+
+        :param dir_out: directory for profile files
+        :param header: whether to honour X-Profiling request header
+        :param sample_rate: fraction of requests to profile, 0 for none
+        :param slow_seconds: request duration past which to profile next request of its message type, 0 for never
+        :param slow_interval: least seconds between captures that slow requests trigger, per message type
+        """
+
+        self._dir_out = dir_out
+        self._lock = Lock()
+        self._busy = Lock()  # held while a profile is in progress
+        self._armed = set()  # message types for which to profile next request
+        self._type2slow = {}  # message type: monotonic time of latest slow request arming a capture
+        self._settings = {}
+        self.configure(header=header, sample_rate=sample_rate, slow_seconds=slow_seconds)
+        self._slow_interval = slow_interval
+
+    def settings(self):
+        """
+        Return current settings.
+
+        :return: dict with header, sample.rate, slow.seconds, armed message types
+        """
+
+        with self._lock:
+            return {**self._settings, 'armed': sorted(self._armed)}
+
+    def configure(self, header=None, sample_rate=None, slow_seconds=None):
+        """
+        Change settings; leave any that are None as they are. Raise ValueError for out-of-range setting.
+
+        :param header: whether to honour X-Profiling request header
+        :param sample_rate: fraction of requests to profile, 0 for none
+        :param slow_seconds: request duration past which to profile next request of its message type, 0 for never
+        :return: current settings
+        """
+
+        if sample_rate is not None and not 0 <= float(sample_rate) <= 1:
+            raise ValueError('Profiling sample rate {} is not between 0 and 1'.format(sample_rate))
+        if slow_seconds is not None and float(slow_seconds) < 0:
+            raise ValueError('Profiling slow request threshold {} is negative'.format(slow_seconds))
+
+        with self._lock:
+            if header is not None:
+                self._settings['header'] = bool(header)
+            if sample_rate is not None:
+                self._settings['sample.rate'] = float(sample_rate)
+            if slow_seconds is not None:
+                self._settings['slow.seconds'] = float(slow_seconds)
+                if not self._settings['slow.seconds']:
+                    self._armed.clear()
+        logging.getLogger(__name__).info('Profiling settings: {}'.format(self._settings))
+        return self.settings()
+
+    def wants(self, msg_type, header=None):
+        """
+        Return whether to profile request; disarm any capture that a slow request of its type armed.
+
+        :param msg_type: message type, or 'batch'
+        :param header: value of X-Profiling request header, None for none
+        :return: whether to profile request
+        """
+
+        with self._lock:
+            if msg_type in self._armed:
+                self._armed.discard(msg_type)
+                return True
+            if header and self._settings['header'] and header.strip().lower() in ('1', 'true', 'yes'):
+                return True
+            return random() < self._settings['sample.rate']
+
+    def note(self, msg_type, seconds):
+        """
+        Note request duration: arm a capture of next request of its message type if slow.
+
+        :param msg_type: message type, or 'batch'
+        :param seconds: request duration
+        """
+
+        with self._lock:
+            threshold = self._settings['slow.seconds']
+            if not threshold or seconds <= threshold or msg_type in self._armed:
+                return
+            now = monotonic()
+            if now - self._type2slow.get(msg_type, now - self._slow_interval) < self._slow_interval:
+                return
+            self._type2slow[msg_type] = now
+            self._armed.add(msg_type)
+        logging.getLogger(__name__).info('Slow {} request ({:.3f}s): profiling next one'.format(msg_type, seconds))
+
+    def run(self, coro, msg_type, timeout=None):
+        """
+        Run coroutine to completion under the profiler, on a private event loop on the calling thread, and
+        write out the profile. If another profile is in progress, run it on the connector event loop instead.
+        Call from any thread but the connector event loop's.
+
+        Raise TimeoutError, and cancel the coroutine, if it does not complete within timeout.
+
+        :param coro: coroutine to run
+        :param msg_type: message type, or 'batch', for profile file name
+        :param timeout: seconds to wait, None to wait indefinitely
+        :return: coroutine result
+        """
+
+        if not self._busy.acquire(blocking=False):
+            return do(coro, timeout)
+
+        loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)  # indy wrapper binds its futures to the current thread's loop
+        profile = cProfile.Profile()
+        start = perf_counter()
+        try:
+            profile.enable()
+            try:
+                return loop.run_until_complete(asyncio.wait_for(coro, timeout))
+            except asyncio.TimeoutError:
+                raise TimeoutError('Operation timed out after {} seconds'.format(timeout))
+            finally:
+                profile.disable()
+                self._dump(profile, msg_type, perf_counter() - start)
+        finally:
+            try:
+                _settle(loop)
+            finally:
+                asyncio.set_event_loop(None)
+                loop.close()
+                self._busy.release()
+
+    def _dump(self, profile, msg_type, seconds):
+        makedirs(self._dir_out, exist_ok=True)
+        path = pjoin(self._dir_out, '{}.{}ms.{}.{}.prof'.format(
+            msg_type,
+            int(seconds * 1000),
+            int(epoch() * 1000),
+            getpid()))
+        profile.dump_stats(path)
+        logging.getLogger(__name__).info('Wrote {} request profile to {}'.format(msg_type, path))
+
+
+def _settle(loop):
+    """
+    Cancel anything left pending on private event loop (e.g., a coalesced lookup past a timeout) and let it finish.
+
+    :param loop: event loop, not running
+    """
+
+    all_tasks = getattr(asyncio, 'all_tasks', None) or asyncio.Task.all_tasks
+    pending = [task for task in all_tasks(loop) if not task.done()]
+    for task in pending:
+        task.cancel()
+    if pending:
+        loop.run_until_complete(asyncio.gather(*pending, return_exceptions=True))
+
+
+def profiler_for(cfg):
+    """
+    Return profiler per [Profiling] section of configuration.
+
+    :param cfg: configuration dict
+    :return: Profiler
+    """
+
+    cfg_profiling = cfg.get('Profiling', {})
+    return Profiler(
+        DIR_PROFILING,
+        header=cfg_profiling.get('header', 'false').lower() in ('true', 'yes', '1'),
+        sample_rate=float(cfg_profiling.get('sample.rate', 0)),
+        slow_seconds=float(cfg_profiling.get('slow.seconds', 0)),
+        slow_interval=float(cfg_profiling.get('slow.interval', 60)))
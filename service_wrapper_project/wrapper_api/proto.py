@@ -0,0 +1,234 @@
+"""
+Copyright 2017-2018 Government of Canada - Public Services and Procurement Canada - buyandsell.gc.ca
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+"""
+Protocol form templates under wrapper_api/protocol/, loaded and validated once, at import.
+
+Each protocol/<msg-type>.json file holds a form with %s placeholders: a quoted "%s" takes a string,
+a bare %s takes any json-serializable value (dict, list, number, ...). Builders fill placeholders in
+document order and return a fresh form dict, with no file I/O, string interpolation or json parsing per use.
+Attribute names for schemata to send live at protocol/schema-send/<name>/<version>/attr-names.json.
+"""
+
+from os import listdir, walk
+from os.path import abspath, dirname, join as pjoin, relpath, sep
+
+import json
+import re
+
+
+DIR_PROTOCOL = pjoin(dirname(abspath(__file__)), 'protocol')
+
+
+class _Slot:
+    """
+    Placeholder in a parsed template.
+    """
+
+    def __init__(self, index, string):
+        self.index = index
+        self.string = string  # quoted "%s": argument must be a str
+
+
+def _parse(msg_type, raw):
+    """
+    Parse template text into a form tree with _Slot leaves; return tree and slot count.
+
+    :param msg_type: message type that template file name specifies
+    :param raw: template text
+    :return: (tree, number of slots)
+    """
+
+    count = [0]
+    markers = {}
+
+    def _mark(match):
+        markers['\u0000{}'.format(count[0])] = _Slot(count[0], match.group(0) == '"%s"')
+        count[0] += 1
+        return '"\\u0000{}"'.format(count[0] - 1)  # json escape: parses to the NUL-prefixed marker
+
+    tree = json.loads(re.sub(r'"%s"|%s', _mark, raw))
+
+    def _resolve(node):
+        if isinstance(node, dict):
+            return {k: _resolve(v) for (k, v) in node.items()}
+        if isinstance(node, list):
+            return [_resolve(v) for v in node]
+        return markers.get(node, node) if isinstance(node, str) else node
+
+    tree = _resolve(tree)
+    if not (isinstance(tree, dict) and tree.get('type') == msg_type and isinstance(tree.get('data'), dict)):
+        raise ValueError('Protocol template for {} must be a form with matching type and dict data'.format(msg_type))
+    return (tree, count[0])
+
+
+def _fill(node, args):
+    if isinstance(node, _Slot):
+        arg = args[node.index]
+        if node.string and not isinstance(arg, str):
+            raise TypeError('Protocol form placeholder {} takes a str, not {}'.format(node.index, type(arg).__name__))
+        return arg
+    if isinstance(node, dict):
+        return {k: _fill(v, args) for (k, v) in node.items()}
+    if isinstance(node, list):
+        return [_fill(v, args) for v in node]
+    return node
+
+
+def _load():
+    msg_type2template = {}
+    for name in sorted(listdir(DIR_PROTOCOL)):
+        if name.endswith('.json'):
+            msg_type = name[:-len('.json')]
+            with open(pjoin(DIR_PROTOCOL, name), 'r') as proto_f:
+                msg_type2template[msg_type] = _parse(msg_type, proto_f.read())
+
+    schema2attr_names = {}
+    for (dir_path, _, names) in walk(pjoin(DIR_PROTOCOL, 'schema-send')):
+        if 'attr-names.json' in names:
+            (schema_name, schema_version) = relpath(dir_path, pjoin(DIR_PROTOCOL, 'schema-send')).split(sep)
+            with open(pjoin(dir_path, 'attr-names.json'), 'r') as attr_names_f:
+                attr_names = json.load(attr_names_f)
+            if not (isinstance(attr_names, list) and all(isinstance(a, str) for a in attr_names)):
+                raise ValueError('Attribute names for schema {} version {} must be a list of str'.format(
+                    schema_name,
+                    schema_version))
+            schema2attr_names[(schema_name, schema_version)] = tuple(attr_names)
+
+    return (msg_type2template, schema2attr_names)
+
+
+(_MSG_TYPE2TEMPLATE, _SCHEMA2ATTR_NAMES) = _load()
+MSG_TYPES = frozenset(_MSG_TYPE2TEMPLATE)
+
+
+def form(msg_type, *args, parse_json=False):
+    """
+    Build protocol form for message type, filling template placeholders in document order.
+
+    Raise KeyError for no such message type, ValueError for wrong argument count, and TypeError for
+    a non-str argument to a quoted placeholder.
+
+    :param msg_type: message type, e.g., 'schema-lookup'
+    :param args: placeholder values
+    :param parse_json: whether values for bare (json) placeholders arrive as json strings to parse
+    :return: form dict
+    """
+
+    (tree, count) = _MSG_TYPE2TEMPLATE[msg_type]
+    if len(args) != count:
+        raise ValueError('Protocol form {} takes {} argument(s), got {}'.format(msg_type, count, len(args)))
+    if parse_json:
+        args = _json_args(tree, args)
+    return _fill(tree, args)
+
+
+def _json_args(tree, args):
+    rv = list(args)
+
+    def _walk(node):
+        if isinstance(node, _Slot):
+            if not node.string:
+                rv[node.index] = json.loads(rv[node.index])
+        elif isinstance(node, dict):
+            for v in node.values():
+                _walk(v)
+        elif isinstance(node, list):
+            for v in node:
+                _walk(v)
+
+    _walk(tree)
+    return rv
+
+
+def attr_names(schema_name, schema_version):
+    """
+    Return attribute names for schema to send, as protocol/schema-send/<name>/<version>/attr-names.json specifies.
+
+    :param schema_name: schema name
+    :param schema_version: schema version
+    :return: list of attribute names
+    """
+
+    return list(_SCHEMA2ATTR_NAMES[(schema_name, schema_version)])
+
+
+def agent_nym_lookup(did):
+    return form('agent-nym-lookup', did)
+
+
+def agent_nym_send(did, verkey):
+    return form('agent-nym-send', did, verkey)
+
+
+def agent_endpoint_lookup(did):
+    return form('agent-endpoint-lookup', did)
+
+
+def agent_endpoint_send():
+    return form('agent-endpoint-send')
+
+
+def schema_lookup(origin_did, name, version):
+    return form('schema-lookup', origin_did, name, version)
+
+
+def schema_send(origin_did, name, version, attr_names):
+    return form('schema-send', origin_did, name, version, attr_names)
+
+
+def claim_def_send(origin_did, name, version):
+    return form('claim-def-send', origin_did, name, version)
+
+
+def master_secret_set(label):
+    return form('master-secret-set', label)
+
+
+def claim_offer_create(origin_did, name, version, holder_did):
+    return form('claim-offer-create', origin_did, name, version, holder_did)
+
+
+def claim_offer_store(claim_offer):
+    return form('claim-offer-store', claim_offer)
+
+
+def claim_create(claim_req, claim_attrs):
+    return form('claim-create', claim_req, claim_attrs)
+
+
+def claim_store(claim):
+    return form('claim-store', claim)
+
+
+def claim_request(schemata, attr_match, pred_match, requested_attrs):
+    return form('claim-request', schemata, attr_match, pred_match, requested_attrs)
+
+
+def proof_request(schemata, attr_match, pred_match, requested_attrs):
+    return form('proof-request', schemata, attr_match, pred_match, requested_attrs)
+
+
+def proof_request_by_referent(schemata, referents, requested_attrs):
+    return form('proof-request-by-referent', schemata, referents, requested_attrs)
+
+
+def verification_request(proof_req, proof):
+    return form('verification-request', proof_req, proof)
+
+
+def claims_reset():
+    return form('claims-reset')
@@ -0,0 +1,163 @@
+"""
+Copyright 2017-2018 Government of Canada - Public Services and Procurement Canada - buyandsell.gc.ca
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+from threading import RLock
+
+import logging
+
+
+class AgentRegistry:
+    """
+    Retain live objects (node pool, agent) for the current process and hand them out by reference.
+
+    The django cache pickles anything it stores; the agent, its wallet and its pool must not go through
+    that on every request. The registry fills once at startup (WrapperApiConfig.ready()) and closes
+    what it holds, most recently registered first, on close().
+
+    A process hosting several agent profiles registers each agent by profile; a process hosting one
+    registers its agent under plain 'agent'.
+    """
+
+    def __init__(self):
+        """
+        Initialize empty registry.
+        """
+
+        self._lock = RLock()
+        self._key2obj = {}
+        self._closers = []  # (key, closer) pairs in registration order
+        self._did2agent = {}  # agents by DID, for in-process relay between co-hosted agents
+
+    def register(self, key, obj, closer=None):
+        """
+        Retain object by key; replace any object already registered under key.
+
+        :param key: registry key, e.g., 'pool' or 'agent'
+        :param obj: object to retain
+        :param closer: callable taking the object, to invoke on close(); None for nothing to do
+        :return: input object
+        """
+
+        with self._lock:
+            self._key2obj[key] = obj
+            self._closers = [(k, c) for (k, c) in self._closers if k != key]
+            if closer is not None:
+                self._closers.append((key, closer))
+        return obj
+
+    def register_agent(self, ag, profile=None, closer=None):
+        """
+        Retain open agent for profile, and index it by DID.
+
+        :param ag: agent, open
+        :param profile: agent profile, None for the one agent that the process hosts
+        :param closer: callable taking the agent, to invoke on close(); None for nothing to do
+        :return: input agent
+        """
+
+        with self._lock:
+            self.register(agent_key(profile), ag, closer)
+            self._did2agent[ag.did] = ag
+        return ag
+
+    def agent_for(self, profile=None):
+        """
+        Return agent registered for profile, or None for none.
+
+        :param profile: agent profile, None for the one agent that the process hosts
+        :return: agent
+        """
+
+        return self._key2obj.get(agent_key(profile))
+
+    def agent_by_did(self, did):
+        """
+        Return agent in this process having DID, or None for none.
+
+        :param did: DID
+        :return: agent
+        """
+
+        return self._did2agent.get(did)
+
+    def get(self, key, default=None):
+        """
+        Return object registered under key, or default for none.
+
+        :param key: registry key
+        :param default: value to return for no such key
+        :return: registered object
+        """
+
+        return self._key2obj.get(key, default)  # dict lookup is atomic: no lock on the hot path
+
+    def __contains__(self, key):
+        return key in self._key2obj
+
+    @property
+    def agent(self):
+        """
+        Accessor for current agent.
+
+        :return: current agent
+        """
+
+        return self._key2obj.get('agent')
+
+    @property
+    def pool(self):
+        """
+        Accessor for current node pool.
+
+        :return: current node pool
+        """
+
+        return self._key2obj.get('pool')
+
+    def close(self):
+        """
+        Invoke lifecycle closers, most recently registered first, and empty the registry.
+        Log and carry on past any closer that raises, so that one failure does not leak the rest.
+        """
+
+        logger = logging.getLogger(__name__)
+
+        with self._lock:
+            closers = list(reversed(self._closers))
+            objs = dict(self._key2obj)
+            self._closers = []
+            self._key2obj = {}
+            self._did2agent = {}
+
+        for (key, closer) in closers:
+            try:
+                closer(objs[key])
+            except Exception as e:
+                logger.warning('Could not close {}: {}'.format(key, e))
+
+
+def agent_key(profile=None):
+    """
+    Return registry key for agent of profile.
+
+    :param profile: agent profile, None for the one agent that the process hosts
+    :return: registry key
+    """
+
+    return 'agent' if profile is None else 'agent.{}'.format(profile)
+
+
+REGISTRY = AgentRegistry()
@@ -0,0 +1,51 @@
+"""
+Copyright 2017-2018 Government of Canada - Public Services and Procurement Canada - buyandsell.gc.ca
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+from rest_framework.renderers import JSONRenderer
+
+import json
+
+
+class RawJSON(str):
+    """
+    Response data that is json text already, as agent processing returns it: render as is.
+    """
+
+    pass
+
+
+class PassThroughJSONRenderer(JSONRenderer):
+    """
+    JSON renderer sending RawJSON response data as the response body unchanged, with no json decode
+    and re-encode per response. Fall back to parsing and re-encoding only to honour a requested
+    indent, as the browsable API requests.
+    """
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        """
+        Render data into json bytes.
+
+        :param data: RawJSON or json-serializable response data
+        :param accepted_media_type: accepted media type from content negotiation
+        :param renderer_context: renderer context
+        :return: json bytes
+        """
+
+        if isinstance(data, RawJSON):
+            if self.get_indent(accepted_media_type, renderer_context or {}) is None:
+                return data.encode('utf-8')
+            data = json.loads(data)
+        return super().render(data, accepted_media_type, renderer_context)
@@ -0,0 +1,126 @@
+"""
+Copyright 2017-2018 Government of Canada - Public Services and Procurement Canada - buyandsell.gc.ca
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+"""
+Message type router: one table, keyed on message type, of what the service wrapper takes and how to handle it.
+
+A single URL pattern captures the message type; a dict lookup here resolves it to its route, carrying
+the name of the ServiceWrapper handler method and per-operation metadata for features to key on:
+
+    - read_only: whether processing leaves wallet and ledger as they were
+    - cacheable: whether the connector may answer from a cache
+    - lane: concurrency class -- 'interactive' (lookups), 'issuance' (writes, claim issue), or 'proof';
+      interactive routes serve during startup, the rest wait for it to complete (wrapper_api/startup.py);
+      agent work dispatches by lane, weighted fair (wrapper_api/lanes.py)
+    - timeout: seconds to allow the agent, None for the request timeout alone
+"""
+
+LANES = ('interactive', 'issuance', 'proof')
+
+
+class Route:
+    """
+    Route for one message type.
+    """
+
+    def __init__(self, msg_type, method, handler, read_only, cacheable, lane, timeout=None):
+        """
+        Initialize route.
+
+        :param msg_type: message type, e.g., 'schema-lookup'
+        :param method: HTTP method taking the message type: 'GET' or 'POST'
+        :param handler: name of ServiceWrapper coroutine method handling the message type
+        :param read_only: whether processing leaves wallet and ledger as they were
+        :param cacheable: whether the connector may answer from a cache
+        :param lane: concurrency class, one of LANES
+        :param timeout: seconds to allow the agent, None for no limit past the request timeout
+        """
+
+        assert lane in LANES
+        self.msg_type = msg_type
+        self.method = method
+        self.handler = handler
+        self.read_only = read_only
+        self.cacheable = cacheable
+        self.lane = lane
+        self.timeout = timeout
+
+    def configured(self, timeout):
+        """
+        Return copy of route with timeout.
+
+        :param timeout: seconds to allow the agent, None for no limit past the request timeout
+        :return: route
+        """
+
+        return Route(self.msg_type, self.method, self.handler, self.read_only, self.cacheable, self.lane, timeout)
+
+    def __repr__(self):
+        return 'Route({}, {}, {}, read_only={}, cacheable={}, lane={}, timeout={})'.format(
+            self.msg_type,
+            self.method,
+            self.handler,
+            self.read_only,
+            self.cacheable,
+            self.lane,
+            self.timeout)
+
+
+_ROUTES = (
+    # helper (GET) methods
+    Route('txn', 'GET', 'handle_txn', True, True, 'interactive'),
+    Route('did', 'GET', 'handle_did', True, False, 'interactive'),
+
+    # protocol forms (POST)
+    Route('agent-nym-lookup', 'POST', 'handle_lookup', True, True, 'interactive'),
+    Route('agent-nym-send', 'POST', 'handle_send', False, False, 'issuance'),
+    Route('agent-endpoint-lookup', 'POST', 'handle_lookup', True, True, 'interactive'),
+    Route('agent-endpoint-send', 'POST', 'handle_send', False, False, 'issuance'),
+    Route('schema-lookup', 'POST', 'handle_schema_lookup', True, True, 'interactive'),
+    Route('schema-send', 'POST', 'handle_form', False, False, 'issuance'),
+    Route('claim-def-send', 'POST', 'handle_form', False, False, 'issuance'),
+    Route('master-secret-set', 'POST', 'handle_form', False, False, 'issuance'),
+    Route('claim-offer-create', 'POST', 'handle_form', True, False, 'issuance'),
+    Route('claim-offer-store', 'POST', 'handle_form', False, False, 'issuance'),
+    Route('claim-create', 'POST', 'handle_form', False, False, 'issuance'),
+    Route('claim-store', 'POST', 'handle_form', False, False, 'issuance'),
+    Route('claim-request', 'POST', 'handle_form', True, False, 'proof'),
+    Route('proof-request', 'POST', 'handle_form', True, False, 'proof'),
+    Route('proof-request-by-referent', 'POST', 'handle_form', True, False, 'proof'),
+    Route('verification-request', 'POST', 'handle_form', True, False, 'proof'),
+    Route('claims-reset', 'POST', 'handle_form', False, False, 'issuance'),
+)
+
+ROUTES = {route.msg_type: route for route in _ROUTES}
+
+
+def load(cfg):
+    """
+    Return routes by message type, with timeouts as configuration [Route] section specifies, e.g.,
+
+        [Route]
+        agent-nym-lookup.timeout=30
+
+    :param cfg: configuration dict
+    :return: dict mapping message type to route
+    """
+
+    cfg_route = cfg.get('Route', {})
+    rv = {}
+    for (msg_type, route) in ROUTES.items():
+        timeout = float(cfg_route.get('{}.timeout'.format(msg_type), 0)) or None
+        rv[msg_type] = route.configured(timeout) if timeout else route
+    return rv
@@ -0,0 +1,164 @@
+"""
+Copyright 2017-2018 Government of Canada - Public Services and Procurement Canada - buyandsell.gc.ca
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+"""
+Startup snapshot: what bootstrap last established on the ledger for an agent profile -- DID, verkey, endpoint,
+and the sequence number and claim definition state of each schema it originates -- so that a restart need not
+ask the ledger again. One file per agent profile and ledger: the hash of the genesis transaction file (or, for
+the memory backend, of the ledger journal path) keys it, so that pointing a profile at another ledger starts over.
+
+On restart, bootstrap trusts a snapshot matching the agent and its configuration, and revalidates it against
+the ledger in the background once startup is complete; a failed revalidation discards it. Claim definitions
+live in the issuer's wallet too: delete snapshots along with wallets to start over.
+"""
+
+from hashlib import sha256
+from os import getpid, makedirs, remove, replace
+from os.path import abspath, dirname, isfile, join as pjoin
+from time import time
+from wrapper_api.config import prefork_server_pid
+from wrapper_api.memledger import MemoryNodePool
+
+import json
+import logging
+
+
+def ledger_hash(pool):
+    """
+    Return hash identifying ledger of node pool: of genesis transaction file, or of memory ledger journal path.
+
+    :param pool: node pool
+    :return: hex digest
+    """
+
+    if isinstance(pool, MemoryNodePool):
+        return sha256('memory:{}'.format(abspath(pool.ledger.path)).encode('utf-8')).hexdigest()
+    with open(pool.genesis_txn_path, 'rb') as genesis_f:
+        return sha256(genesis_f.read()).hexdigest()
+
+
+class StartupSnapshot:
+    """
+    Snapshot on disk of ledger state that bootstrap established for one agent profile on one ledger.
+    """
+
+    def __init__(self, dir_state, profile, pool):
+        """
+        Initialize snapshot for profile on pool's ledger; do not load yet.
+
+        :param dir_state: directory for state files
+        :param profile: agent profile
+        :param pool: node pool
+        """
+
+        self._path = pjoin(dir_state, '{}.{}.startup.json'.format(profile, ledger_hash(pool)[:16]))
+        self._content = None
+
+    @property
+    def path(self):
+        """
+        Accessor for path to json file.
+
+        :return: path
+        """
+
+        return self._path
+
+    def load(self):
+        """
+        Load snapshot from disk; discard it if corrupt.
+
+        :return: snapshot content, None for none
+        """
+
+        self._content = None
+        if isfile(self._path):
+            try:
+                with open(self._path, 'r') as snap_f:
+                    self._content = json.load(snap_f)
+            except ValueError:
+                logging.getLogger(__name__).warning('Discarding corrupt startup snapshot {}'.format(self._path))
+                self.discard()
+        return self._content
+
+    def trusts(self, ag, schema_name_versions, issuer):
+        """
+        Return whether loaded snapshot covers agent as configured: same DID, verkey and endpoint, and
+        every schema it originates on the ledger, with claim definition if issuer.
+
+        :param ag: agent, open
+        :param schema_name_versions: (name, version) pairs that agent originates
+        :param issuer: whether agent sends claim definitions on schemata it originates
+        :return: whether to trust snapshot in place of the ledger
+        """
+
+        if not self._content:
+            return False
+        if (self._content.get('did'), self._content.get('verkey'), self._content.get('endpoint')) != (
+                ag.did, ag.verkey, ag.cfg.get('endpoint')):
+            return False
+        schemata = {(s['name'], s['version']): s for s in self._content.get('schemata', [])}
+        for schema_name_version in schema_name_versions:
+            schema = schemata.get(schema_name_version) or {}
+            if not schema.get('seq-no') or (issuer and not schema.get('claim-def')):
+                return False
+        return True
+
+    @property
+    def stale(self):
+        """
+        Accessor for whether loaded snapshot predates the current server: if not, another worker of the
+        same (pre-fork) server validated it already, so that there is nothing to revalidate.
+
+        :return: whether to revalidate snapshot
+        """
+
+        return (self._content or {}).get('server') != _server_pid()
+
+    def save(self, ag, schemata):
+        """
+        Write snapshot to disk, atomically.
+
+        :param ag: agent, open
+        :param schemata: dicts with name, version, seq-no, claim-def (bool) per schema that agent originates
+        """
+
+        self._content = {
+            'did': ag.did,
+            'verkey': ag.verkey,
+            'endpoint': ag.cfg.get('endpoint'),
+            'schemata': schemata,
+            'server': _server_pid(),
+            'validated': int(time())
+        }
+        makedirs(dirname(self._path), exist_ok=True)
+        tmp_path = '{}.{}.tmp'.format(self._path, getpid())
+        with open(tmp_path, 'w') as snap_f:
+            json.dump(self._content, snap_f)
+        replace(tmp_path, self._path)  # atomic: readers never see a partial snapshot
+
+    def discard(self):
+        """
+        Remove snapshot from disk, if present.
+        """
+
+        self._content = None
+        if isfile(self._path):
+            remove(self._path)
+
+
+def _server_pid():
+    return prefork_server_pid() or getpid()
@@ -0,0 +1,230 @@
+"""
+Copyright 2017-2018 Government of Canada - Public Services and Procurement Canada - buyandsell.gc.ca
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+"""
+Staged startup. WrapperApiConfig.ready() returns, and the process takes requests, as soon as the node pool
+and agent wallets are open; registration (nym, endpoint), origination (schemata, claim definitions) and
+master secret setting finish in the background.
+
+Routes in the interactive lane (did, txn, lookups) serve at once. The rest wait for startup to complete, up to
+[VON Connector] startup.wait seconds, then get 503 with Retry-After. The readiness route reports each phase
+of startup, per agent profile, with its state and duration: 200 once complete, 503 until then.
+"""
+
+from threading import RLock
+from time import perf_counter
+
+import asyncio
+import logging
+
+
+RETRY_AFTER = 5  # seconds, for Retry-After header on 503 response: startup (or admission control) holds up request
+
+
+class StartupPending(Exception):
+    """
+    Startup has not completed, or has failed: request outside the interactive lane cannot proceed.
+    """
+
+    pass
+
+
+class Phase:
+    """
+    Record of one startup phase.
+    """
+
+    def __init__(self, name, profile):
+        """
+        Initialize phase, running.
+
+        :param name: phase name, e.g., 'origination'
+        :param profile: agent profile, None for phase common to all
+        """
+
+        self.name = name
+        self.profile = profile
+        self.state = 'running'
+        self.error = None
+        self._start = perf_counter()
+        self.seconds = None
+
+    def end(self, error=None):
+        """
+        Mark phase done, or failed on error.
+
+        :param error: exception, None for success
+        """
+
+        self.seconds = perf_counter() - self._start
+        self.state = 'failed' if error else 'done'
+        self.error = str(error) if error else None
+
+    def to_dict(self):
+        rv = {
+            'phase': self.name,
+            'profile': self.profile,
+            'state': self.state,
+            'seconds': round(perf_counter() - self._start if self.seconds is None else self.seconds, 3)
+        }
+        if self.error:
+            rv['error'] = self.error
+        return rv
+
+
+class _PhaseContext:
+    def __init__(self, startup, phase):
+        self._startup = startup
+        self._phase = phase
+
+    def __enter__(self):
+        return self._phase
+
+    def __exit__(self, exc_type, exc, traceback):
+        self._phase.end(exc)
+        logging.getLogger(__name__).log(
+            logging.ERROR if exc else logging.INFO,
+            'Startup phase {}{} {} in {:.3f} seconds{}'.format(
+                self._phase.name,
+                ' for {}'.format(self._phase.profile) if self._phase.profile else '',
+                self._phase.state,
+                self._phase.seconds,
+                ': {}'.format(exc) if exc else ''))
+        if exc:
+            self._startup.fail(exc)
+        return False
+
+
+class Startup:
+    """
+    Startup progress for the process: phases so far, and whether complete (or failed). Safe across threads;
+    coroutines on any event loop may wait on completion.
+    """
+
+    def __init__(self):
+        """
+        Initialize with no phases, incomplete.
+        """
+
+        self._lock = RLock()
+        self._phases = []
+        self._complete = False
+        self._error = None
+        self._waiters = []  # (loop, future) pairs
+
+    def phase(self, name, profile=None):
+        """
+        Return context manager timing phase; a phase raising an exception fails startup.
+
+        :param name: phase name
+        :param profile: agent profile, None for phase common to all
+        :return: context manager
+        """
+
+        phase = Phase(name, profile)
+        with self._lock:
+            self._phases.append(phase)
+        logging.getLogger(__name__).info('Startup phase {}{} running'.format(
+            name,
+            ' for {}'.format(profile) if profile else ''))
+        return _PhaseContext(self, phase)
+
+    @property
+    def complete(self):
+        """
+        Accessor for whether startup completed successfully.
+
+        :return: whether startup is complete
+        """
+
+        return self._complete
+
+    @property
+    def error(self):
+        """
+        Accessor for error that failed startup, None for none (yet).
+
+        :return: error message or None
+        """
+
+        return self._error
+
+    def _release(self):
+        with self._lock:
+            waiters = self._waiters
+            self._waiters = []
+        for (loop, future) in waiters:
+            if not loop.is_closed():
+                loop.call_soon_threadsafe(lambda f=future: f.done() or f.set_result(None))
+
+    def finish(self):
+        """
+        Mark startup complete; release waiters.
+        """
+
+        with self._lock:
+            self._complete = True
+        logging.getLogger(__name__).info('Startup complete')
+        self._release()
+
+    def fail(self, error):
+        """
+        Mark startup failed; release waiters.
+
+        :param error: exception or message
+        """
+
+        with self._lock:
+            self._error = self._error or str(error)
+        self._release()
+
+    async def wait(self, seconds):
+        """
+        Wait for startup to complete or fail, up to seconds; return whether complete.
+
+        :param seconds: most seconds to wait
+        :return: whether startup is complete
+        """
+
+        with self._lock:
+            if self._complete or self._error or seconds <= 0:
+                return self._complete
+            loop = asyncio.get_event_loop()
+            future = loop.create_future()
+            self._waiters.append((loop, future))
+        try:
+            await asyncio.wait_for(future, seconds)
+        except asyncio.TimeoutError:
+            with self._lock:
+                if (loop, future) in self._waiters:
+                    self._waiters.remove((loop, future))
+        return self._complete
+
+    def status(self):
+        """
+        Return startup status for readiness route.
+
+        :return: dict with ready, any error, and phases in order of start
+        """
+
+        with self._lock:
+            rv = {'ready': self._complete, 'phases': [phase.to_dict() for phase in self._phases]}
+            if self._error:
+                rv['error'] = self._error
+            return rv
+
+
+STARTUP = Startup()
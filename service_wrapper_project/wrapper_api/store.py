@@ -0,0 +1,211 @@
+"""
+Copyright 2017-2018 Government of Canada - Public Services and Procurement Canada - buyandsell.gc.ca
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+from os import getpid, makedirs, remove, replace
+from os.path import abspath, dirname, isfile, join as pjoin
+from threading import RLock
+from von_agent.cache import CLAIM_DEF_CACHE, SCHEMA_CACHE
+from von_agent.schemakey import SchemaKey
+
+import asyncio
+import json
+import logging
+
+
+DIR_STATE = pjoin(dirname(abspath(__file__)), 'state')
+
+
+def _origin_did(schema):
+    """
+    Return origin DID of schema as ledger GET_SCHEMA response result holds it: identifier is the requester's DID.
+
+    :param schema: schema dict
+    :return: origin DID
+    """
+
+    return schema.get('dest', schema['identifier'])
+
+
+class LedgerStore:
+    """
+    On-disk store of ledger artifacts that never change once written: schemata, claim definitions,
+    and schema-lookup responses. Spill what the agent's (von_agent) schema and claim definition caches
+    and the connector's schema-lookup cache pick up, so that a restarted process starts warm.
+
+    Schemata are immutable on a given ledger, but a ledger can be reset: on warm start, check one
+    stored schema against the ledger and discard the store on any mismatch.
+    """
+
+    def __init__(self, path):
+        """
+        Initialize store at path; do not load yet.
+
+        :param path: path to json file
+        """
+
+        self._path = path
+        self._lock = RLock()
+        self._schema_lookups = {}  # (origin-did, name, version, proxy-did or None): schema-lookup json response
+        self._spilled = (0, 0, 0)  # numbers of schemata, claim defs, schema lookups at last spill
+
+    @property
+    def path(self):
+        """
+        Accessor for path to json file.
+
+        :return: path
+        """
+
+        return self._path
+
+    def get_schema_lookup(self, key):
+        """
+        Return schema-lookup json response for key, or None for none.
+
+        :param key: (origin DID, name, version, proxy DID or None)
+        :return: json response or None
+        """
+
+        return self._schema_lookups.get(key)
+
+    def put_schema_lookup(self, key, rv_json):
+        """
+        Retain schema-lookup json response for key, unless empty (no such schema on ledger yet).
+
+        :param key: (origin DID, name, version, proxy DID or None)
+        :param rv_json: json response
+        :return: input json
+        """
+
+        if rv_json != '{}':
+            self._schema_lookups[key] = rv_json
+        return rv_json
+
+    async def warm(self, ag):
+        """
+        Load store from disk into agent schema and claim definition caches and into schema-lookup cache.
+        Check one stored schema against the ledger first; on mismatch, discard the store.
+
+        :param ag: agent, open
+        :return: number of schemata, claim definitions and schema lookups loaded
+        """
+
+        logger = logging.getLogger(__name__)
+
+        if not isfile(self._path):
+            return (0, 0, 0)
+        try:
+            with open(self._path, 'r') as store_f:
+                content = json.load(store_f)
+        except ValueError:
+            logger.warning('Discarding corrupt ledger store {}'.format(self._path))
+            remove(self._path)
+            return (0, 0, 0)
+
+        schemata = content.get('schemata', [])
+        if schemata:
+            check = schemata[-1]
+            txn = json.loads(await ag.process_get_txn(check['seqNo']))
+            if (txn.get('identifier') != _origin_did(check) or
+                    (txn.get('data') or {}).get('name') != check['data']['name'] or
+                    (txn.get('data') or {}).get('version') != check['data']['version']):
+                logger.warning('Ledger does not match store {} at schema txn {}: discarding store'.format(
+                    self._path,
+                    check['seqNo']))
+                remove(self._path)
+                return (0, 0, 0)
+
+        with SCHEMA_CACHE.lock:
+            for schema in schemata:
+                s_key = SchemaKey(_origin_did(schema), schema['data']['name'], schema['data']['version'])
+                SCHEMA_CACHE[s_key] = schema
+        with CLAIM_DEF_CACHE.lock:
+            for entry in content.get('claim-defs', []):
+                CLAIM_DEF_CACHE[(entry['schema-seq-no'], entry['issuer-did'])] = entry['claim-def']
+        with self._lock:
+            for entry in content.get('schema-lookups', []):
+                self._schema_lookups[tuple(entry['key'])] = entry['response']
+            self._spilled = self._counts()
+
+        logger.info('Warmed caches from ledger store {}: {} schemata, {} claim defs, {} schema lookups'.format(
+            self._path,
+            *self._spilled))
+        return self._spilled
+
+    def _counts(self):
+        return (len(SCHEMA_CACHE.index()), len(CLAIM_DEF_CACHE), len(self._schema_lookups))
+
+    def spill(self):
+        """
+        Write store to disk if any cache has grown since the last spill (or warm start). Cheap otherwise.
+        Merge with the store on disk, in case another process sharing it has written since.
+        """
+
+        if self._counts() == self._spilled:
+            return
+
+        with self._lock:
+            counts = self._counts()
+            if counts == self._spilled:
+                return
+
+            content = {}
+            if isfile(self._path):
+                try:
+                    with open(self._path, 'r') as store_f:
+                        content = json.load(store_f)
+                except ValueError:
+                    content = {}
+
+            seq_no2schema = {s['seqNo']: s for s in content.get('schemata', [])}
+            with SCHEMA_CACHE.lock:  # off the event loop: agents may be writing
+                seq_no2schema.update({seq_no: SCHEMA_CACHE[seq_no] for seq_no in list(SCHEMA_CACHE.index())})
+            claim_defs = {(e['schema-seq-no'], e['issuer-did']): e['claim-def'] for e in content.get('claim-defs', [])}
+            with CLAIM_DEF_CACHE.lock:
+                claim_defs.update(dict(CLAIM_DEF_CACHE))
+            schema_lookups = {tuple(e['key']): e['response'] for e in content.get('schema-lookups', [])}
+            schema_lookups.update(self._schema_lookups)
+
+            makedirs(dirname(self._path), exist_ok=True)
+            tmp_path = '{}.{}.tmp'.format(self._path, getpid())
+            with open(tmp_path, 'w') as store_f:
+                json.dump(
+                    {
+                        'schemata': [seq_no2schema[seq_no] for seq_no in sorted(seq_no2schema)],
+                        'claim-defs': [
+                            {'schema-seq-no': k[0], 'issuer-did': k[1], 'claim-def': v} for (k, v) in claim_defs.items()
+                        ],
+                        'schema-lookups': [{'key': list(k), 'response': v} for (k, v) in schema_lookups.items()]
+                    },
+                    store_f)
+            replace(tmp_path, self._path)  # atomic: readers never see a partial store
+            self._spilled = counts
+
+    async def spill_periodically(self, interval):
+        """
+        Spill store every interval seconds, on an executor thread off the event loop, until cancelled
+        (as on connector event loop stop).
+
+        :param interval: seconds between spills
+        """
+
+        loop = asyncio.get_event_loop()
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await loop.run_in_executor(None, self.spill)
+            except OSError as e:
+                logging.getLogger(__name__).warning('Could not spill ledger store {}: {}'.format(self._path, e))
@@ -0,0 +1,71 @@
+"""
+Copyright 2017-2018 Government of Canada - Public Services and Procurement Canada - buyandsell.gc.ca
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+from wrapper_api.admission import Admission, Overloaded
+from wrapper_api.coalesce import SingleFlight
+
+import asyncio
+import pytest
+
+
+@pytest.mark.asyncio
+async def test_admission():
+    admission = Admission(concurrency=2, queue=1, overrides={'did': (0, 0)})
+    order = []
+
+    async def request(i, seconds=0.05):
+        async with admission.admit('proof-request'):
+            order.append(i)
+            await asyncio.sleep(seconds)
+        return i
+
+    tasks = [asyncio.ensure_future(request(i)) for i in range(4)]  # start in order
+    results = await asyncio.gather(*tasks, return_exceptions=True)
+    assert results[:3] == [0, 1, 2] and isinstance(results[3], Overloaded)  # two in process, one waiting
+    assert order == [0, 1, 2]
+    stats = admission.stats()['proof-request']
+    assert (stats['active'], stats['waiting'], stats['admitted'], stats['rejected']) == (0, 0, 3, 1)
+
+    tasks = [asyncio.ensure_future(request(i)) for i in range(3)]
+    await asyncio.sleep(0.01)
+    tasks[2].cancel()  # waiter goes away: no turn lost
+    await asyncio.gather(*tasks, return_exceptions=True)
+    assert await asyncio.wait_for(request(9), 1) == 9 and admission.stats()['proof-request']['active'] == 0
+
+    async with admission.admit('did'):  # no limit
+        pass
+
+
+@pytest.mark.asyncio
+async def test_admission_coalesced():
+    admission = Admission(concurrency=1, queue=1)
+    flights = SingleFlight()
+    calls = []
+
+    async def lookup():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return '{"seqNo": 1}'
+
+    async def dispatch():  # as views._dispatch: only the leader of a flight takes a turn
+        async with admission.admit('schema-lookup'):
+            return await lookup()
+
+    tasks = [asyncio.ensure_future(flights.run(('schema-lookup', '1'), dispatch)) for _ in range(8)]
+    results = await asyncio.gather(*tasks, return_exceptions=True)
+    assert results == ['{"seqNo": 1}'] * 8 and len(calls) == 1  # beyond concurrency + queue, none rejected
+    stats = admission.stats()['schema-lookup']
+    assert (stats['active'], stats['admitted'], stats['rejected']) == (0, 1, 0)
@@ -0,0 +1,131 @@
+"""
+Copyright 2017-2018 Government of Canada - Public Services and Procurement Canada - buyandsell.gc.ca
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+from os.path import isfile, join as pjoin
+from time import sleep
+from von_agent.cache import SCHEMA_CACHE
+from von_agent.schemakey import SchemaKey
+from wrapper_api.cache import LRUCache, TTLCache
+from wrapper_api.coalesce import SingleFlight
+from wrapper_api.store import LedgerStore
+
+import asyncio
+import json
+import pytest
+
+
+def test_lru_cache():
+    lru = LRUCache(3, 1024)
+    for seq_no in range(1, 5):
+        lru.put(seq_no, '{{"seqNo": {}}}'.format(seq_no))
+    assert len(lru) == 3 and lru.get(1) is None  # evicted on count
+    assert lru.get(2) == '{"seqNo": 2}'  # 2 now most recently used
+    lru.put(5, '{"seqNo": 5}')
+    assert lru.get(3) is None and lru.get(2) is not None
+
+    lru.put(6, '"{}"'.format('x' * 1000))  # evicts on count, then on bytes
+    assert len(lru) == 2 and lru.stats()['bytes'] <= 1024
+    lru.put(7, '"{}"'.format('x' * 2000))  # too big to retain at all
+    assert lru.get(7) is None and lru.get(6) is not None
+
+    stats = lru.stats()
+    assert (stats['hits'], stats['misses'], stats['evictions']) == (3, 3, 4)
+
+
+def test_ttl_cache():
+    ttl = TTLCache(2)
+    ttl.put(('agent-nym-lookup', 'did-0', None), '{"dest": "did-0"}', 0.05)
+    ttl.put(('agent-nym-lookup', 'did-1', None), '{"dest": "did-1"}', 60)
+    ttl.put(('agent-endpoint-lookup', 'did-1', None), '{"endpoint": "http://x"}', 0)  # not cached at ttl 0
+    assert len(ttl) == 2 and ttl.get(('agent-nym-lookup', 'did-0', None)) is not None
+
+    sleep(0.1)
+    assert ttl.get(('agent-nym-lookup', 'did-0', None)) is None  # expired
+    ttl.invalidate(lambda k: k[:2] == ('agent-nym-lookup', 'did-1'))
+    assert len(ttl) == 0
+
+    for i in range(3):
+        ttl.put(('agent-nym-lookup', 'did-{}'.format(i), None), '{}', 60)
+    assert len(ttl) == 2 and ttl.get(('agent-nym-lookup', 'did-0', None)) is None  # oldest evicted
+
+
+class _TxnAgent:
+    def __init__(self, txn):
+        self.txn = txn
+
+    async def process_get_txn(self, seq_no):
+        return json.dumps(self.txn)
+
+
+@pytest.mark.asyncio
+async def test_ledger_store(tmpdir):
+    path = pjoin(str(tmpdir), 'test.ledger.json')
+    schema = {
+        'seqNo': 999001,
+        'identifier': 'requester-did',
+        'dest': 'origin-did',
+        'data': {'name': 'store-test', 'version': '1.0', 'attr_names': ['a']}
+    }
+    s_key = SchemaKey('origin-did', 'store-test', '1.0')
+    SCHEMA_CACHE[s_key] = schema
+    try:
+        store = LedgerStore(path)
+        store.put_schema_lookup(('origin-did', 'store-test', '1.0', None), json.dumps(schema))
+        store.put_schema_lookup(('origin-did', 'absent', '1.0', None), '{}')  # not retained
+        spilling = asyncio.ensure_future(store.spill_periodically(0.01))
+        await asyncio.sleep(0.1)
+        spilling.cancel()
+        assert isfile(path)
+
+        warm = LedgerStore(path)
+        (n_schemata, _, n_lookups) = await warm.warm(_TxnAgent({
+            'identifier': 'origin-did',
+            'data': {'name': 'store-test', 'version': '1.0'}}))
+        assert n_schemata >= 1 and n_lookups == 1
+        assert json.loads(warm.get_schema_lookup(('origin-did', 'store-test', '1.0', None))) == schema
+
+        assert await LedgerStore(path).warm(_TxnAgent({})) == (0, 0, 0)  # ledger reset: store discarded
+        assert not isfile(path)
+    finally:
+        with SCHEMA_CACHE.lock:  # von_agent offers no removal: leave process-wide cache as found
+            SCHEMA_CACHE._schema_key2schema.pop(s_key, None)
+            SCHEMA_CACHE._seq_no2schema_key.pop(schema['seqNo'], None)
+
+
+@pytest.mark.asyncio
+async def test_single_flight():
+    flights = SingleFlight()
+    calls = []
+
+    async def lookup(did):
+        calls.append(did)
+        await asyncio.sleep(0.05)
+        if did == 'bad':
+            raise ValueError(did)
+        return '{{"dest": "{}"}}'.format(did)
+
+    results = await asyncio.gather(*(flights.run(d, lambda d=d: lookup(d)) for d in ('a', 'a', 'b', 'a')))
+    assert results == ['{"dest": "a"}', '{"dest": "a"}', '{"dest": "b"}', '{"dest": "a"}']
+    assert sorted(calls) == ['a', 'b'] and len(flights) == 0  # gather starts tasks in no set order
+    assert (flights.stats()['leaders'], flights.stats()['followers']) == (2, 2)
+
+    results = await asyncio.gather(
+        *(flights.run('bad', lambda: lookup('bad')) for _ in range(2)),
+        return_exceptions=True)
+    assert all(isinstance(r, ValueError) for r in results) and calls.count('bad') == 1
+
+    await flights.run('a', lambda: lookup('a'))  # nothing outlives the flight
+    assert calls.count('a') == 2
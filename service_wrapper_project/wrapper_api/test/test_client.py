@@ -0,0 +1,101 @@
+"""
+Copyright 2017-2018 Government of Canada - Public Services and Procurement Canada - buyandsell.gc.ca
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+from requests import Response
+from requests.exceptions import ConnectionError, ConnectTimeout, ReadTimeout
+from urllib3.exceptions import MaxRetryError, NewConnectionError
+from wrapper_api import client
+from wrapper_api.client import _unsent, HTTPClient
+
+import pytest
+
+
+class _Session:
+    """
+    Session answering requests from a script of responses and exceptions, noting each request.
+    """
+
+    def __init__(self, *script):
+        self.script = list(script)
+        self.calls = []
+
+    def request(self, method, url, **kwargs):
+        self.calls.append((method, url))
+        rv = self.script.pop(0)
+        if isinstance(rv, Exception):
+            raise rv
+        return rv
+
+
+def _response(status_code, retry_after=None):
+    rsp = Response()
+    rsp.status_code = status_code
+    if retry_after is not None:
+        rsp.headers['Retry-After'] = retry_after
+    return rsp
+
+
+@pytest.fixture
+def waits(monkeypatch):
+    rv = []
+    monkeypatch.setattr(client, 'sleep', rv.append)
+    return rv
+
+
+def test_unsent():
+    assert _unsent(ConnectTimeout())
+    refused = NewConnectionError(None, 'Connection refused')
+    assert _unsent(ConnectionError(MaxRetryError(None, 'http://x', refused)))
+    assert not _unsent(ConnectionError('Connection aborted'))  # dropped after sending
+    assert not _unsent(ReadTimeout())
+
+
+def test_backoff():
+    http = HTTPClient(backoff_base=0.5, backoff_max=4)
+    for attempt in range(1, 8):
+        assert 0 <= http._backoff(attempt) <= min(4, 0.5 * 2 ** (attempt - 1))
+    assert http._backoff(1, '2') == 2  # Retry-After sets the least wait
+    assert http._backoff(1, '60') == 4  # within backoff max
+    assert http._backoff(1, 'Fri, 31 Dec 1999 23:59:59 GMT') <= 0.5  # HTTP-date: ignored
+
+
+def test_retries(waits):
+    http = HTTPClient(retries=2, backoff_base=0)
+
+    http._session = _Session(_response(503, '1'), _response(200))
+    assert http.post('http://x/agent-nym-send').status_code == 200  # 503: not processed, retry even POST
+    assert waits == [1]
+
+    for status_code in (502, 504):
+        http._session = _Session(_response(status_code), _response(200))
+        assert http.post('http://x/agent-nym-send').status_code == status_code  # may have processed: no retry
+        http._session = _Session(_response(status_code), _response(200))
+        assert http.get('http://x/did').status_code == 200
+
+    http._session = _Session(ReadTimeout(), _response(200))
+    with pytest.raises(ReadTimeout):
+        http.post('http://x/agent-nym-send')
+    http._session = _Session(ReadTimeout(), _response(200))
+    assert http.post('http://x/agent-nym-send', idempotent=True).status_code == 200
+
+    http._session = _Session(ConnectTimeout(), ConnectTimeout(), ConnectTimeout())
+    with pytest.raises(ConnectTimeout):
+        http.post('http://x/agent-nym-send')
+    assert len(http._session.calls) == 3  # first attempt and two retries
+
+    http._session = _Session(_response(503), _response(503))
+    assert http.get('http://x/did', retries=1).status_code == 503  # out of retries: caller checks
+    assert len(http._session.calls) == 2
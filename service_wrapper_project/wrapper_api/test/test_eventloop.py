@@ -0,0 +1,82 @@
+"""
+Copyright 2017-2018 Government of Canada - Public Services and Procurement Canada - buyandsell.gc.ca
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+from concurrent.futures import CancelledError
+from threading import get_ident
+from wrapper_api import eventloop
+from wrapper_api.eventloop import do, start, stop, submit
+
+import asyncio
+import pytest
+
+
+async def _echo(value, seconds=0.0):
+    await asyncio.sleep(seconds)
+    return value
+
+
+def test_do_without_loop():
+    assert eventloop._loop is None
+    assert do(_echo(1)) == 1  # on the calling thread's own loop
+    with pytest.raises(TimeoutError):
+        do(_echo(2, 1), 0.05)
+
+
+def test_connector_loop():
+    loop = start()
+    try:
+        assert start() is loop  # once per process
+
+        async def _thread():
+            return get_ident()
+
+        assert do(_thread()) != get_ident()  # runs on the loop's own thread
+
+        cancelled = []
+
+        async def _slow():
+            try:
+                await asyncio.sleep(1)
+            except asyncio.CancelledError:
+                cancelled.append(True)
+                raise
+
+        with pytest.raises(TimeoutError):
+            do(_slow(), 0.05)
+        do(_echo(None, 0.05))
+        assert cancelled == [True]  # timing out cancels the task on the loop
+
+        async def _resubmit():
+            coro = _echo(3)
+            try:
+                return submit(coro)
+            finally:
+                coro.close()
+
+        with pytest.raises(RuntimeError):
+            do(_resubmit())  # blocking on the loop from its own thread would deadlock
+
+        pending = submit(_echo(4, 10))
+    finally:
+        stop()
+
+    with pytest.raises(CancelledError):
+        pending.result(1)  # stop cancels what is pending
+    assert eventloop._loop is None
+    coro = _echo(5)
+    with pytest.raises(RuntimeError):
+        submit(coro)  # no loop running
+    coro.close()
@@ -0,0 +1,49 @@
+"""
+Copyright 2017-2018 Government of Canada - Public Services and Procurement Canada - buyandsell.gc.ca
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+from wrapper_api.lanes import LaneScheduler
+
+import asyncio
+import pytest
+
+
+@pytest.mark.asyncio
+async def test_lane_scheduler():
+    scheduler = LaneScheduler(slots=3, reserve=1, weights={'interactive': 2, 'issuance': 1, 'proof': 1})
+    order = []
+
+    async def work(lane, i, seconds=0.05):
+        order.append((lane, i))
+        await asyncio.sleep(seconds)
+        return i
+
+    heavy = [asyncio.ensure_future(scheduler.run('proof', lambda i=i: work('proof', i))) for i in range(4)]
+    await asyncio.sleep(0.01)
+    assert scheduler.stats()['proof']['active'] == 2 and scheduler.stats()['proof']['waiting'] == 2
+    assert await asyncio.wait_for(scheduler.run('interactive', lambda: work('interactive', 0, 0)), 0.02) == 0  # reserve
+    assert await asyncio.gather(*heavy) == list(range(4))
+
+    # one slot frees at a time: interactive takes two for each that proof and issuance take
+    scheduler = LaneScheduler(slots=1, reserve=0, weights={'interactive': 2, 'issuance': 1, 'proof': 1})
+    order.clear()
+    tasks = [asyncio.ensure_future(scheduler.run('proof', lambda: work('proof', 0)))]
+    await asyncio.sleep(0.01)
+    for i in range(1, 4):
+        for lane in ('proof', 'issuance', 'interactive'):
+            tasks.append(asyncio.ensure_future(scheduler.run(lane, lambda lane=lane, i=i: work(lane, i, 0))))
+    await asyncio.gather(*tasks)
+    assert [lane for (lane, i) in order[1:5]] == ['interactive', 'issuance', 'proof', 'interactive']
+    assert all(s['active'] == 0 and s['waiting'] == 0 for s in scheduler.stats().values())
@@ -0,0 +1,38 @@
+"""
+Copyright 2017-2018 Government of Canada - Public Services and Procurement Canada - buyandsell.gc.ca
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+from time import sleep
+from wrapper_api.logs import RateLimitFilter
+
+import logging
+
+
+def test_rate_limit_filter():
+    limit = RateLimitFilter(burst=2, interval=0.2)
+
+    def record(level, msg, *args):
+        return logging.LogRecord('wrapper_api.views', level, __file__, 1, msg, args, None)
+
+    passed = [
+        limit.filter(record(logging.ERROR, 'Exception on %s: %s', '/api/v0/proof-request', 'bad')) for _ in range(5)
+    ]
+    assert passed == [True, True, False, False, False] and limit.suppressed == 3
+    assert limit.filter(record(logging.ERROR, 'Exception on %s: %s', '/api/v0/proof-request', 'worse'))  # not identical
+    assert all(limit.filter(record(logging.INFO, 'Processing')) for _ in range(5))  # below level: no limit
+
+    sleep(0.2)
+    rec = record(logging.ERROR, 'Exception on %s: %s', '/api/v0/proof-request', 'bad')
+    assert limit.filter(rec) and 'suppressed 3 identical records' in rec.getMessage()
@@ -0,0 +1,77 @@
+"""
+Copyright 2017-2018 Government of Canada - Public Services and Procurement Canada - buyandsell.gc.ca
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+from os.path import join as pjoin
+from wrapper_api.memledger import MemoryLedger, MemoryNodePool, uninstall
+
+import indy.ledger
+import json
+import pytest
+
+
+def _req(submitter_did, operation, req_id=[0]):
+    req_id[0] += 1
+    return json.dumps({'reqId': req_id[0], 'identifier': submitter_did, 'operation': operation})
+
+
+@pytest.mark.asyncio
+async def test_memory_ledger(tmpdir):
+    path = pjoin(str(tmpdir), 'memory-ledger.jsonl')
+    (tag, sri) = ('V4SGRU86Z58d6TV7PBUe6f', 'FaBAq1hgBsYPdjyh8PXkzs')
+    ledger = MemoryLedger(path)
+
+    rsp = json.loads(await ledger.submit(_req(sri, {'type': '100', 'dest': sri, 'raw': '{"endpoint": {}}'})))
+    assert rsp['op'] == 'REJECT'  # no nym for submitter
+
+    await ledger.submit(_req(tag, {'type': '1', 'dest': tag, 'verkey': '~tag'}))
+    await ledger.submit(_req(tag, {'type': '1', 'dest': sri, 'verkey': '~sri'}))
+    nym = json.loads(await ledger.submit(_req(tag, {'type': '105', 'dest': sri})))['result']
+    assert json.loads(nym['data'])['verkey'] == '~sri' and nym['seqNo'] == 2
+
+    endpoint = {'endpoint': {'endpoint': 'http://127.0.0.1:8001/api/v0'}}
+    await ledger.submit(_req(sri, {'type': '100', 'dest': sri, 'raw': json.dumps(endpoint)}))
+    attr = json.loads(await ledger.submit(_req(tag, {'type': '104', 'dest': sri, 'raw': 'endpoint'})))['result']
+    assert json.loads(attr['data']) == endpoint
+
+    schema_data = {'name': 'sri', 'version': '1.0', 'attr_names': ['legalName']}
+    schema = json.loads(await ledger.submit(_req(sri, {'type': '101', 'data': schema_data})))['result']
+    rsp = json.loads(await ledger.submit(_req(tag, {'type': '102', 'ref': 1, 'signature_type': 'CL', 'data': {}})))
+    assert rsp['op'] == 'REJECT'  # txn 1 is no schema
+    await ledger.submit(_req(sri, {'type': '102', 'ref': schema['seqNo'], 'signature_type': 'CL', 'data': {'p': 1}}))
+
+    # another process on the journal sees it all
+    other = MemoryLedger(path)
+    got = json.loads(await other.submit(_req(
+        tag,
+        {'type': '107', 'dest': sri, 'data': {'name': 'sri', 'version': '1.0'}})))['result']
+    assert got['data'] == schema_data and got['seqNo'] == schema['seqNo']
+    got = json.loads(await other.submit(_req(
+        tag,
+        {'type': '108', 'ref': schema['seqNo'], 'signature_type': 'CL', 'origin': sri})))['result']
+    assert got['data'] == {'p': 1}
+    txn = json.loads(await other.submit(_req(tag, {'type': '3', 'data': schema['seqNo']})))['result']['data']
+    assert txn['type'] == '101' and txn['identifier'] == sri and txn['data']['name'] == 'sri'
+    assert json.loads(await other.submit(_req(tag, {'type': '3', 'data': 99})))['result']['data'] is None
+
+    submit_request = indy.ledger.submit_request
+    pool = await MemoryNodePool('pool.test', None, other).open()
+    try:
+        nym = json.loads(await indy.ledger.submit_request(pool.handle, _req(tag, {'type': '105', 'dest': tag})))
+        assert json.loads(nym['result']['data'])['verkey'] == '~tag'
+        await pool.close()
+        assert indy.ledger.submit_request is submit_request  # last memory pool closed: libindy's again
+    finally:
+        uninstall()
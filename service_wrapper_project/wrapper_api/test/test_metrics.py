@@ -0,0 +1,34 @@
+"""
+Copyright 2017-2018 Government of Canada - Public Services and Procurement Canada - buyandsell.gc.ca
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+from wrapper_api.metrics import exposition, merge, Metrics
+
+
+def test_metrics():
+    (m0, m1) = (Metrics(), Metrics())
+    m0.observe_request('schema-lookup', 200, None, 0.02, 0.015)
+    m1.observe_request('schema-lookup', 400, 9, 0.2, 0.1)
+    m1.observe_agent('schema-lookup', 0.1)
+    m1.observe_error('claim-create', 400)  # batch item: request itself is 200
+
+    text = exposition(merge([m0.snapshot(), m1.snapshot()]))
+    assert 'von_connector_requests_total{type="schema-lookup",status="200"} 1\n' in text
+    assert 'von_connector_errors_total{type="schema-lookup",code="9"} 1\n' in text
+    assert 'von_connector_request_seconds_bucket{type="schema-lookup",le="0.025"} 1\n' in text
+    assert 'von_connector_request_seconds_bucket{type="schema-lookup",le="+Inf"} 2\n' in text
+    assert 'von_connector_request_seconds_count{type="schema-lookup"} 2\n' in text
+    assert 'von_connector_agent_seconds_count{type="schema-lookup"} 1\n' in text
+    assert 'von_connector_errors_total{type="claim-create",code="400"} 1\n' in text
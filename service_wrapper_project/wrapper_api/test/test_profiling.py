@@ -0,0 +1,43 @@
+"""
+Copyright 2017-2018 Government of Canada - Public Services and Procurement Canada - buyandsell.gc.ca
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+from os import listdir
+from wrapper_api.profiling import Profiler
+
+import asyncio
+import pytest
+
+
+def test_profiler(tmpdir):
+    profiler = Profiler(str(tmpdir), header=True, slow_seconds=0.05)
+    assert profiler.wants('txn', '1') and not profiler.wants('txn', None)
+
+    async def _work(seconds):
+        await asyncio.sleep(seconds)
+        return seconds
+
+    assert profiler.run(_work(0.01), 'txn') == 0.01
+    with pytest.raises(TimeoutError):
+        profiler.run(_work(1), 'claim-create', 0.05)
+    names = sorted(listdir(str(tmpdir)))
+    assert len(names) == 2 and names[0].startswith('claim-create.') and names[1].startswith('txn.')
+
+    profiler.note('claim-create', 0.1)  # slow: arm capture of next one, once
+    profiler.note('claim-create', 0.1)
+    assert profiler.settings()['armed'] == ['claim-create']
+    assert profiler.wants('claim-create') and not profiler.wants('claim-create')
+    profiler.note('claim-create', 0.1)  # within slow.interval of last capture
+    assert not profiler.wants('claim-create')
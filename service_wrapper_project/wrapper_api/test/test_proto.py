@@ -0,0 +1,55 @@
+"""
+Copyright 2017-2018 Government of Canada - Public Services and Procurement Canada - buyandsell.gc.ca
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+from os import listdir
+from os.path import abspath, dirname, join as pjoin
+from wrapper_api import proto
+from wrapper_api.router import ROUTES, load as load_routes
+
+import json
+import pytest
+
+
+def test_proto_templates():
+    dir_protocol = pjoin(dirname(dirname(abspath(__file__))), 'protocol')
+    assert proto.MSG_TYPES == {name[:-len('.json')] for name in listdir(dir_protocol) if name.endswith('.json')}
+
+    # builders with json-string args match %-interpolating the template file, as service wrapper clients do
+    for msg_type in proto.MSG_TYPES:
+        with open(pjoin(dir_protocol, '{}.json'.format(msg_type)), 'r') as proto_f:
+            raw_json = proto_f.read()
+        args = ['{}'.format(i) for i in range(raw_json.count('%s'))]
+        assert proto.form(msg_type, *args, parse_json=True) == json.loads(raw_json % tuple(args))
+
+    form = proto.schema_send('did', 'sri', '1.1', proto.attr_names('sri', '1.1'))
+    assert form['data']['attr-names'] == ['legalName', 'jurisdictionId', 'businessLang', 'sriRegDate']
+
+    form['data']['schema']['name'] = 'changed'  # builders hand out fresh forms
+    assert proto.schema_send('did', 'sri', '1.1', [])['data']['schema']['name'] == 'sri'
+
+    with pytest.raises(TypeError):
+        proto.schema_lookup('did', 'sri', 1.1)
+    with pytest.raises(ValueError):
+        proto.form('schema-lookup', 'did', 'sri')
+
+
+def test_proto_routes():
+    assert {t for (t, r) in ROUTES.items() if r.method == 'POST'} == proto.MSG_TYPES
+    assert {t for (t, r) in ROUTES.items() if r.method == 'GET'} == {'txn', 'did'}
+
+    routes = load_routes({'Route': {'schema-lookup.timeout': '30', 'txn.timeout': '0'}})
+    assert routes['schema-lookup'].timeout == 30 and routes['schema-lookup'].lane == 'interactive'
+    assert routes['txn'].timeout is None and ROUTES['schema-lookup'].timeout is None
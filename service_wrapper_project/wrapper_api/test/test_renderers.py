@@ -0,0 +1,34 @@
+"""
+Copyright 2017-2018 Government of Canada - Public Services and Procurement Canada - buyandsell.gc.ca
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+from django.conf import settings
+
+import json
+
+
+def test_pass_through_renderer():
+    if not settings.configured:
+        settings.configure()  # rest_framework reads settings on import
+    from wrapper_api.renderers import PassThroughJSONRenderer, RawJSON
+
+    renderer = PassThroughJSONRenderer()
+    raw = RawJSON('{"seqNo": 1,  "data": {"name": "sri"}}')
+    assert renderer.render(raw) == raw.encode('utf-8')  # as is, spacing and all
+    assert renderer.render(raw, 'application/json') == raw.encode('utf-8')
+
+    indented = renderer.render(raw, 'application/json; indent=4')  # as the browsable API asks
+    assert indented != raw.encode('utf-8') and json.loads(indented.decode('utf-8')) == json.loads(raw)
+    assert json.loads(renderer.render({'error-code': 400}).decode('utf-8')) == {'error-code': 400}
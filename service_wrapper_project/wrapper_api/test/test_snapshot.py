@@ -0,0 +1,42 @@
+"""
+Copyright 2017-2018 Government of Canada - Public Services and Procurement Canada - buyandsell.gc.ca
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+from os.path import join as pjoin
+from wrapper_api.memledger import MemoryLedger, MemoryNodePool
+from wrapper_api.snapshot import StartupSnapshot
+
+
+def test_startup_snapshot(tmpdir):
+    class Agent:
+        did = 'FaBAq1hgBsYPdjyh8PXkzs'
+        verkey = '~sri'
+        cfg = {'endpoint': 'http://127.0.0.1:8001/api/v0'}
+
+    pool = MemoryNodePool('pool.test', None, MemoryLedger(pjoin(str(tmpdir), 'memory-ledger.jsonl')))
+    snapshot = StartupSnapshot(str(tmpdir), 'sri', pool)
+    assert not snapshot.load() and not snapshot.trusts(Agent, [], False)
+
+    snapshot.save(Agent, [{'name': 'sri', 'version': '1.0', 'seq-no': 4, 'claim-def': True}])
+    snapshot = StartupSnapshot(str(tmpdir), 'sri', pool)
+    assert snapshot.load() and not snapshot.stale  # same process: nothing to revalidate
+    assert snapshot.trusts(Agent, [('sri', '1.0')], True)
+    assert not snapshot.trusts(Agent, [('sri', '1.0'), ('sri', '1.1')], True)  # configuration originates more
+
+    Agent.cfg = {'endpoint': 'http://127.0.0.1:8002/api/v0'}
+    assert not snapshot.trusts(Agent, [('sri', '1.0')], True)  # endpoint moved
+
+    other = MemoryNodePool('pool.test', None, MemoryLedger(pjoin(str(tmpdir), 'other-ledger.jsonl')))
+    assert StartupSnapshot(str(tmpdir), 'sri', other).path != snapshot.path  # another ledger: another snapshot
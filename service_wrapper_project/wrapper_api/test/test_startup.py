@@ -0,0 +1,56 @@
+"""
+Copyright 2017-2018 Government of Canada - Public Services and Procurement Canada - buyandsell.gc.ca
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+from wrapper_api.startup import Startup
+
+import asyncio
+import pytest
+
+
+@pytest.mark.asyncio
+async def test_startup():
+    startup = Startup()
+    with startup.phase('pool'):
+        pass
+    phase = startup.phase('registration', 'sri')
+    status = startup.status()
+    assert not status['ready'] and [(p['phase'], p['state']) for p in status['phases']] == [
+        ('pool', 'done'), ('registration', 'running')]
+
+    assert not await startup.wait(0.05)  # times out
+    assert not await startup.wait(0)
+
+    waiting = asyncio.ensure_future(startup.wait(5))
+    await asyncio.sleep(0.01)
+    with phase:
+        pass
+    startup.finish()
+    assert await asyncio.wait_for(waiting, 1)  # released at once
+    assert await startup.wait(5) and startup.status()['ready'] and startup.error is None
+
+
+@pytest.mark.asyncio
+async def test_startup_failure():
+    startup = Startup()
+    waiting = asyncio.ensure_future(startup.wait(5))
+    await asyncio.sleep(0.01)
+    with pytest.raises(ValueError):
+        with startup.phase('origination', 'sri'):
+            raise ValueError('no such schema')
+    assert not await asyncio.wait_for(waiting, 1)  # released, incomplete
+    status = startup.status()
+    assert not status['ready'] and status['error'] == 'no such schema'
+    assert status['phases'][0]['state'] == 'failed' and status['phases'][0]['error'] == 'no such schema'
@@ -17,13 +17,13 @@ limitations under the License.
 from collections import Counter
 from configparser import ConfigParser
 from contextlib import closing
-from os import walk
 from os.path import abspath, dirname, isfile, join as pjoin
 from time import sleep
 from von_agent.util import ppjson, claims_for, encode, prune_claims_json, revealed_attrs, schema_keys_for
 from von_agent.proto.proto_util import list_schemata, attr_match, req_attrs, pred_match, pred_match_match
 from von_agent.schemakey import SchemaKey
 from von_agent.cache import SCHEMA_CACHE
+from wrapper_api import proto
 
 import atexit
 import datetime
@@ -52,6 +52,7 @@ class Wrapper:
     def __init__(self, agent_profile, agent_cfg):
         self._script = pjoin(dirname(dirname(dirname(abspath(__file__)))), 'bin', agent_profile)
         self._agent_profile = agent_profile
+        self._agent_cfg = agent_cfg
         self._host = agent_cfg['host']
         self._port = int(agent_cfg['port'])
         self._proc = None
@@ -84,8 +85,25 @@ class Wrapper:
         elif rc == 3:
             raise ValueError('Timed out waiting on service wrapper for {}'.format(
                 self._agent_profile))
+        self.wait_ready()
         return True
 
+    def wait_ready(self, timeout=240):
+        # service wrapper serves lookups at once, but registers and originates in the background
+        for _ in range(timeout):
+            try:
+                r = requests.get(url_for(self._agent_cfg, 'ready'), timeout=5)
+                if r.status_code == 200:
+                    return
+                if 'error' in r.json():
+                    raise ValueError('Service wrapper for {} failed to start: {}'.format(
+                        self._agent_profile,
+                        r.json()['error']))
+            except requests.exceptions.ConnectionError:
+                pass
+            sleep(1)
+        raise ValueError('Timed out waiting on service wrapper for {} to be ready'.format(self._agent_profile))
+
     def stop(self):
         if self._proc and self._proc.isalive():
             self._proc.sendcontrol('c')
@@ -112,17 +130,11 @@ def form_json(msg_type, args, proxy_did=None):
     assert all(isinstance(x, str) for x in args)
     # print("... form_json interpolands {}".format([a for a in args]))
 
-    with open(pjoin(dirname(dirname(abspath(__file__))), 'protocol', '{}.json'.format(msg_type)), 'r') as proto:
-        raw_json = proto.read()
-    # print("... raw_json: {}".format(raw_json))
-    msg_json = raw_json % args
-    rv = msg_json
+    msg = proto.form(msg_type, *args, parse_json=True)
     if proxy_did:
         assert msg_type not in ('master-secret-set', 'claims-reset')
-        # print("... form_json json-loading {}".format(msg_json))
-        msg = json.loads(msg_json)
         msg['data']['proxy-did'] = proxy_did
-        rv = json.dumps(msg, indent=4)
+    rv = json.dumps(msg, indent=4)
     # print('\n... form_json composed {} form: {}'.format(msg_type, ppjson(rv)))
     return rv
 
@@ -141,6 +153,13 @@ def get_post_response(cfg_section, msg_type, args, proxy_did=None, rc_http=200):
     return r.json()
 
 
+def get_batch_response(cfg_section, msg_type_args_pairs, rc_http=200):
+    url = url_for(cfg_section, 'batch')
+    r = requests.post(url, json=[json.loads(form_json(msg_type, args)) for (msg_type, args) in msg_type_args_pairs])
+    assert r.status_code == rc_http, 'Expected HTTP status code {} - received {}'.format(rc_http, r.status_code)
+    return r.json()
+
+
 def claim_value_pair(plain):
     return [str(plain), encode(plain)]
 
@@ -220,24 +239,22 @@ async def test_wrappers_with_trust_anchor(pool_ip):
     }
     claim = {}
 
-    # 3. get schemata
+    # 3. get schemata, in one batch per originator
     i = 0
     for profile in agent_profiles:
         if 'Origin' not in cfg[profile]:
             continue
-        for name in cfg[profile]['Origin']:  # read each schema once - each schema has one originator
-            for version in (v.strip() for v in cfg[profile]['Origin'][name].split(',')):
-                s_key = SchemaKey(agent_profile2did[profile], name, version)
-                SCHEMA_CACHE[s_key] = get_post_response(
-                    cfg[profile]['Agent'],
-                    'schema-lookup', 
-                    (
-                        agent_profile2did[profile],
-                        name,
-                        version
-                    ))
-                print('\n\n== 4.{} == Schema [{}]: {}'.format(i, s_key, ppjson(SCHEMA_CACHE[s_key])))
-                i += 1
+        s_keys = [SchemaKey(agent_profile2did[profile], name, version.strip())
+            for name in cfg[profile]['Origin']  # read each schema once - each schema has one originator
+                for version in cfg[profile]['Origin'][name].split(',')]
+        batch_resp = get_batch_response(
+            cfg[profile]['Agent'],
+            [('schema-lookup', (*s_key,)) for s_key in s_keys])
+        for (s_key, item) in zip(s_keys, batch_resp):
+            assert item['status'] == 200
+            SCHEMA_CACHE[s_key] = item['response']
+            print('\n\n== 4.{} == Schema [{}]: {}'.format(i, s_key, ppjson(SCHEMA_CACHE[s_key])))
+            i += 1
 
     # 4. BC Org Book, PSPC Org Book (as HolderProvers) respond to claims-reset directive, to restore state to base line
     for profile in ('bc-org-book', 'pspc-org-book'):
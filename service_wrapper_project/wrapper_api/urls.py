@@ -18,35 +18,32 @@ from django.conf import settings
 from django.conf.urls import url, include
 from django.core.cache import cache
 from wrapper_api import views
+from wrapper_api.config import hosted_profiles, multi_profile
+from wrapper_api.router import ROUTES
 from rest_framework import routers, serializers, viewsets
 
+import re
 
+
+# one pattern for all message types but txn, longest first so that, e.g., proof-request-by-referent beats proof-request
+msg_type_pattern = '|'.join(re.escape(t) for t in sorted(ROUTES, key=len, reverse=True) if t != 'txn')
+
+api_patterns = [
+    url(r'^batch', views.BatchServiceWrapper.as_view()),
+    url(r'^metrics$', views.metrics),
+    url(r'^profiling$', views.profiling),
+    url(r'^ready$', views.readiness),
+    url(r'^(?P<msg_type>txn)/(?P<seq_no>\d+)', views.ServiceWrapper.as_view()),  # txn without seq_no: 404
+    url(r'^(?P<msg_type>{})'.format(msg_type_pattern), views.ServiceWrapper.as_view()),
+]
+
+# a process hosting several agent profiles serves each under its own prefix, e.g., /sri/api/v0/did
 urlpatterns = [
     url(
-        r'^{}'.format('{}/'.format(cache.get('config')['VON Connector']['api.base.url.path'].strip('/'))),
-        include([
-            url(r'^txn/(?P<seq_no>\d+)', views.ServiceWrapper.as_view()),
-            url(r'^did', views.ServiceWrapper.as_view()),
-
-            # redundant patterns here show explicitly what service wrapper takes as POSTed tokens
-            url(r'^agent-nym-lookup', views.ServiceWrapper.as_view()),
-            url(r'^agent-nym-send', views.ServiceWrapper.as_view()),
-            url(r'^agent-endpoint-lookup', views.ServiceWrapper.as_view()),
-            url(r'^agent-endpoint-send', views.ServiceWrapper.as_view()),
-            url(r'^schema-send', views.ServiceWrapper.as_view()),
-            url(r'^schema-lookup', views.ServiceWrapper.as_view()),
-            url(r'^claim-def-send', views.ServiceWrapper.as_view()),
-            url(r'^master-secret-set', views.ServiceWrapper.as_view()),
-            url(r'^claim-offer-create', views.ServiceWrapper.as_view()),
-            url(r'^claim-offer-store', views.ServiceWrapper.as_view()),
-            url(r'^claim-create', views.ServiceWrapper.as_view()),
-            url(r'^claim-store', views.ServiceWrapper.as_view()),
-            url(r'^claim-request', views.ServiceWrapper.as_view()),
-            url(r'^proof-request', views.ServiceWrapper.as_view()),
-            url(r'^proof-request-by-referent', views.ServiceWrapper.as_view()),
-            url(r'^verification-request', views.ServiceWrapper.as_view()),
-            url(r'^claims-reset', views.ServiceWrapper.as_view()),
-        ])
+        r'^{}{}'.format(
+            '(?P<profile>{})/'.format('|'.join(re.escape(p) for p in hosted_profiles())) if multi_profile() else '',
+            '{}/'.format(cache.get('config')['VON Connector']['api.base.url.path'].strip('/'))),
+        include(api_patterns)
     ),
 ]
 
@@ -15,23 +15,292 @@ limitations under the License.
 """
 
 from django.shortcuts import render
-from django.contrib.auth.models import User
 from django.core.cache import cache
+from django.http import HttpResponse
+from django.views.decorators.csrf import csrf_exempt
+from functools import partial
 from indy.error import IndyError
+from requests import HTTPError
 from rest_framework.exceptions import NotFound
 from rest_framework.response import Response
 from rest_framework.parsers import JSONParser
+from rest_framework.renderers import BrowsableAPIRenderer
 from rest_framework.views import APIView
-from time import time as epoch
-from von_agent.error import VonAgentError
+from time import perf_counter, time as epoch
+from von_agent.error import ProxyHop, VonAgentError
+from von_agent.proto.validate import validate as validate_form
+from von_agent.validate_config import CONFIG_JSON_SCHEMA
+from wrapper_api import logs
+from wrapper_api.admission import admission_for, Overloaded
+from wrapper_api.cache import LRUCache, TTLCache
+from wrapper_api.coalesce import SingleFlight
 from wrapper_api.eventloop import do
+from wrapper_api.lanes import scheduler_for
+from wrapper_api.metrics import exposition, METRICS
+from wrapper_api.profiling import HEADER as PROFILING_HEADER, profiler_for
+from wrapper_api.registry import REGISTRY
+from wrapper_api.renderers import PassThroughJSONRenderer, RawJSON
+from wrapper_api.router import load as load_routes
+from wrapper_api.startup import RETRY_AFTER, STARTUP, StartupPending
 
+import asyncio
 import json
 import logging
+import re
 
 
+# request-path logging formats lazily, on the writer thread (wrapper_api/logs.py): pass arguments, not strings;
+# errors that a client's request brings about (bad form, ledger or wallet refusal) log no traceback
 logger = logging.getLogger(__name__)
-path_prefix_slash = '{}/'.format(cache.get('config')['VON Connector']['api.base.url.path'].strip('/'))
+CLIENT_ERRORS = (IndyError, VonAgentError, NotFound, ValueError, KeyError)
+routes = load_routes(cache.get('config'))
+timeout = float(cache.get('config')['VON Connector'].get('request.timeout', 0)) or None
+batch_concurrency = int(cache.get('config')['VON Connector'].get('batch.concurrency', 8))
+startup_wait = float(cache.get('config')['VON Connector'].get('startup.wait', 60))
+relay_retries = int(cache.get('config').get('HTTP', {}).get('relay.retries', 1))
+
+cfg_cache = cache.get('config').get('Cache', {})
+
+# committed ledger transactions never change: serve repeat txn/<seq_no> requests without touching the pool
+txn_cache = LRUCache(
+    int(cfg_cache.get('txn.max.entries', 4096)),
+    int(cfg_cache.get('txn.max.bytes', 16 * 1024 * 1024)))
+
+# nym and endpoint lookups by (message type, DID, proxy DID); sends through this wrapper invalidate
+lookup_ttl = {
+    msg_type: float(cfg_cache.get('{}.ttl'.format(msg_type), 60))
+        for msg_type in ('agent-nym-lookup', 'agent-endpoint-lookup')
+}
+lookup_cache = TTLCache(int(cfg_cache.get('lookup.max.entries', 4096)))
+
+# concurrent identical lookups (cacheable routes) share one trip to the ledger
+flights = SingleFlight()
+
+# opt-in cProfile captures of requests, by header, by sampling, or following a slow request
+profiler = profiler_for(cache.get('config'))
+
+# bounded concurrency and wait queue per message type: fail fast with 503 past them
+admission = admission_for(cache.get('config'))
+
+# agent work dispatches by route lane, weighted fair, so that lookups do not wait out heavy proof work
+scheduler = scheduler_for(cache.get('config'))
+
+METRICS.add_source(lambda: [
+    ('von_connector_cache_{}_total'.format(stat), (('cache', name),), value)
+        for (name, c) in (('txn', txn_cache), ('lookup', lookup_cache))
+            for (stat, value) in c.stats().items() if stat in ('hits', 'misses', 'evictions')
+] + [
+    ('von_connector_coalesced_total', (), flights.followers)
+] + [
+    ('von_connector_log_records_{}_total'.format(stat), (), value) for (stat, value) in logs.stats().items()
+] + [
+    ('von_connector_admission_{}'.format(stat if stat in ('active', 'waiting') else stat + '_total'),
+        (('type', msg_type),),
+        value)
+        for (msg_type, stats) in admission.stats().items()
+            for (stat, value) in stats.items()
+] + [
+    ('von_connector_lane_{}'.format(stat if stat in ('active', 'waiting') else stat + '_total'),
+        (('lane', lane),),
+        value)
+        for (lane, stats) in scheduler.stats().items()
+            for (stat, value) in stats.items()
+])
+
+
+def _lookup_key(form):
+    """
+    Return lookup cache key for nym or endpoint lookup form, None for any other form or for malformed form.
+
+    :param form: protocol form
+    :return: (message type, DID, proxy DID or None) or None
+    """
+
+    try:
+        if form['type'] == 'agent-nym-lookup':
+            return (form['type'], form['data']['agent-nym']['did'], form['data'].get('proxy-did'))
+        if form['type'] == 'agent-endpoint-lookup':
+            return (form['type'], form['data']['agent-endpoint']['did'], form['data'].get('proxy-did'))
+    except (KeyError, TypeError):
+        pass
+    return None
+
+
+def _schema_lookup_key(form):
+    """
+    Return ledger store key for schema-lookup form, None for any other form or for malformed form.
+
+    :param form: protocol form
+    :return: (origin DID, name, version, proxy DID or None) or None
+    """
+
+    try:
+        if form['type'] == 'schema-lookup':
+            schema = form['data']['schema']
+            return (schema['origin-did'], schema['name'], schema['version'], form['data'].get('proxy-did'))
+    except (KeyError, TypeError):
+        pass
+    return None
+
+
+def _stale_lookup(form, did):
+    """
+    Return (message type, DID) of lookups that a nym or endpoint send form supersedes, None for any other form.
+
+    :param form: protocol form
+    :param did: DID of current agent, which sends its own endpoint unless proxying
+    :return: (lookup message type, DID) or None
+    """
+
+    try:
+        if form['type'] == 'agent-nym-send':
+            return ('agent-nym-lookup', form['data']['agent-nym']['did'])
+        if form['type'] == 'agent-endpoint-send':
+            return ('agent-endpoint-lookup', form['data'].get('proxy-did', did))
+    except (KeyError, TypeError):
+        pass
+    return None
+
+
+def invalidate_lookups(msg_type, did):
+    """
+    Drop cached lookups of message type on DID, direct or proxied, that a write to the ledger supersedes.
+
+    :param msg_type: lookup message type, 'agent-nym-lookup' or 'agent-endpoint-lookup'
+    :param did: DID
+    """
+
+    lookup_cache.invalidate(lambda k: k[:2] == (msg_type, did))
+
+
+def _relay(form, ag):
+    """
+    Return agent co-hosted in this process that form proxies to, popping proxy-did from form as von_agent
+    would on relay; return None for form proxying nowhere, or anywhere but another agent in this process.
+
+    :param form: protocol form
+    :param ag: agent taking form
+    :return: agent to process form in-process instead, or None
+    """
+
+    try:
+        proxy_did = form['data'].get('proxy-did')
+    except (AttributeError, KeyError, TypeError):
+        return None
+    target = REGISTRY.agent_by_did(proxy_did) if proxy_did else None
+    if target is None or target is ag or not ag.cfg.get('proxy-relay', False):
+        return None
+    form['data'].pop('proxy-did')
+    return target
+
+
+async def _post(ag, form):
+    """
+    Have agent process protocol form. Relay form proxying to a remote agent over HTTP on an executor thread,
+    in von_agent's stead: von_agent posts synchronously, holding up the event loop, and with it every
+    request in process, for the whole round trip.
+
+    :param ag: agent
+    :param form: protocol form
+    :return: json response
+    """
+
+    http = REGISTRY.get('http')
+    proxy_did = form['data'].get('proxy-did') if isinstance(form.get('data'), dict) else None
+    if http is None or not proxy_did or proxy_did == ag.did or not ag.cfg.get('proxy-relay', False):
+        return await ag.process_post(form)
+
+    validate_form(form, True)
+    endpoint = json.loads(await ag.get_endpoint(proxy_did)).get('endpoint', '')
+    if not re.match(CONFIG_JSON_SCHEMA['agent']['properties']['endpoint']['pattern'], endpoint, re.IGNORECASE):
+        raise ProxyHop('No agent on the ledger has DID {}'.format(proxy_did))
+    if not re.match('^http[s]?://.*', endpoint, re.IGNORECASE):
+        raise ProxyHop('No proxy strategy implemented for target agent endpoint {}'.format(endpoint))
+
+    form['data'].pop('proxy-did')
+    rsp = await asyncio.get_event_loop().run_in_executor(
+        None,
+        partial(http.post, '{}/{}'.format(endpoint, form['type']), json=form, retries=relay_retries))
+    if not rsp.ok:
+        raise HTTPError(rsp.status_code, rsp.reason)
+    return json.dumps(rsp.json())
+
+
+def _error(e):
+    """
+    Return error response data for exception.
+
+    :param e: exception
+    :return: dict with error code and message
+    """
+
+    if isinstance(e, (IndyError, VonAgentError)):
+        error_code = int(e.error_code)
+    elif isinstance(e, (StartupPending, Overloaded)):
+        error_code = 503
+    else:
+        error_code = 504 if isinstance(e, TimeoutError) else 400
+    return {
+        'error-code': error_code,
+        'message': str(e)
+    }
+
+
+async def _within(coro, seconds):
+    """
+    Await coroutine; raise TimeoutError if it does not complete within route timeout.
+
+    :param coro: coroutine to await
+    :param seconds: seconds to allow, None for no limit
+    :return: coroutine result
+    """
+
+    if seconds is None:
+        return await coro
+    try:
+        return await asyncio.wait_for(coro, seconds)
+    except asyncio.TimeoutError:
+        raise TimeoutError('Operation timed out after {} seconds'.format(seconds))
+
+
+async def _dispatch(route, work):
+    """
+    Run agent work once admission control gives its message type a turn, in route's lane once the lane
+    scheduler gives it a slot, within route timeout. For a cacheable route, only the leader of a coalesced
+    flight dispatches: its followers take no turn of their own, so that a burst of identical requests
+    does not fill the admission queue.
+
+    :param route: route
+    :param work: callable returning coroutine for agent work
+    :return: work result
+    """
+
+    async with admission.admit(route.msg_type):
+        return await _within(scheduler.run(route.lane, work), route.timeout)
+
+
+async def _started(route):
+    """
+    Wait on startup for route outside the interactive lane; raise StartupPending if it does not complete
+    within [VON Connector] startup.wait seconds.
+
+    :param route: route
+    """
+
+    if route.lane != 'interactive' and not await STARTUP.wait(startup_wait):
+        raise StartupPending('Agent startup failed: {}'.format(STARTUP.error) if STARTUP.error else
+            'Agent startup incomplete; retry after {} seconds'.format(RETRY_AFTER))
+
+
+def _headers(status):
+    """
+    Return response headers for HTTP status code: Retry-After for 503, None for any other.
+
+    :param status: HTTP status code
+    :return: dict or None
+    """
+
+    return {'Retry-After': str(RETRY_AFTER)} if status == 503 else None
 
 
 class ServiceWrapper(APIView):
@@ -39,50 +308,369 @@ class ServiceWrapper(APIView):
     API endpoint accepting requests for current agent
     """
 
-    def post(self, req):
+    renderer_classes = (PassThroughJSONRenderer, BrowsableAPIRenderer)  # agent json goes out as is
+    agent_seconds = 0.0  # agent processing time for request, for metrics: one view instance per request
+
+    async def handle_lookup(self, ag, form):
         """
-        Wiring for agent POST processing
+        Handle nym or endpoint lookup: answer from lookup cache if possible.
+
+        :param ag: agent
+        :param form: protocol form
+        :return: json response
+        """
+
+        lookup_key = _lookup_key(form)
+        rv_json = lookup_cache.get(lookup_key) if lookup_key else None
+        if rv_json is None:
+            rv_json = await _post(ag, form)
+            if lookup_key and rv_json != '{}':  # not on ledger (yet): do not cache
+                lookup_cache.put(lookup_key, rv_json, lookup_ttl[lookup_key[0]])
+        return rv_json
+
+    async def handle_schema_lookup(self, ag, form):
+        """
+        Handle schema lookup: answer from ledger store if configured and possible.
+
+        :param ag: agent
+        :param form: protocol form
+        :return: json response
+        """
+
+        store = REGISTRY.get('ledger-store')
+        schema_key = _schema_lookup_key(form) if store else None
+        if not schema_key:
+            return await self.handle_form(ag, form)
+
+        rv_json = store.get_schema_lookup(schema_key)
+        if rv_json is None:
+            rv_json = store.put_schema_lookup(schema_key, await _post(ag, form))
+        return rv_json
+
+    async def handle_send(self, ag, form):
+        """
+        Handle nym or endpoint send: invalidate lookups that it supersedes.
+
+        :param ag: agent
+        :param form: protocol form
+        :return: json response
+        """
+
+        stale = _stale_lookup(form, ag.did)  # before _post(), which pops any proxy-did
+        rv_json = await self.handle_form(ag, form)
+        if stale:
+            invalidate_lookups(*stale)
+        return rv_json
+
+    async def handle_form(self, ag, form):
+        """
+        Handle any other protocol form: have agent process it.
+
+        :param ag: agent
+        :param form: protocol form
+        :return: json response
+        """
+
+        return await _post(ag, form)
+
+    async def handle_txn(self, ag, seq_no):
+        """
+        Handle transaction fetch by sequence number: answer from transaction cache if possible.
+
+        :param ag: agent
+        :param seq_no: transaction sequence number
+        :return: json response
+        """
+
+        if seq_no is None:
+            raise NotFound(detail='Error 404, page not found', code=404)
+        seq_no = int(seq_no)
+        rv_json = txn_cache.get(seq_no)
+        if rv_json is None:
+            rv_json = await ag.process_get_txn(seq_no)
+            if rv_json != '{}':  # no txn (yet) at seq_no: do not cache
+                txn_cache.put(seq_no, rv_json)
+        return rv_json
+
+    async def handle_did(self, ag, seq_no=None):
+        """
+        Handle DID fetch.
+
+        :param ag: agent
+        :param seq_no: unused
+        :return: json response
+        """
+
+        return await ag.process_get_did()
+
+    async def _timed(self, route, coro):
+        """
+        Await agent work; add its time to the request's agent time and to the metrics. Time waiting on
+        admission control or for a lane slot, ahead of the work, counts as overhead.
+
+        :param route: route
+        :param coro: coroutine for agent work
+        :return: work result
+        """
+
+        start = perf_counter()
+        try:
+            return await coro
+        finally:
+            elapsed = perf_counter() - start
+            self.agent_seconds += elapsed
+            METRICS.observe_agent(route.msg_type, elapsed)
+
+    async def process_form(self, form, profile=None):
         """
+        Have agent process one POSTed protocol form via the handler that its route names, within the route
+        timeout; raise any exception that processing raises. Relay form proxying to an agent co-hosted in
+        this process directly to that agent, rather than over HTTP back into this process.
 
-        ag = cache.get('agent')
+        :param form: protocol form (dict)
+        :param profile: agent profile, None for the one agent that the process hosts
+        :return: json response
+        """
+
+        ag = REGISTRY.agent_for(profile)
         assert ag is not None
+        ag = _relay(form, ag) or ag
+
+        route = routes.get(form.get('type')) if isinstance(form, dict) else None
+        if route is None or route.method != 'POST':
+            raise ValueError('Unsupported protocol form type {}'.format(
+                form.get('type') if isinstance(form, dict) else None))
+        await _started(route)
+        handler = getattr(self, route.handler)
+        if route.cacheable:
+            key = (profile, route.msg_type, json.dumps(form, sort_keys=True, separators=(',', ':')))  # before pops
+        if route.cacheable:
+            return await flights.run(key, lambda: _dispatch(route, lambda: self._timed(route, handler(ag, form))))
+        return await _dispatch(route, lambda: self._timed(route, handler(ag, form)))
+
+    async def apost(self, path, body, profile=None):
+        """
+        Async wiring for agent POST processing: await agent directly on the running (connector) event loop.
+
+        :param path: request path
+        :param body: request body bytes
+        :param profile: agent profile, None for the one agent that the process hosts
+        :return: HTTP status code and json response
+        """
+
         try:
-            logger.debug('Processing POST [{}], request body: {}'.format(req.build_absolute_uri(), req.body))
-            form = json.loads(req.body.decode('utf-8'))
-            rv_json = do(ag.process_post(form))
-            return Response(json.loads(rv_json))
+            form = json.loads(body.decode('utf-8'))
+            return (200, await self.process_form(form, profile))
+        except (StartupPending, Overloaded) as e:
+            logger.warning('Held up on %s: %s', path, e)
+            return (503, json.dumps(_error(e)))
+        except TimeoutError as e:
+            logger.error('Timed out on %s: %s', path, e)
+            return (504, json.dumps(_error(e)))
         except Exception as e:
-            logger.exception('Exception on {}: {}'.format(req.path, e))
-            return Response(
-                status=400,
-                data={
-                    'error-code': int(e.error_code) if isinstance(e, (IndyError, VonAgentError)) else 400,
-                    'message': str(e)
-                })
-        finally:
-            cache.set('agent', ag)  #  in case agent state changes over process_post
+            logger.error('Exception on %s: %s', path, e, exc_info=not isinstance(e, CLIENT_ERRORS))
+            return (400, json.dumps(_error(e)))
 
-    def get(self, req, seq_no=None):
+    async def aget(self, path, msg_type=None, seq_no=None, profile=None):
         """
-        Wiring for agent helper (GET) methods
+        Async wiring for agent helper (GET) methods: await agent directly on the running (connector) event loop.
+
+        :param path: request path
+        :param msg_type: message type that route captures, e.g., 'txn'
+        :param seq_no: transaction sequence number for txn route
+        :param profile: agent profile, None for the one agent that the process hosts
+        :return: HTTP status code and json response
         """
 
-        ag = cache.get('agent')
+        ag = REGISTRY.agent_for(profile)
         assert ag is not None
+
+        route = routes.get(msg_type)
         try:
-            logger.debug('Processing GET [{}]'.format(req.build_absolute_uri()))
-            if req.path.startswith('/{}txn'.format(path_prefix_slash)):
-                rv_json = do(ag.process_get_txn(int(seq_no)))
-                return Response(json.loads(rv_json))
-            elif req.path.startswith('/{}did'.format(path_prefix_slash)):
-                rv_json = do(ag.process_get_did())
-                return Response(json.loads(rv_json))
-            else:
+            if route is None or route.method != 'GET':
                 raise NotFound(detail='Error 404, page not found', code=404)
+            await _started(route)
+            handler = getattr(self, route.handler)
+            if route.cacheable:
+                return (200, await flights.run(
+                    (route.msg_type, seq_no),
+                    lambda: _dispatch(route, lambda: self._timed(route, handler(ag, seq_no)))))
+            return (200, await _dispatch(route, lambda: self._timed(route, handler(ag, seq_no))))
+        except (StartupPending, Overloaded) as e:
+            logger.warning('Held up on %s: %s', path, e)
+            return (503, json.dumps(_error(e)))
+        except TimeoutError as e:
+            logger.error('Timed out on %s: %s', path, e)
+            return (504, json.dumps(_error(e)))
+        except Exception as e:
+            return (400, json.dumps(_error(e)))
+
+    def _do(self, req, msg_type, coro):
+        """
+        Run request coroutine to completion within request timeout: on the connector event loop, or under
+        the profiler if profiling the request. Note request duration for the profiler and the metrics route.
+
+        :param req: request
+        :param msg_type: message type that route captures, None for batch
+        :param coro: coroutine to run
+        :return: HTTP status code and json response
+        """
+
+        msg_type = msg_type or 'batch'
+        start = perf_counter()
+        try:
+            if profiler.wants(msg_type, req.META.get('HTTP_{}'.format(PROFILING_HEADER.upper().replace('-', '_')))):
+                return profiler.run(coro, msg_type, timeout)
+            return do(coro, timeout)
+        finally:
+            profiler.note(msg_type, perf_counter() - start)
+            req._request.von_metrics = {'type': msg_type, 'agent': self.agent_seconds}
+
+    def post(self, req, msg_type=None, seq_no=None, profile=None):
+        """
+        Wiring for agent POST processing
+        """
+
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug('Processing POST [%s], request body: %s', req.build_absolute_uri(), req.body)
+        try:
+            (status, rv_json) = self._do(req, msg_type, self.apost(req.path, req.body, profile))
+            return Response(status=status, data=RawJSON(rv_json), headers=_headers(status))
+        except TimeoutError as e:
+            logger.error('Timed out on %s: %s', req.path, e)
+            return Response(status=504, data={'error-code': 504, 'message': str(e)})
+
+    def get(self, req, msg_type=None, seq_no=None, profile=None):
+        """
+        Wiring for agent helper (GET) methods
+        """
+
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug('Processing GET [%s]', req.build_absolute_uri())
+        try:
+            (status, rv_json) = self._do(req, msg_type, self.aget(req.path, msg_type, seq_no, profile))
+            return Response(status=status, data=RawJSON(rv_json), headers=_headers(status))
+        except TimeoutError as e:
+            return Response(status=504, data={'error-code': 504, 'message': str(e)})
+
+
+class BatchServiceWrapper(ServiceWrapper):
+    """
+    API endpoint accepting a json array of protocol forms for current agent to process concurrently,
+    at most [VON Connector] batch.concurrency at a time. Forms in one batch run in no particular order:
+    submit forms depending on one another's responses (e.g., claim-offer-create, then claim-offer-store)
+    in successive batches.
+
+    Respond with an array of results in request order, each one of
+        {"status": 200, "response": <agent response>} or
+        {"status": <400, 503 pending startup, or 504 on timeout>, "error-code": <code>, "message": <message>}.
+    """
+
+    async def apost(self, path, body, profile=None):
+        """
+        Async wiring for agent batch POST processing.
+
+        :param path: request path
+        :param body: request body bytes, json array of protocol forms
+        :param profile: agent profile, None for the one agent that the process hosts
+        :return: HTTP status code and json response
+        """
+
+        try:
+            forms = json.loads(body.decode('utf-8'))
+            if not isinstance(forms, list):
+                raise ValueError('Batch request body must be a json array of protocol forms')
         except Exception as e:
-            return Response(
-                status=400,
-                data={
-                    'error-code': int(e.error_code) if isinstance(e, (IndyError, VonAgentError)) else 400,
-                    'message': str(e)
-                })
+            logger.warning('Bad batch request on %s: %s', path, e)
+            return (400, json.dumps(_error(e)))
+
+        semaphore = asyncio.Semaphore(batch_concurrency)
+
+        async def _item(form):
+            async with semaphore:
+                try:
+                    return '{{"status": 200, "response": {}}}'.format(await self.process_form(form, profile))
+                except Exception as e:
+                    logger.error(
+                        'Exception on %s batch item: %s',
+                        path,
+                        e,
+                        exc_info=not isinstance(e, CLIENT_ERRORS))
+                    status = 504 if isinstance(e, TimeoutError) else (
+                        503 if isinstance(e, (StartupPending, Overloaded)) else 400)
+                    error = _error(e)
+                    msg_type = form.get('type') if isinstance(form, dict) else None
+                    route = routes.get(msg_type) if isinstance(msg_type, str) else None
+                    METRICS.observe_error(route.msg_type if route else 'batch', error['error-code'])  # batch is 200
+                    return json.dumps({'status': status, **error})
+
+        start = perf_counter()
+        items = await asyncio.gather(*(_item(form) for form in forms))
+        self.agent_seconds = perf_counter() - start  # items overlap: count wall time, not their sum
+        return (200, '[{}]'.format(', '.join(items)))  # agent responses are json already: splice, don't re-encode
+
+
+def metrics(req, profile=None):
+    """
+    Serve metrics in Prometheus text exposition format: for the whole server, across pre-fork workers.
+    """
+
+    return HttpResponse(exposition(METRICS.collect()), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+
+def readiness_status():
+    """
+    Return readiness status: startup phases (wrapper_api/startup.py) per agent profile, with state and duration.
+
+    :return: HTTP status code (200 once startup is complete, 503 until then) and json response
+    """
+
+    status = STARTUP.status()
+    return (200 if status['ready'] else 503, json.dumps(status))
+
+
+def readiness(req, profile=None):
+    """
+    Serve readiness: 200 once startup is complete, for load balancers to add the server; 503 until then.
+    """
+
+    (status, rv_json) = readiness_status()
+    return HttpResponse(rv_json, status=status, content_type='application/json')
+
+
+def profiling_settings(method, body, remote_addr):
+    """
+    Show (GET) or change (POST) request profiling settings, for clients on the loopback interface only.
+    POST a json object with any of header (bool), sample.rate (0 to 1), slow.seconds (0 to disable).
+    Under pre-fork serving, a change reaches only the worker that takes it.
+
+    :param method: HTTP method
+    :param body: request body bytes
+    :param remote_addr: client address
+    :return: HTTP status code and json response
+    """
+
+    if remote_addr not in ('127.0.0.1', '::1'):
+        return (403, json.dumps({'error-code': 403, 'message': 'Profiling settings are for local clients only'}))
+    if method == 'GET':
+        return (200, json.dumps(profiler.settings()))
+    if method != 'POST':
+        return (405, json.dumps({'error-code': 405, 'message': 'Method {} not allowed'.format(method)}))
+    try:
+        spec = json.loads(body.decode('utf-8') or '{}')
+        return (200, json.dumps(profiler.configure(
+            header=spec.get('header'),
+            sample_rate=spec.get('sample.rate'),
+            slow_seconds=spec.get('slow.seconds'))))
+    except Exception as e:
+        return (400, json.dumps(_error(e)))
+
+
+@csrf_exempt
+def profiling(req, profile=None):
+    """
+    Admin toggle for request profiling (wrapper_api/profiling.py).
+    """
+
+    (status, rv_json) = profiling_settings(req.method, req.body, req.META.get('REMOTE_ADDR'))
+    return HttpResponse(rv_json, status=status, content_type='application/json')